@@ -919,6 +919,196 @@ def get_user_pending_verification(username: str):
 # -------------------------
 DEEPSEEK_API_KEY = st.secrets["DEEPSEEK_API_KEY"]  # Replace with actual API key
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_MAX_CONCURRENCY = 4  # In-flight DeepSeek requests per process (batch runs share it with chat)
+
+# -------------------------
+# DEEPSEEK HTTP CLIENT (pooled keep-alive session + retries + metrics)
+# -------------------------
+import random
+import threading
+from collections import deque
+from requests.adapters import HTTPAdapter
+
+class DeepSeekClient:
+    """
+    One pooled, keep-alive HTTP session for every DeepSeek call.
+    Retries 429/5xx and connection errors with jittered exponential backoff,
+    all inside a per-call timeout budget, and records latency/status metrics.
+    A shared semaphore caps how many requests are in flight at once.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_url, api_key, pool_connections=4, pool_maxsize=16,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, connect_timeout=5,
+                 max_concurrency=DEEPSEEK_MAX_CONCURRENCY):
+        self.api_url = api_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connect_timeout = connect_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+            "Connection": "keep-alive"
+        })
+
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self._first_token_latencies = deque(maxlen=200)
+        self._metrics = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "throttled": 0,
+            "in_flight": 0,
+            "status_counts": {}
+        }
+
+    def post_chat(self, payload, timeout=30, stream=False):
+        """
+        POST a chat-completions payload. `timeout` is the total budget in
+        seconds across all attempts (including time spent waiting for a
+        concurrency slot); returns the final requests.Response.
+        Raises requests exceptions once retries or the budget are exhausted.
+        """
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"DeepSeek call exceeded {timeout}s budget")
+
+            self._acquire_slot(deadline)
+            started = time.monotonic()
+            network_error = None
+            try:
+                remaining = max(0.001, deadline - time.monotonic())
+                response = self.session.post(
+                    self.api_url, json=payload, stream=stream,
+                    timeout=(min(self.connect_timeout, remaining), remaining)
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                network_error = e
+            finally:
+                self._release_slot()  # Streaming bodies are read after the slot is handed back
+
+            if network_error is not None:
+                self._record(None, time.monotonic() - started)
+                if attempt >= self.max_retries or not self._sleep_before_retry(attempt, deadline):
+                    raise network_error
+                attempt += 1
+                continue
+
+            self._record(response.status_code, time.monotonic() - started)
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                if self._sleep_before_retry(attempt, deadline, response.headers.get("Retry-After"), response):
+                    attempt += 1
+                    continue
+            return response
+
+    def stream_chat(self, payload, timeout=30):
+        """
+        Streaming chat completion: sends `"stream": true` and yields the
+        content deltas of the server-sent events as they arrive.
+        """
+        started = time.monotonic()
+        response = self.post_chat(dict(payload, stream=True), timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            first_token = True
+            for raw_line in response.iter_lines():
+                if not raw_line:
+                    continue
+                line = raw_line.decode("utf-8", errors="replace")
+                if not line.startswith("data:"):
+                    continue  # SSE comments / keep-alive pings
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                choices = chunk.get("choices") or []
+                content = (choices[0].get("delta") or {}).get("content") if choices else None
+                if content:
+                    if first_token:
+                        with self._lock:
+                            self._first_token_latencies.append(time.monotonic() - started)
+                        first_token = False
+                    yield content
+        finally:
+            response.close()
+
+    def _acquire_slot(self, deadline):
+        """Wait (within the call budget) for one of max_concurrency request slots"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._metrics["throttled"] += 1
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise requests.exceptions.Timeout("Timed out waiting for a DeepSeek concurrency slot")
+        with self._lock:
+            self._metrics["in_flight"] += 1
+
+    def _release_slot(self):
+        with self._lock:
+            self._metrics["in_flight"] -= 1
+        self._slots.release()
+
+    def _sleep_before_retry(self, attempt, deadline, retry_after=None, failed_response=None):
+        """Full-jitter exponential backoff; False if it would overrun the budget"""
+        try:
+            delay = float(retry_after) if retry_after else None
+        except ValueError:
+            delay = None
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if time.monotonic() + delay >= deadline:
+            return False
+        if failed_response is not None:
+            failed_response.close()  # Return the connection to the pool before waiting
+        with self._lock:
+            self._metrics["retries"] += 1
+        time.sleep(delay)
+        return True
+
+    def _record(self, status_code, latency):
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._latencies.append(latency)
+            key = str(status_code) if status_code is not None else "connection_error"
+            self._metrics["status_counts"][key] = self._metrics["status_counts"].get(key, 0) + 1
+            if status_code is None or status_code >= 400:
+                self._metrics["errors"] += 1
+
+    def metrics(self):
+        """Snapshot of request counts, status codes and latency percentiles (seconds)"""
+        with self._lock:
+            snapshot = dict(self._metrics, status_counts=dict(self._metrics["status_counts"]))
+            latencies = sorted(self._latencies)
+            first_tokens = list(self._first_token_latencies)
+        snapshot["time_to_first_token_avg"] = sum(first_tokens) / len(first_tokens) if first_tokens else 0.0
+        if latencies:
+            snapshot["latency_avg"] = sum(latencies) / len(latencies)
+            snapshot["latency_p50"] = latencies[len(latencies) // 2]
+            snapshot["latency_p95"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        else:
+            snapshot["latency_avg"] = snapshot["latency_p50"] = snapshot["latency_p95"] = 0.0
+        return snapshot
+
+@st.cache_resource
+def get_deepseek_client():
+    """Process-wide DeepSeek client (shared connection pool)"""
+    return DeepSeekClient(DEEPSEEK_API_URL, DEEPSEEK_API_KEY)
 
 # -------------------------
 # ENHANCED KAI - TRADING AI AGENT WITH DEEPSEEK INTEGRATION
@@ -990,6 +1180,14 @@ class DataQualityFramework:
         }
     }
 
+    # Keyword classes scored on the lower-cased Note column
+    NOTE_CLASS_PATTERNS = {
+        "confidence": 'confirmed|strong|major|certain|clear|probability|high confidence',
+        "bullish": 'bullish|up|buy|long|breakout|reversal',
+        "bearish": 'bearish|down|sell|short|decline|resistance',
+        "neutral": 'neutral|consolidat|sideways|ranging|indecis'
+    }
+
     @staticmethod
     def assess_quality(df, tier="PRODUCTION"):
         """
@@ -1001,9 +1199,11 @@ class DataQualityFramework:
 
         tier_config = DataQualityFramework.QUALITY_TIERS.get(tier, {})
 
-        # Calculate actual quality metrics
+        # Calculate actual quality metrics (vectorized - one normalized Note column)
         total_indicators = len(df)
-        indicators_with_notes = len(df[df['Note'].notna() & (df['Note'].str.len() > 0)])
+        notes = df['Note']
+        normalized = notes.str.lower()
+        indicators_with_notes = int((normalized.str.len() > 0).sum())
 
         # COMPLETENESS - % of indicators with notes
         completeness = (indicators_with_notes / total_indicators * 100) if total_indicators > 0 else 0
@@ -1011,16 +1211,11 @@ class DataQualityFramework:
         # ============================================================
         # ACCURACY - NOW BASED ON WORD COUNT (MAIN FACTOR)
         # ============================================================
-        # Count total words in all notes
-        total_words = 0
-        word_counts = []
-
-        for _, row in df.iterrows():
-            note = str(row.get('Note', ''))
-            if note and note.lower() != 'nan' and len(note.strip()) > 0:
-                word_count = len(note.split())
-                total_words += word_count
-                word_counts.append(word_count)
+        # Count total words in all notes (non-empty, non-"nan" notes only)
+        text = notes[notes.notna()].astype(str)
+        word_series = text[text.str.lower() != 'nan'].str.count(r'\S+')
+        word_counts = [int(count) for count in word_series[word_series > 0].tolist()]
+        total_words = sum(word_counts)
 
         # Calculate average words per note
         avg_words_per_note = total_words / indicators_with_notes if indicators_with_notes > 0 else 0
@@ -1028,19 +1223,23 @@ class DataQualityFramework:
         # Map average words to accuracy score using word thresholds
         accuracy = min(100, avg_words_per_note * 8.9)
 
+        # Vectorized keyword-class counts over the normalized column
+        note_classes = {
+            name: int(normalized.str.contains(pattern, na=False).sum())
+            for name, pattern in DataQualityFramework.NOTE_CLASS_PATTERNS.items()
+        }
+
         # Bonus: Add confidence keywords boost
-        strong_notes = len(df[
-            df['Note'].str.contains('confirmed|strong|major|certain|clear|probability|high confidence', case=False, na=False)
-        ])
+        strong_notes = note_classes['confidence']
         confidence_boost = (strong_notes / indicators_with_notes * 5) if indicators_with_notes > 0 else 0
         accuracy = min(100, accuracy + confidence_boost)
 
         # ============================================================
         # CONSISTENCY - how unified the signals are
         # ============================================================
-        bullish = len(df[df['Note'].str.contains('bullish|up|buy|long|breakout|reversal', case=False, na=False)])
-        bearish = len(df[df['Note'].str.contains('bearish|down|sell|short|decline|resistance', case=False, na=False)])
-        neutral = len(df[df['Note'].str.contains('neutral|consolidat|sideways|ranging|indecis', case=False, na=False)])
+        bullish = note_classes['bullish']
+        bearish = note_classes['bearish']
+        neutral = note_classes['neutral']
 
         total_directional = bullish + bearish + neutral
         if total_directional > 0:
@@ -1096,6 +1295,666 @@ class DataQualityFramework:
         else:
             return "🔴 CRITICAL"
 
+# -------------------------
+# KAI KEYWORD MATCHING ENGINE
+# -------------------------
+# Every keyword list KAI checks against indicator notes lives here, so one
+# compiled pattern can scan each note once and answer all phases.
+KAI_KEYWORD_CATEGORIES = {
+    # Reversal detection & scoring
+    "reversal": ['reversal', 'reverse', 'turnaround', 'revert', 'exhaustion', 'divergence'],
+    "reversal_strength": ['major', 'strong', 'probable', 'confirmed'],
+    "reversal_strong": ['major reversal', 'probable reversal', 'strong reversal', 'confirmed reversal'],
+    "reversal_medium": ['reversal', 'reverse', 'turnaround', 'exhaustion'],
+    "confluence": ['multiple', 'confluence'],
+
+    # Momentum direction
+    "bullish": ['bullish', 'breaking up', 'uptrend', 'buy', 'long', 'rally'],
+    "bearish": ['bearish', 'breaking down', 'downtrend', 'sell', 'short', 'decline'],
+    "momentum_strength": ['strong', 'powerful', 'accelerating'],
+
+    # Support / resistance
+    "support": ['support', 'holding', 'bounce', 'floor', 'demand'],
+    "support_extended": ['support', 'holding', 'bounce', 'floor', 'demand', 'base'],
+    "resistance": ['resistance', 'rejection', 'ceiling', 'supply', 'top'],
+    "resistance_extended": ['resistance', 'rejection', 'ceiling', 'supply', 'top', 'cap'],
+    "level_strength": ['strong', 'major', 'key'],
+    "level_strength_extended": ['strong', 'major', 'key', 'critical'],
+
+    # Volume
+    "volume": ['volume', 'volatility', 'liquidity'],
+    "volume_extended": ['volume', 'volatility', 'liquidity', 'participation'],
+    "volume_profile": ['high volume', 'increasing volume', 'low volume', 'decreasing volume', 'volume confirmation'],
+
+    # Breakouts
+    "breakout": ['breakout', 'breaking', 'crossing', 'above', 'below'],
+    "breakout_extended": ['breakout', 'breaking', 'crossing', 'above', 'below', 'through'],
+    "breakout_bullish": ['above', 'breaking up', 'bullish'],
+    "breakout_quality": ['confirmed breakout', 'breaking', 'crossing', 'potential breakout'],
+
+    # Divergence
+    "divergence": ['divergence', 'divergent', 'disagreement'],
+    "divergence_extended": ['divergence', 'divergent', 'disagreement', 'conflict'],
+    "divergence_type": ['bullish divergence', 'bearish divergence', 'hidden divergence'],
+
+    # Risk & confidence words
+    "high_risk": ['high risk', 'danger', 'caution', 'warning', 'uncertain'],
+    "confidence_words": ['confirmed', 'likely', 'probable', 'potential', 'possible', 'uncertain', 'maybe'],
+    "certainty_high": ['confirmed', 'definite', 'certain', 'clear'],
+    "certainty_medium": ['likely', 'probable', 'expected', 'should'],
+    "certainty_low": ['potential', 'possible', 'might', 'could'],
+    "uncertainty": ['uncertain', 'unclear', 'maybe', 'perhaps', 'possibly'],
+    "waiting": ['waiting', 'pending', 'monitor', 'watch'],
+    "timing_immediate": ['today', 'now', 'immediate', 'right now', 'this session'],
+    "timing_days": ['this week', 'next few days', 'coming days'],
+    "timing_weeks": ['next week', 'next month', 'coming weeks'],
+    "confirmation": ['confirmed by', 'supported by', 'multiple timeframes', 'confluence'],
+    "price_action": ['breaking', 'crossing', 'bouncing', 'rejecting'],
+
+    # Time horizons (Phase 3 keyword mapping, checked in this order)
+    "time_immediate": [
+        'now', 'immediate', 'today', 'intraday', 'right now', 'currently', 'asap',
+        'urgent', 'instant', 'momentum', 'breakout', 'breaking', 'now!', 'alert',
+        'today only', 'this session', 'current candle', 'next candle', 'vwap', 'volume delta',
+        'stoch rsi', 'rsi', 'macd', 'ao', 'atr', 'mfi', 'fisher'
+    ],
+    "time_short_term": [
+        'short term', 'this week', 'next few days', 'coming days', '1-7 days',
+        'few days', 'daily', 'day trade', 'overnight', 'swing', 'weekly',
+        'next week', 'weekend', 'friday', 'monday', 'week ahead', 'coming week',
+        'next 3 days', 'next 5 days', 'supertrend', 'ema', 'sma', 'bollinger',
+        'keltner', 'ichimoku', 'chart'
+    ],
+    "time_medium_term": [
+        'medium term', 'this month', 'next few weeks', '1-4 weeks', 'monthly',
+        'swing trade', 'intermediate', 'coming weeks', 'next month', 'month ahead',
+        'next 2 weeks', 'next 3 weeks', 'rest of month', 'month end', 'rainbow',
+        'alligator', 'pi cycle', 'sar', 'wick delta'
+    ],
+    "time_long_term": [
+        'long term', '2026', 'next year', 'months ahead', '1-6 months',
+        'quarterly', 'position trade', 'investment', 'hold', 'accumulate',
+        'next quarter', 'coming months', 'next 3 months', 'next 6 months',
+        'year ahead', '2025', 'future', 'long hold', 'log regression',
+        'monte carlo', 'mvrv', 'nvt', 'roc', 'z-score'
+    ],
+    # Note overrides used by indicator-based time classification
+    "horizon_hints": [
+        'now', 'today', 'immediate', 'intraday', 'next few hours', 'this hour',
+        'this week', 'few days', '1-7 days', 'next week', 'daily', 'swing',
+        'weeks', 'month', 'monthly', '1-4 weeks', 'months', 'quarter',
+        'long term', '1-6 months', 'annual'
+    ],
+}
+
+class KaiKeywordMatcher:
+    """
+    Single-pass keyword matcher for indicator notes.
+    All category keywords are compiled into one trie-shaped regex, so a note is
+    scanned once and every keyword it contains (substring semantics, same as
+    `keyword in note`) is returned together with the categories it hits.
+    """
+
+    # Columns build_match_table reads
+    TABLE_COLUMNS = ('Note', 'Strategy', 'Indicator', 'analysis_date', 'last_modified')
+
+    def __init__(self, categories):
+        self.categories = {name: frozenset(words) for name, words in categories.items()}
+        vocabulary = set()
+        for words in self.categories.values():
+            vocabulary.update(words)
+        self.vocabulary = frozenset(vocabulary)
+
+        # The regex reports the LONGEST keyword starting at each position;
+        # shorter keywords starting there are exactly its keyword prefixes.
+        self._prefixes = {
+            keyword: frozenset(other for other in vocabulary if keyword.startswith(other))
+            for keyword in vocabulary
+        }
+        self._pattern = re.compile("(?=(" + self._build_trie_pattern(vocabulary) + "))")
+
+    @staticmethod
+    def _build_trie_pattern(words):
+        """Build a regex from a character trie (greedy, so longest match wins)"""
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            if "" in node:
+                body = "(?:" + body + ")?"
+            return body
+
+        return build(trie)
+
+    def scan(self, text):
+        """Return every vocabulary keyword contained in an already lower-cased text"""
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._prefixes[match.group(1)])
+        return frozenset(found)
+
+    def categories_hit(self, keywords):
+        """Return the names of all categories touched by a keyword set"""
+        return frozenset(
+            name for name, words in self.categories.items() if not keywords.isdisjoint(words)
+        )
+
+    def has(self, keywords, category):
+        """True if any keyword of the given category is in the keyword set"""
+        return not keywords.isdisjoint(self.categories[category])
+
+    def fingerprint(self, df):
+        """
+        Cheap content hash of the columns (and index) build_match_table reads,
+        so a cached table is rebuilt after in-place edits; None if unhashable.
+        """
+        columns = [c for c in self.TABLE_COLUMNS if c in df.columns]
+        digest = hashlib.sha256(json.dumps([list(map(str, df.columns)), len(df)]).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(df[columns], index=True).to_numpy().tobytes())
+        except TypeError:
+            return None  # e.g. list cells - always rebuild
+        return digest.hexdigest()
+
+    def build_match_table(self, df):
+        """
+        Scan every non-empty note of a strategy DataFrame once.
+        Returns one record per note with the matched keywords and categories.
+        """
+        if 'Note' not in df.columns:
+            return []
+
+        def column_values(name, default):
+            return df[name].to_numpy() if name in df.columns else [default] * len(df)
+
+        notes = df['Note']
+        has_note = (notes.notna() & (notes != '')).to_numpy(dtype=bool)
+        note_values = notes.to_numpy()
+        strategies = column_values('Strategy', 'Unknown')
+        indicators = column_values('Indicator', 'Unknown')
+        if 'analysis_date' in df.columns:
+            timestamps = column_values('analysis_date', '')
+        else:
+            timestamps = column_values('last_modified', '')
+
+        table = []
+        for pos in np.flatnonzero(has_note):
+            raw_note = note_values[pos]
+            note_lower = str(raw_note).lower()
+            keywords = self.scan(note_lower)
+            table.append({
+                "index": df.index[pos],
+                "strategy": strategies[pos],
+                "indicator": indicators[pos],
+                "timestamp": timestamps[pos],
+                "note": raw_note,
+                "note_lower": note_lower,
+                "keywords": keywords,
+                "categories": self.categories_hit(keywords)
+            })
+        return table
+
+@st.cache_resource
+def get_kai_keyword_matcher():
+    """Shared keyword matcher - compiled once per process"""
+    return KaiKeywordMatcher(KAI_KEYWORD_CATEGORIES)
+
+# -------------------------
+# KAI ANALYSIS RESULT CACHE
+# -------------------------
+import copy
+import threading
+from collections import OrderedDict
+
+KAI_ANALYSIS_CACHE_MAX_ENTRIES = 32
+KAI_ANALYSIS_CACHE_TTL_SECONDS = 6 * 60 * 60  # 6 hours
+
+class KaiAnalysisCache:
+    """
+    Bounded LRU + TTL cache for analyze_strategy_data results.
+    Keyed by a stable content hash of the uploaded DataFrame plus the analysis
+    inputs (including the price_memory record the DeepSeek prompt quotes, so
+    uploading new weekly closes changes the key), shared by all sessions of the process and optionally persisted to
+    a JSON file so re-runs survive an app restart.
+    """
+
+    def __init__(self, max_entries=KAI_ANALYSIS_CACHE_MAX_ENTRIES,
+                 ttl_seconds=KAI_ANALYSIS_CACHE_TTL_SECONDS, persist_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._entries = OrderedDict()  # key -> (stored_at, analysis)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load_from_disk()
+
+    @staticmethod
+    def make_key(df, quality_tier, manual_asset, manual_price, use_deepseek, price_memory=None):
+        """Stable content hash of the normalized DataFrame + analysis inputs (price_memory: previous weekly close row)"""
+        normalized = df.copy()
+        normalized.columns = [str(col).strip() for col in normalized.columns]
+        normalized = normalized.reset_index(drop=True)
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([list(normalized.columns), [str(t) for t in normalized.dtypes]]).encode())
+        digest.update(pd.util.hash_pandas_object(normalized, index=False).to_numpy().tobytes())
+        digest.update(json.dumps([
+            quality_tier, str(manual_asset).upper(), f"{float(manual_price or 0):.8f}", bool(use_deepseek),
+            price_memory
+        ], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached analysis, or None on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, analysis = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(analysis)
+
+    def put(self, key, analysis):
+        """Store an analysis, evicting expired and least-recently-used entries"""
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(analysis))
+            self._entries.move_to_end(key)
+            self._evict_locked()
+            self._save_to_disk_locked()
+
+    def invalidate(self, key=None):
+        """Drop one entry, or the whole cache when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._save_to_disk_locked()
+
+    def stats(self):
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _evict_locked(self):
+        now = time.time()
+        for key in [k for k, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl_seconds]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            for key, stored_at, analysis in stored:
+                self._entries[key] = (stored_at, analysis)
+            self._evict_locked()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"KAI analysis cache not loaded: {e}")
+            self._entries.clear()
+
+    def _save_to_disk_locked(self):
+        if not self.persist_path:
+            return
+        stored = []
+        for key, (stored_at, analysis) in self._entries.items():
+            try:
+                json.dumps(analysis)
+            except (TypeError, ValueError):
+                continue  # Only JSON-safe analyses are persisted
+            stored.append([key, stored_at, analysis])
+        try:
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"KAI analysis cache not persisted: {e}")
+
+@st.cache_resource
+def get_kai_analysis_cache():
+    """Process-wide analysis cache (disk persistence via KAI_ANALYSIS_CACHE_PATH secret)"""
+    return KaiAnalysisCache(persist_path=st.secrets.get("KAI_ANALYSIS_CACHE_PATH"))
+
+# -------------------------
+# KAI LONG-TERM MEMORY CONTEXT CACHE
+# -------------------------
+KAI_MEMORY_CONTEXT_CHECK_SECONDS = 30  # How often a cached context re-reads the latest analysis id
+
+class KaiMemoryContextCache:
+    """
+    Holds the cleaned "last analysis" context KAI injects into every chat turn,
+    for the analysis id it was built from. This process drops it whenever an
+    analysis is saved or deleted; analyses saved by other processes are noticed
+    by re-reading just the latest id at most every check_seconds. A generation
+    counter stops a load that straddles an invalidate() from storing the old
+    context. Live spot prices come from the SpotPriceService.
+    """
+
+    def __init__(self, check_seconds=KAI_MEMORY_CONTEXT_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._context = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_context(self, latest=None):
+        """
+        (context dict or None if it must be (re)loaded, generation to pass to
+        set_context). latest() returns the newest analysis row ({} if there is
+        none, None if the read failed); without it the context expires after
+        check_seconds.
+        """
+        with self._lock:
+            context, generation, checked_at = self._context, self._generation, self._checked_at
+        if context is None:
+            return None, generation
+        if time.time() - checked_at > self.check_seconds:
+            row = latest() if latest else None
+            if row is None or row.get("id") != context.get("analysis_id"):
+                return None, generation
+            with self._lock:
+                if self._generation == generation:
+                    self._checked_at = time.time()
+        return dict(context), generation
+
+    def set_context(self, context, generation):
+        """Store context loaded since get_context() returned generation -> False if invalidated meanwhile"""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._context = dict(context)
+            self._checked_at = time.time()
+            return True
+
+    def invalidate(self):
+        """Forget the memory context (called whenever kai_analyses changes)"""
+        with self._lock:
+            self._context = None
+            self._generation += 1
+
+@st.cache_resource
+def get_kai_memory_context_cache():
+    """Process-wide KAI memory context cache"""
+    return KaiMemoryContextCache()
+
+# -------------------------
+# SHARED SPOT PRICE SERVICE
+# -------------------------
+try:
+    import ccxt
+    CCXT_AVAILABLE = True
+except ImportError:
+    ccxt = None
+    CCXT_AVAILABLE = False
+
+SPOT_PRICE_TTL_SECONDS = 30                 # Served as fresh inside this window
+SPOT_PRICE_STALE_MAX_SECONDS = 10 * 60      # Served stale (while refreshing) up to this age
+SPOT_PRICE_REFRESH_INTERVAL_SECONDS = 20    # Background refresh cadence for watched symbols
+SPOT_PRICE_WATCH_IDLE_SECONDS = 15 * 60     # Stop refreshing symbols nobody asked for in this window
+
+class CoinbaseSpotFeed:
+    """Coinbase public spot endpoint (one pooled request per symbol)"""
+
+    name = "coinbase"
+
+    def __init__(self, quote="USD", timeout=2):
+        self.quote = quote
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def fetch(self, symbols):
+        prices = {}
+        for symbol in symbols:
+            try:
+                url = f"https://api.coinbase.com/v2/prices/{symbol}-{self.quote}/spot"
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code == 200:
+                    prices[symbol] = float(response.json()['data']['amount'])
+            except Exception as e:
+                logging.warning(f"Coinbase spot fetch failed for {symbol}: {e}")
+        return prices
+
+class CcxtSpotFeed:
+    """Multi-symbol tickers through ccxt - one fetch_tickers call per batch"""
+
+    def __init__(self, exchange_id="coinbase", quote="USD", timeout=2):
+        if not CCXT_AVAILABLE:
+            raise ImportError("ccxt is not installed")
+        self.name = f"ccxt:{exchange_id}"
+        self.quote = quote
+        self.exchange = getattr(ccxt, exchange_id)({"enableRateLimit": True, "timeout": int(timeout * 1000)})
+
+    def fetch(self, symbols):
+        markets = {f"{symbol}/{self.quote}": symbol for symbol in symbols}
+        if self.exchange.has.get("fetchTickers"):
+            tickers = self.exchange.fetch_tickers(list(markets))
+        else:
+            tickers = {}
+            for market in markets:
+                try:
+                    tickers[market] = self.exchange.fetch_ticker(market)
+                except Exception as e:
+                    logging.warning(f"ccxt ticker fetch failed for {market}: {e}")
+        prices = {}
+        for market, ticker in tickers.items():
+            last = ticker.get("last") or ticker.get("close")
+            if market in markets and last is not None:
+                prices[markets[market]] = float(last)
+        return prices
+
+class FakeSpotFeed:
+    """In-memory feed for tests and offline runs - records every batch it is asked for"""
+
+    name = "fake"
+
+    def __init__(self, prices=None, delay=0.0):
+        self.prices = {str(k).upper(): float(v) for k, v in (prices or {}).items()}
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def set_price(self, symbol, price):
+        with self._lock:
+            self.prices[str(symbol).upper()] = float(price)
+
+    def fetch(self, symbols):
+        with self._lock:
+            self.calls.append(list(symbols))
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            return {s: self.prices[s] for s in symbols if s in self.prices}
+
+class SpotPriceService:
+    """
+    Process-wide spot price cache shared by every session.
+
+    - Fresh values (< ttl) are served straight from memory.
+    - Stale values (< stale_max) are served immediately while one background
+      refresh runs (stale-while-revalidate).
+    - Concurrent misses for the same symbol collapse into a single feed call.
+    - A background thread refreshes recently requested symbols in one batch.
+    """
+
+    def __init__(self, feed, ttl_seconds=SPOT_PRICE_TTL_SECONDS,
+                 stale_max_seconds=SPOT_PRICE_STALE_MAX_SECONDS,
+                 refresh_interval=SPOT_PRICE_REFRESH_INTERVAL_SECONDS,
+                 watch_idle_seconds=SPOT_PRICE_WATCH_IDLE_SECONDS):
+        self.feed = feed
+        self.ttl_seconds = ttl_seconds
+        self.stale_max_seconds = stale_max_seconds
+        self.refresh_interval = refresh_interval
+        self.watch_idle_seconds = watch_idle_seconds
+        self._prices = {}          # symbol -> (fetched_at, price)
+        self._failed_at = {}       # symbol -> last failed fetch (negative cache for ttl)
+        self._inflight = {}        # symbol -> threading.Event
+        self._last_requested = {}  # symbol -> last time a caller asked for it
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+                       "feed_calls": 0, "feed_errors": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    # ---- lifecycle ----
+    def start(self):
+        """Start the background refresher (idempotent)"""
+        if self.refresh_interval and (self._refresher is None or not self._refresher.is_alive()):
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="spot-price-refresher", daemon=True)
+            self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- reads ----
+    def get_price(self, symbol, wait_timeout=3.0):
+        """Spot price for one symbol in the feed's quote currency, or None"""
+        symbol = str(symbol).upper()
+        return self.get_prices([symbol], wait_timeout=wait_timeout).get(symbol)
+
+    def get_prices(self, symbols, wait_timeout=3.0):
+        """Spot prices for several symbols; missing symbols are fetched in one batch"""
+        symbols = list(dict.fromkeys(str(s).upper() for s in symbols))
+        result, to_fetch, to_wait, revalidate = {}, [], [], []
+        now = time.time()
+
+        with self._lock:
+            for symbol in symbols:
+                self._last_requested[symbol] = now
+                entry = self._prices.get(symbol)
+                age = now - entry[0] if entry else None
+
+                if entry and age <= self.ttl_seconds:
+                    result[symbol] = entry[1]
+                    self._stats["hits"] += 1
+                elif entry and age <= self.stale_max_seconds:
+                    result[symbol] = entry[1]
+                    self._stats["stale_hits"] += 1
+                    if symbol not in self._inflight:
+                        self._inflight[symbol] = threading.Event()
+                        revalidate.append(symbol)
+                elif symbol in self._inflight:
+                    to_wait.append((symbol, self._inflight[symbol]))
+                    self._stats["coalesced"] += 1
+                elif now - self._failed_at.get(symbol, 0.0) <= self.ttl_seconds:
+                    result[symbol] = None  # Feed just failed for it - don't stall every caller
+                else:
+                    self._inflight[symbol] = threading.Event()
+                    to_fetch.append(symbol)
+                    self._stats["misses"] += 1
+
+        if revalidate:
+            threading.Thread(target=self._fetch, args=(revalidate,), daemon=True).start()
+        if to_fetch:
+            self._fetch(to_fetch)
+        for _, event in to_wait:
+            event.wait(wait_timeout)
+
+        if to_fetch or to_wait:
+            with self._lock:
+                for symbol in to_fetch + [s for s, _ in to_wait]:
+                    entry = self._prices.get(symbol)
+                    result[symbol] = entry[1] if entry else None
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["symbols"] = len(self._prices)
+            stats["watched"] = len(self._last_requested)
+            stats["feed"] = getattr(self.feed, "name", type(self.feed).__name__)
+            return stats
+
+    # ---- internals ----
+    def _fetch(self, symbols):
+        """Single feed call for a batch; always releases the in-flight markers"""
+        prices = {}
+        try:
+            prices = self.feed.fetch(symbols) or {}
+        except Exception as e:
+            logging.warning(f"Spot price feed error for {symbols}: {e}")
+        finally:
+            now = time.time()
+            with self._lock:
+                self._stats["feed_calls"] += 1
+                for symbol in symbols:
+                    price = prices.get(symbol)
+                    if price is not None:
+                        self._prices[symbol] = (now, float(price))
+                        self._failed_at.pop(symbol, None)
+                    else:
+                        self._failed_at[symbol] = now
+                        self._stats["feed_errors"] += 1
+                    event = self._inflight.pop(symbol, None)
+                    if event:
+                        event.set()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            now = time.time()
+            with self._lock:
+                for symbol, requested_at in list(self._last_requested.items()):
+                    if now - requested_at > self.watch_idle_seconds:
+                        del self._last_requested[symbol]
+                due = [
+                    s for s in self._last_requested
+                    if s not in self._inflight
+                    and (s not in self._prices or now - self._prices[s][0] >= self.refresh_interval)
+                ]
+                for symbol in due:
+                    self._inflight[symbol] = threading.Event()
+            if due:
+                self._fetch(due)
+
+def build_spot_price_feed(feed_name=None):
+    """Feed factory: 'coinbase' (default), 'ccxt' or 'fake' (SPOT_PRICE_FEED secret)"""
+    feed_name = (feed_name or st.secrets.get("SPOT_PRICE_FEED", "coinbase")).lower()
+    if feed_name == "fake":
+        return FakeSpotFeed(st.secrets.get("SPOT_PRICE_FAKE_PRICES", {}))
+    if feed_name == "ccxt":
+        if CCXT_AVAILABLE:
+            return CcxtSpotFeed(exchange_id=st.secrets.get("SPOT_PRICE_CCXT_EXCHANGE", "coinbase"))
+        logging.warning("SPOT_PRICE_FEED=ccxt but ccxt is not installed - falling back to Coinbase")
+    return CoinbaseSpotFeed()
+
+@st.cache_resource
+def get_spot_price_service():
+    """Process-wide spot price service (one cache + refresher for all sessions)"""
+    return SpotPriceService(build_spot_price_feed()).start()
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+KAI_PIPELINE_MAX_WORKERS = 4  # quality + phases 1-3 run side by side
+KAI_BATCH_MAX_WORKERS = 3     # Concurrent jobs in analyze_batch (DeepSeek is capped separately)
+KAI_BATCH_ASSET_COLUMNS = ["Asset", "asset", "Symbol", "symbol", "Ticker", "ticker"]
+
 class EnhancedKaiTradingAgent:
     def __init__(self, use_deepseek=True):
         self.character = KAI_CHARACTER
@@ -1103,6 +1962,18 @@ class EnhancedKaiTradingAgent:
         self.analysis_patterns = self._initialize_analysis_patterns()
         self.deepseek_prompts = self._initialize_deepseek_prompts()
 
+        # Shared keyword engine + per-DataFrame match table (scanned once per analysis)
+        self.keyword_matcher = get_kai_keyword_matcher()
+        self._match_table_key = None
+        self._match_table = []
+        self._match_table_lock = threading.Lock()
+
+        # Wall-clock seconds per step of the most recent analyze_strategy_data call
+        self.last_phase_timings = {}
+
+        # asset -> previous weekly close read during the current analysis (cache key + DeepSeek prompt)
+        self._price_memory = {}
+
         # Setup logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
@@ -1281,109 +2152,123 @@ class EnhancedKaiTradingAgent:
             self.logger.error(f"Memory recall error: {e}")
             return None
 
+    def _recall_price_memory(self, asset):
+        """get_previous_weekly_close, read once per analyze_strategy_data call"""
+        if asset not in self._price_memory:
+            self._price_memory[asset] = self.get_previous_weekly_close(asset)
+        return self._price_memory[asset]
+
     def get_live_price(self, asset):
-        """Helper: Fetches real-time price from Coinbase Public API"""
-        import requests
-        try:
-            # Default to USD pair
-            ticker = f"{str(asset).upper()}-USD"
-            url = f"https://api.coinbase.com/v2/prices/{ticker}/spot"
-            
-            # Fast timeout so it doesn't slow down the chat
-            response = requests.get(url, timeout=2)
-            
-            if response.status_code == 200:
-                return float(response.json()['data']['amount'])
-            return None
-        except Exception:
-            return None
+        """Helper: Real-time USD spot price from the shared SpotPriceService (None if unavailable)"""
+        return get_spot_price_service().get_price(asset)
 
-    def get_last_analysis_summary(self):
-        """Fetch the most recent KAI analysis - NOW INCLUDES LIVE PRICE & MEMORY"""
+    def _load_memory_context(self):
+        """Fetch + clean the latest analysis once; reused until a new analysis is saved"""
         import re
+
+        memory = get_kai_memory_context_cache()
+        context, generation = memory.get_context(latest=supabase_get_latest_kai_analysis_id)
+        if context is not None:
+            return context
+
+        # Fetch the latest 1 record
+        response = (
+            supabase_client.table('kai_analyses')
+            .select('id, analysis_data, created_at')
+            .order('created_at', desc=True)
+            .limit(1)
+            .execute()
+        )
+
+        if not response.data:
+            context = {"analysis_id": None}
+            memory.set_context(context, generation)
+            return context
+
+        record = response.data[0]
+        data = record['analysis_data']
+
+        # 1. Get raw summary
+        raw_summary = data.get('executive_summary', 'No summary available.')
         
+        # 2. Clean it (DeepSeek label removal)
+        pattern = r"(?:🧠|:brain:)?\s*(?:\*\*|__)?\s*DeepSeek\s+Enhanced\s*(?::)?\s*(?:\*\*|__)?\s*"
+        summary = re.sub(pattern, "", raw_summary, flags=re.IGNORECASE).strip()
+        summary = summary.lstrip(": -")
+
+        # 3. Process findings
+        findings = data.get('key_findings', [])
+        clean_findings = []
+        if isinstance(findings, list):
+            for f in findings:
+                clean_findings.append(str(f).replace("🧠", "").strip())
+            findings_str = "; ".join(clean_findings)
+        else:
+            findings_str = str(findings).replace("🧠", "").strip()
+
+        context = {
+            "analysis_id": record.get('id'),
+            "date_str": record['created_at'].split('T')[0],
+            "asset": data.get('asset_context', 'ETH'),
+            "saved_price": data.get('price_context', 0.0),
+            "summary": summary,
+            "findings_str": findings_str
+        }
+        memory.set_context(context, generation)
+        return context
+
+    def get_last_analysis_summary(self):
+        """Fetch the most recent KAI analysis - NOW INCLUDES LIVE PRICE & MEMORY"""
         try:
             # Check if global client exists
             if 'supabase_client' not in globals() or not supabase_client:
                 return "My memory banks are currently unreachable."
 
-            # Fetch the latest 1 record
-            response = (
-                supabase_client.table('kai_analyses')
-                .select('analysis_data, created_at')
-                .order('created_at', desc=True)
-                .limit(1)
-                .execute()
-            )
-
-            if response.data and len(response.data) > 0:
-                data = response.data[0]['analysis_data']
-                date_str = response.data[0]['created_at'].split('T')[0]
-                
-                # --- EXTRACT CONTEXT ---
-                asset = data.get('asset_context', 'ETH')
-                saved_price = data.get('price_context', 0.0)
-                
-                # --- NEW: LIVE PRICE LOGIC ---
-                # 1. Try to get the real-time price
-                live_price = self.get_live_price(asset)
-                
-                if live_price:
-                    # Calculate % change from the report date
-                    change_text = ""
-                    if saved_price and float(saved_price) > 0:
-                        pct = ((live_price - float(saved_price)) / float(saved_price)) * 100
-                        change_text = f"({pct:+.2f}% since report)"
-                    
-                    # KAI gets the LIVE price as the primary fact
-                    fact_line = f"REAL-TIME PRICE: **{live_price:,.2f} USD** {change_text}. (Report Reference: {saved_price} USD)"
-                else:
-                    # Fallback to the saved price if API fails
-                    if saved_price and float(saved_price) > 0:
-                        fact_line = f"REFERENCE PRICE: The last Weekly Close for {asset} was **{saved_price} USD**."
-                    else:
-                        fact_line = f"REFERENCE ASSET: {asset} (Price not specified)."
+            context = self._load_memory_context()
+            if context.get("analysis_id") is None:
+                return "No prior analysis found in memory."
 
-                # 1. Get raw summary
-                raw_summary = data.get('executive_summary', 'No summary available.')
+            # --- EXTRACT CONTEXT ---
+            asset = context['asset']
+            saved_price = context['saved_price']
+            
+            # --- NEW: LIVE PRICE LOGIC ---
+            # 1. Try to get the real-time price
+            live_price = self.get_live_price(asset)
+            
+            if live_price:
+                # Calculate % change from the report date
+                change_text = ""
+                if saved_price and float(saved_price) > 0:
+                    pct = ((live_price - float(saved_price)) / float(saved_price)) * 100
+                    change_text = f"({pct:+.2f}% since report)"
                 
-                # 2. Clean it (DeepSeek label removal)
-                pattern = r"(?:🧠|:brain:)?\s*(?:\*\*|__)?\s*DeepSeek\s+Enhanced\s*(?::)?\s*(?:\*\*|__)?\s*"
-                summary = re.sub(pattern, "", raw_summary, flags=re.IGNORECASE).strip()
-                summary = summary.lstrip(": -")
-
-                # 3. Process findings
-                findings = data.get('key_findings', [])
-                clean_findings = []
-                if isinstance(findings, list):
-                    for f in findings:
-                        clean_findings.append(str(f).replace("🧠", "").strip())
-                    findings_str = "; ".join(clean_findings)
+                # KAI gets the LIVE price as the primary fact
+                fact_line = f"REAL-TIME PRICE: **{live_price:,.2f} USD** {change_text}. (Report Reference: {saved_price} USD)"
+            else:
+                # Fallback to the saved price if API fails
+                if saved_price and float(saved_price) > 0:
+                    fact_line = f"REFERENCE PRICE: The last Weekly Close for {asset} was **{saved_price} USD**."
                 else:
-                    findings_str = str(findings).replace("🧠", "").strip()
-                
-                # 4. Construct the "Brain Injection" text
-                response_text = (
-                    f"[{fact_line}]\n"
-                    f"ANALYSIS DATE: {date_str}\n\n"
-                    f"SUMMARY:\n\"{summary}\"\n\n"
-                    f"KEY LEVELS & FINDINGS:\n{findings_str}"
-                )
-                
-                return response_text
+                    fact_line = f"REFERENCE ASSET: {asset} (Price not specified)."
+
+            # 4. Construct the "Brain Injection" text
+            response_text = (
+                f"[{fact_line}]\n"
+                f"ANALYSIS DATE: {context['date_str']}\n\n"
+                f"SUMMARY:\n\"{context['summary']}\"\n\n"
+                f"KEY LEVELS & FINDINGS:\n{context['findings_str']}"
+            )
             
-            return "No prior analysis found in memory."
+            return response_text
             
         except Exception as e:
             if hasattr(self, 'logger'):
                 self.logger.error(f"Memory error: {e}")
             return f"Memory retrieval error: {e}"
 
-    def chat_with_kai(self, user_message, history):
-        """Interactive Chat with Auto-Context Injection"""
-        if not self.use_deepseek:
-            return "I am currently offline (DeepSeek API disabled)."
-            
+    def _build_chat_messages(self, user_message, history):
+        """System prompt with long-term memory + recent history + the new message"""
         # 1. Retrieve Long-Term Memory (Last Analysis)
         last_analysis = self.get_last_analysis_summary()
         
@@ -1399,22 +2284,56 @@ class EnhancedKaiTradingAgent:
             messages.append({"role": msg["role"], "content": msg["content"]})
             
         messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def chat_with_kai(self, user_message, history):
+        """Interactive Chat with Auto-Context Injection"""
+        if not self.use_deepseek:
+            return "I am currently offline (DeepSeek API disabled)."
+            
+        messages = self._build_chat_messages(user_message, history)
         
         try:
-            headers = {"Content-Type": "application/json", "Authorization": f"Bearer {DEEPSEEK_API_KEY}"}
             payload = {
                 "model": "deepseek-chat", 
                 "messages": messages, 
                 "temperature": 0.7,
                 "max_tokens": 500
             }
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=20)
+            response = get_deepseek_client().post_chat(payload, timeout=20)
             if response.status_code == 200:
                 return response.json()['choices'][0]['message']['content']
             return "Connection error with KAI's brain."
         except Exception as e:
             return f"Error: {e}"
 
+    def chat_with_kai_stream(self, user_message, history):
+        """Streaming chat - yields KAI's reply in chunks as DeepSeek produces them"""
+        if not self.use_deepseek:
+            yield "I am currently offline (DeepSeek API disabled)."
+            return
+
+        messages = self._build_chat_messages(user_message, history)
+        payload = {
+            "model": "deepseek-chat",
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+
+        received_any = False
+        try:
+            for chunk in get_deepseek_client().stream_chat(payload, timeout=20):
+                received_any = True
+                yield chunk
+            if not received_any:
+                yield "Connection error with KAI's brain."
+        except requests.exceptions.HTTPError:
+            if not received_any:
+                yield "Connection error with KAI's brain."
+        except Exception as e:
+            yield f"Error: {e}"
+
     # =========================================================
     # END NEW FEATURES
     # =========================================================
@@ -1426,11 +2345,6 @@ class EnhancedKaiTradingAgent:
             return None
 
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-            }
-
             payload = {
                 "model": "deepseek-chat",
                 "messages": [
@@ -1448,7 +2362,7 @@ class EnhancedKaiTradingAgent:
                 "stream": False
             }
 
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=30)
+            response = get_deepseek_client().post_chat(payload, timeout=30)
             response.raise_for_status()
 
             result = response.json()
@@ -1597,24 +2511,36 @@ class EnhancedKaiTradingAgent:
 
         return {"signals": signals, "metrics": signal_metrics}
 
+    def _get_match_table(self, df):
+        """Keyword match table for df - built once and reused by every phase"""
+        with self._match_table_lock:  # Pipeline phases may ask for it concurrently
+            key = self.keyword_matcher.fingerprint(df)
+            if key is None or key != self._match_table_key:
+                self._match_table = self.keyword_matcher.build_match_table(df)
+                self._match_table_key = key
+            return self._match_table
+
+    def _note_keywords(self, note, keywords=None):
+        """Matched keywords for a single note (scans only if not precomputed)"""
+        if keywords is not None:
+            return keywords
+        return self.keyword_matcher.scan(str(note).lower())
+
     def _extract_reversal_signals(self, df):
         """Extract potential reversal signals from data"""
-        reversal_keywords = ['reversal', 'reverse', 'turnaround', 'revert', 'exhaustion', 'divergence']
+        matcher = self.keyword_matcher
         reversals = []
 
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
-
-            note = str(row.get('Note', '')).lower()
-            if any(keyword in note for keyword in reversal_keywords):
+        for match in self._get_match_table(df):
+            if "reversal" in match["categories"]:
+                keywords = match["keywords"]
                 reversal_data = {
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "strength": "HIGH" if any(word in note for word in ['major', 'strong', 'probable', 'confirmed']) else "MEDIUM",
-                    "score": self._calculate_reversal_score(note, row.get('Indicator', '')),
-                    "timestamp": row.get('analysis_date', row.get('last_modified', ''))
+                    "strategy": match["strategy"],
+                    "indicator": match["indicator"],
+                    "note": match["note"],
+                    "strength": "HIGH" if matcher.has(keywords, "reversal_strength") else "MEDIUM",
+                    "score": self._calculate_reversal_score(match["note_lower"], match["indicator"], keywords),
+                    "timestamp": match["timestamp"]
                 }
                 reversals.append(reversal_data)
 
@@ -1624,60 +2550,43 @@ class EnhancedKaiTradingAgent:
         """Extract momentum signals from data"""
         momentum_signals = {"bullish": [], "bearish": [], "neutral": []}
 
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
-
-            note = str(row.get('Note', '')).lower()
-
-            if any(word in note for word in ['bullish', 'breaking up', 'uptrend', 'buy', 'long', 'rally']):
-                momentum_signals["bullish"].append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "confidence": self._calculate_confidence_score(note)
-                })
-            elif any(word in note for word in ['bearish', 'breaking down', 'downtrend', 'sell', 'short', 'decline']):
-                momentum_signals["bearish"].append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "confidence": self._calculate_confidence_score(note)
-                })
+        for match in self._get_match_table(df):
+            if "bullish" in match["categories"]:
+                direction = "bullish"
+            elif "bearish" in match["categories"]:
+                direction = "bearish"
             else:
-                momentum_signals["neutral"].append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "confidence": self._calculate_confidence_score(note)
-                })
+                direction = "neutral"
+
+            momentum_signals[direction].append({
+                "strategy": match["strategy"],
+                "indicator": match["indicator"],
+                "note": match["note"],
+                "confidence": self._calculate_confidence_score(match["note_lower"], match["keywords"])
+            })
 
         return momentum_signals
 
     def _extract_support_resistance(self, df):
         """Extract support and resistance levels"""
         levels = {"support": [], "resistance": []}
-        level_keywords = {
-            "support": ['support', 'holding', 'bounce', 'floor', 'demand', 'base'],
-            "resistance": ['resistance', 'rejection', 'ceiling', 'supply', 'top', 'cap']
+        level_categories = {
+            "support": "support_extended",
+            "resistance": "resistance_extended"
         }
 
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
-
-            note = str(row.get('Note', '')).lower()
-
-            for level_type, keywords in level_keywords.items():
-                if any(keyword in note for keyword in keywords):
+        for match in self._get_match_table(df):
+            note = match["note_lower"]
+            for level_type, category in level_categories.items():
+                if category in match["categories"]:
                     level_data = {
-                        "strategy": row.get('Strategy', 'Unknown'),
-                        "indicator": row.get('Indicator', 'Unknown'),
-                        "note": row.get('Note', ''),
+                        "strategy": match["strategy"],
+                        "indicator": match["indicator"],
+                        "note": match["note"],
                         "level": level_type.upper(),
-                        "strength": "STRONG" if any(word in note for word in ['strong', 'major', 'key', 'critical']) else "MODERATE",
+                        "strength": "STRONG" if "level_strength_extended" in match["categories"] else "MODERATE",
                         "price_level": self._extract_price_level(note),
-                        "confidence": self._calculate_confidence_score(note)
+                        "confidence": self._calculate_confidence_score(note, match["keywords"])
                     }
                     levels[level_type].append(level_data)
 
@@ -1686,20 +2595,15 @@ class EnhancedKaiTradingAgent:
     def _extract_volume_signals(self, df):
         """Extract volume-based signals"""
         volume_signals = []
-        volume_keywords = ['volume', 'volatility', 'liquidity', 'participation']
-
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
 
-            note = str(row.get('Note', '')).lower()
-            if any(keyword in note for keyword in volume_keywords):
+        for match in self._get_match_table(df):
+            if "volume_extended" in match["categories"]:
                 volume_signals.append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "type": self._classify_volume_signal(note),
-                    "score": self._calculate_volume_score(note)
+                    "strategy": match["strategy"],
+                    "indicator": match["indicator"],
+                    "note": match["note"],
+                    "type": self._classify_volume_signal(match["note_lower"], match["keywords"]),
+                    "score": self._calculate_volume_score(match["note_lower"], match["keywords"])
                 })
 
         return volume_signals
@@ -1707,20 +2611,15 @@ class EnhancedKaiTradingAgent:
     def _extract_breakout_signals(self, df):
         """Extract breakout signals"""
         breakout_signals = []
-        breakout_keywords = ['breakout', 'breaking', 'crossing', 'above', 'below', 'through']
-
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
 
-            note = str(row.get('Note', '')).lower()
-            if any(keyword in note for keyword in breakout_keywords):
+        for match in self._get_match_table(df):
+            if "breakout_extended" in match["categories"]:
                 breakout_signals.append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "direction": "BULLISH" if any(word in note for word in ['above', 'breaking up', 'bullish']) else "BEARISH",
-                    "confidence": self._calculate_confidence_score(note)
+                    "strategy": match["strategy"],
+                    "indicator": match["indicator"],
+                    "note": match["note"],
+                    "direction": "BULLISH" if "breakout_bullish" in match["categories"] else "BEARISH",
+                    "confidence": self._calculate_confidence_score(match["note_lower"], match["keywords"])
                 })
 
         return breakout_signals
@@ -1728,31 +2627,27 @@ class EnhancedKaiTradingAgent:
     def _extract_divergence_signals(self, df):
         """Extract divergence signals"""
         divergence_signals = []
-        divergence_keywords = ['divergence', 'divergent', 'disagreement', 'conflict']
-
-        for _, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
 
-            note = str(row.get('Note', '')).lower()
-            if any(keyword in note for keyword in divergence_keywords):
+        for match in self._get_match_table(df):
+            if "divergence_extended" in match["categories"]:
                 divergence_signals.append({
-                    "strategy": row.get('Strategy', 'Unknown'),
-                    "indicator": row.get('Indicator', 'Unknown'),
-                    "note": row.get('Note', ''),
-                    "type": self._classify_divergence(note),
-                    "confidence": self._calculate_confidence_score(note)
+                    "strategy": match["strategy"],
+                    "indicator": match["indicator"],
+                    "note": match["note"],
+                    "type": self._classify_divergence(match["note_lower"], match["keywords"]),
+                    "confidence": self._calculate_confidence_score(match["note_lower"], match["keywords"])
                 })
 
         return divergence_signals
 
-    def _classify_volume_signal(self, note):
+    def _classify_volume_signal(self, note, keywords=None):
         """Classify volume signal type"""
-        if 'high volume' in note or 'increasing volume' in note:
+        keywords = self._note_keywords(note, keywords)
+        if 'high volume' in keywords or 'increasing volume' in keywords:
             return "HIGH_VOLUME"
-        elif 'low volume' in note or 'decreasing volume' in note:
+        elif 'low volume' in keywords or 'decreasing volume' in keywords:
             return "LOW_VOLUME"
-        elif 'volume confirmation' in note:
+        elif 'volume confirmation' in keywords:
             return "CONFIRMATION"
         else:
             return "GENERAL_VOLUME"
@@ -1832,10 +2727,9 @@ class EnhancedKaiTradingAgent:
         }
 
         # Count high risk indicators
-        for _, row in df.iterrows():
-            note = str(row.get('Note', '')).lower()
-            if any(word in note for word in ['high risk', 'danger', 'caution', 'warning', 'uncertain']):
-                risk_factors["high_risk_indicators"] += 1
+        risk_factors["high_risk_indicators"] = sum(
+            1 for match in self._get_match_table(df) if "high_risk" in match["categories"]
+        )
 
         # Count incomplete analyses
         if 'Status' in df.columns:
@@ -1895,21 +2789,14 @@ class EnhancedKaiTradingAgent:
 
         return metrics
 
-    def _calculate_reversal_score(self, note, indicator):
+    def _calculate_reversal_score(self, note, indicator, keywords=None):
         """Calculate quantitative reversal score"""
+        keywords = self._note_keywords(note, keywords)
         score = 0
 
         # Keyword scoring
-        strong_keywords = ['major reversal', 'probable reversal', 'strong reversal', 'confirmed reversal']
-        medium_keywords = ['reversal', 'reverse', 'turnaround', 'exhaustion']
-
-        for keyword in strong_keywords:
-            if keyword in note:
-                score += 3
-
-        for keyword in medium_keywords:
-            if keyword in note:
-                score += 1
+        score += 3 * len(keywords & self.keyword_matcher.categories["reversal_strong"])
+        score += len(keywords & self.keyword_matcher.categories["reversal_medium"])
 
         # Indicator-specific weighting
         indicator_weights = {
@@ -1923,37 +2810,39 @@ class EnhancedKaiTradingAgent:
                 break
 
         # Context scoring
-        if 'confirmed' in note:
+        if 'confirmed' in keywords:
             score += 2
-        if 'multiple' in note or 'confluence' in note:
+        if 'multiple' in keywords or 'confluence' in keywords:
             score += 2
 
         return min(10, score)
 
-    def _calculate_confidence_score(self, note):
+    def _calculate_confidence_score(self, note, keywords=None):
         """Calculate confidence score for signals"""
+        keywords = self._note_keywords(note, keywords)
         confidence = 50  # Base confidence
 
-        if 'confirmed' in note or 'confirmed' in note:
+        if 'confirmed' in keywords:
             confidence += 30
-        if 'likely' in note or 'probable' in note:
+        if 'likely' in keywords or 'probable' in keywords:
             confidence += 15
-        if 'potential' in note or 'possible' in note:
+        if 'potential' in keywords or 'possible' in keywords:
             confidence -= 10
-        if 'uncertain' in note or 'maybe' in note:
+        if 'uncertain' in keywords or 'maybe' in keywords:
             confidence -= 20
 
         return max(10, min(95, confidence))
 
-    def _calculate_volume_score(self, note):
+    def _calculate_volume_score(self, note, keywords=None):
         """Calculate volume signal score"""
+        keywords = self._note_keywords(note, keywords)
         score = 0
 
-        if 'high volume' in note or 'increasing volume' in note:
+        if 'high volume' in keywords or 'increasing volume' in keywords:
             score += 3
-        if 'volume confirmation' in note:
+        if 'volume confirmation' in keywords:
             score += 2
-        if 'low volume' in note:
+        if 'low volume' in keywords:
             score += 1
 
         return score
@@ -1974,31 +2863,60 @@ class EnhancedKaiTradingAgent:
 
         return "Not specified"
 
-    def _classify_divergence(self, note):
+    def _classify_divergence(self, note, keywords=None):
         """Classify divergence type"""
-        if 'bullish divergence' in note:
+        keywords = self._note_keywords(note, keywords)
+        if 'bullish divergence' in keywords:
             return "BULLISH"
-        elif 'bearish divergence' in note:
+        elif 'bearish divergence' in keywords:
             return "BEARISH"
-        elif 'hidden divergence' in note:
+        elif 'hidden divergence' in keywords:
             return "HIDDEN"
         else:
             return "REGULAR"
 
-    def analyze_strategy_data(self, df, quality_tier="PRODUCTION", manual_asset="ETH", manual_price=0.0):
+    def analyze_strategy_data(self, df, quality_tier="PRODUCTION", manual_asset="ETH", manual_price=0.0, use_cache=True, pipeline=True):
         """
         Main analysis method - now quality-aware AND Memory-Enhanced.
         Won't generate false "incomplete data" warnings.
+        Identical uploads (same data + inputs) are served from the shared analysis cache.
+        pipeline=True runs the independent phases concurrently and starts DeepSeek
+        as soon as its inputs exist; pipeline=False keeps the sequential path.
         """
+        self.last_phase_timings = {}
+        self._price_memory = {}
+        started = time.perf_counter()
+
+        # STEP 0: Serve re-runs of the same upload from the content-hash cache
+        cache = get_kai_analysis_cache() if use_cache else None
+        cache_key = None
+        if cache is not None:
+            try:
+                price_memory = self._recall_price_memory(manual_asset) if self.use_deepseek else None
+                cache_key = cache.make_key(df, quality_tier, manual_asset, manual_price, self.use_deepseek,
+                                           price_memory=price_memory)
+                cached_analysis = cache.get(cache_key)
+                if cached_analysis is not None:
+                    self.logger.info("KAI analysis served from cache")
+                    self.last_phase_timings = {"cache": time.perf_counter() - started}
+                    return cached_analysis
+            except Exception as e:
+                self.logger.warning(f"KAI analysis cache unavailable: {e}")
+                cache_key = None
 
-        # STEP 1: Assess data quality FIRST
-        quality = DataQualityFramework.assess_quality(df, tier=quality_tier)
-
-        # STEP 2: Run standard analysis phases
-        strategy_overview = self._phase_1_scanning(df)
-        signals = self._phase_2_signal_extraction(df)
-        time_analysis = self._phase_3_time_mapping(df)
-        risk_analysis = self._phase_4_risk_assessment(df, signals)
+        # STEPS 1, 2 & 4: Quality, analysis phases and DeepSeek
+        results = None
+        if pipeline:
+            try:
+                results = asyncio.run(self._run_analysis_pipeline(df, quality_tier, manual_asset, manual_price))
+            except RuntimeError as e:
+                # asyncio.run refuses to nest inside a running loop - fall back to sequential
+                if "running event loop" not in str(e):
+                    raise
+                self.logger.warning("KAI pipeline unavailable inside a running event loop - running sequentially")
+        if results is None:
+            results = self._run_analysis_sequential(df, quality_tier, manual_asset, manual_price)
+        quality, strategy_overview, signals, time_analysis, risk_analysis, deepseek_analysis = results
 
         # STEP 3: Adjust risk assessment based on data quality
         # This is KEY: Don't warn about incomplete data if quality is acceptable
@@ -2011,21 +2929,8 @@ class EnhancedKaiTradingAgent:
             risk_analysis["data_quality_note"] = f"⚠️ Data below {quality_tier} tier requirements"
             risk_analysis["incomplete_data_penalty"] = 5
 
-        # STEP 4: Get DeepSeek analysis if available
-        deepseek_analysis = None
-        if self.use_deepseek:
-            try:
-                # UPDATED CALL: Pass the manual asset and price
-                deepseek_analysis = self._get_deepseek_enhanced_analysis(
-                    df, strategy_overview, signals, time_analysis, 
-                    manual_asset=manual_asset, manual_price=manual_price
-                )
-            except Exception as e:
-                self.logger.error(f"DeepSeek analysis error: {e}")
-                pass
-
         # STEP 5: Generate final report
-        analysis = self._generate_kai_report(
+        analysis = self._timed("report", self._generate_kai_report,
             strategy_overview, signals, time_analysis, risk_analysis, deepseek_analysis
         )
 
@@ -2048,23 +2953,179 @@ class EnhancedKaiTradingAgent:
             if key not in analysis:
                 analysis[key] = {} if key in ['data_quality', 'risk_assessment_data'] else None
 
-        return analysis
+        # STEP 8: Cache the result - but never pin a failed DeepSeek call for the TTL
+        deepseek_failed = self.use_deepseek and (
+            not isinstance(deepseek_analysis, dict) or deepseek_analysis.get('deepseek_enhanced') is False
+        )
+        if cache_key is not None and not deepseek_failed:
+            cache.put(cache_key, analysis)
 
-    def _phase_1_scanning(self, df):
-        """KAI's Phase 1: Always scan strategies in same order"""
-        completed_analyses = len(df[df['Status'] == 'Done']) if 'Status' in df.columns else 0
-        total_indicators = len(df)
-        strategies = df['Strategy'].unique() if 'Strategy' in df.columns else []
+        self.last_phase_timings["total"] = time.perf_counter() - started
+        self.logger.info("KAI phase timings: " + ", ".join(
+            f"{name}={seconds:.3f}s" for name, seconds in self.last_phase_timings.items()
+        ))
+        return analysis
 
-        return {
-            "completion_rate": f"{completed_analyses}/{total_indicators}",
-            "strategies_analyzed": list(strategies),
-            "pending_analyses": len(df[df['Status'] == 'Open']) if 'Status' in df.columns else 0,
-            "total_strategies": len(strategies),
-            "analysis_coverage": f"{(completed_analyses/total_indicators)*100:.1f}%" if total_indicators > 0 else "0%"
-        }
+    def _timed(self, name, func, *args, **kwargs):
+        """Run one analysis step and record its wall-clock time in last_phase_timings"""
+        step_started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.last_phase_timings[name] = time.perf_counter() - step_started
 
-    def _phase_2_signal_extraction(self, df):
+    def _deepseek_step(self, df, strategy_overview, signals, time_analysis, manual_asset, manual_price):
+        """DeepSeek enhancement - failures are logged and yield None (report falls back to KAI-only)"""
+        if not self.use_deepseek:
+            return None
+        try:
+            # UPDATED CALL: Pass the manual asset and price
+            return self._get_deepseek_enhanced_analysis(
+                df, strategy_overview, signals, time_analysis,
+                manual_asset=manual_asset, manual_price=manual_price
+            )
+        except Exception as e:
+            self.logger.error(f"DeepSeek analysis error: {e}")
+            return None
+
+    def _run_analysis_sequential(self, df, quality_tier, manual_asset, manual_price):
+        """Original step order: quality, phases 1-4, then the blocking DeepSeek call"""
+        quality = self._timed("quality", DataQualityFramework.assess_quality, df, tier=quality_tier)
+        strategy_overview = self._timed("phase_1_scanning", self._phase_1_scanning, df)
+        signals = self._timed("phase_2_signal_extraction", self._phase_2_signal_extraction, df)
+        time_analysis = self._timed("phase_3_time_mapping", self._phase_3_time_mapping, df)
+        risk_analysis = self._timed("phase_4_risk_assessment", self._phase_4_risk_assessment, df, signals)
+        deepseek_analysis = self._timed("deepseek", self._deepseek_step,
+            df, strategy_overview, signals, time_analysis, manual_asset, manual_price
+        )
+        return quality, strategy_overview, signals, time_analysis, risk_analysis, deepseek_analysis
+
+    async def _run_analysis_pipeline(self, df, quality_tier, manual_asset, manual_price):
+        """
+        Dependency-driven version of _run_analysis_sequential:
+        quality and phases 1-3 start together, phase 4 starts once signals exist,
+        and the DeepSeek request goes out as soon as overview/signals/time mapping
+        are ready - overlapping phase 4 and the quality assessment.
+        """
+        loop = asyncio.get_running_loop()
+        # The match table is shared by phases 2 and 3 - build it once up front
+        self._timed("keyword_scan", self._get_match_table, df)
+
+        with ThreadPoolExecutor(max_workers=KAI_PIPELINE_MAX_WORKERS, thread_name_prefix="kai-phase") as pool:
+            def run(name, func, *args, **kwargs):
+                return loop.run_in_executor(pool, lambda: self._timed(name, func, *args, **kwargs))
+
+            quality_future = run("quality", DataQualityFramework.assess_quality, df, tier=quality_tier)
+            overview_future = run("phase_1_scanning", self._phase_1_scanning, df)
+            signals_future = run("phase_2_signal_extraction", self._phase_2_signal_extraction, df)
+            time_future = run("phase_3_time_mapping", self._phase_3_time_mapping, df)
+
+            signals = await signals_future
+            risk_future = run("phase_4_risk_assessment", self._phase_4_risk_assessment, df, signals)
+
+            strategy_overview, time_analysis = await asyncio.gather(overview_future, time_future)
+            deepseek_future = run("deepseek", self._deepseek_step,
+                df, strategy_overview, signals, time_analysis, manual_asset, manual_price
+            )
+
+            quality, risk_analysis, deepseek_analysis = await asyncio.gather(
+                quality_future, risk_future, deepseek_future
+            )
+
+        return quality, strategy_overview, signals, time_analysis, risk_analysis, deepseek_analysis
+
+    @staticmethod
+    def build_batch_jobs(df, prices=None, asset_column=None, label=None):
+        """
+        Split one multi-asset CSV into analyze_batch jobs (one per asset).
+        prices maps asset -> weekly closing price; asset_column defaults to the
+        first of KAI_BATCH_ASSET_COLUMNS present in df.
+        """
+        prices = prices or {}
+        if asset_column is None:
+            asset_column = next((c for c in KAI_BATCH_ASSET_COLUMNS if c in df.columns), None)
+        if asset_column is None or asset_column not in df.columns:
+            raise ValueError(f"No asset column found (expected one of {KAI_BATCH_ASSET_COLUMNS})")
+
+        jobs = []
+        assets = df[asset_column].fillna("").astype(str).str.strip().str.upper()
+        for asset in assets.unique():
+            if not asset:
+                continue
+            jobs.append({
+                "label": f"{label} · {asset}" if label else asset,
+                "df": df[assets == asset].reset_index(drop=True),
+                "asset": asset,
+                "price": float(prices.get(asset, 0.0) or 0.0)
+            })
+        return jobs
+
+    def analyze_batch(self, jobs, quality_tier="PRODUCTION", use_cache=True,
+                      max_workers=KAI_BATCH_MAX_WORKERS, progress_callback=None):
+        """
+        Analyze many strategy CSVs / assets in one run.
+
+        jobs: list of dicts with "df", "asset", "price" and an optional "label".
+        Jobs run concurrently on a thread pool, each on its own agent (the match
+        table and phase timings are per-agent state); DeepSeek requests from all
+        jobs share the client's concurrency limiter. progress_callback(done, total, result)
+        is called from the calling thread as jobs finish.
+
+        Returns one result dict per job, in job order:
+        {"label", "asset", "price", "analysis", "error", "seconds", "phase_timings"}
+        """
+        def run_job(job):
+            job_started = time.perf_counter()
+            agent = EnhancedKaiTradingAgent(use_deepseek=self.use_deepseek)
+            result = {
+                "label": job.get("label") or job["asset"],
+                "asset": job["asset"],
+                "price": job.get("price", 0.0),
+                "analysis": None,
+                "error": None
+            }
+            try:
+                # The batch already fans out across jobs - keep each job's phases sequential
+                result["analysis"] = agent.analyze_strategy_data(
+                    job["df"], quality_tier=quality_tier, manual_asset=job["asset"],
+                    manual_price=job.get("price", 0.0), use_cache=use_cache, pipeline=False
+                )
+            except Exception as e:
+                self.logger.error(f"KAI batch job {result['label']} failed: {e}")
+                result["error"] = str(e)
+            result["seconds"] = time.perf_counter() - job_started
+            result["phase_timings"] = dict(agent.last_phase_timings)
+            return result
+
+        results = [None] * len(jobs)
+        if not jobs:
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))),
+                                thread_name_prefix="kai-batch") as pool:
+            futures = {pool.submit(run_job, job): position for position, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(done, len(jobs), results[futures[future]])
+
+        return results
+
+    def _phase_1_scanning(self, df):
+        """KAI's Phase 1: Always scan strategies in same order"""
+        completed_analyses = len(df[df['Status'] == 'Done']) if 'Status' in df.columns else 0
+        total_indicators = len(df)
+        strategies = df['Strategy'].unique() if 'Strategy' in df.columns else []
+
+        return {
+            "completion_rate": f"{completed_analyses}/{total_indicators}",
+            "strategies_analyzed": list(strategies),
+            "pending_analyses": len(df[df['Status'] == 'Open']) if 'Status' in df.columns else 0,
+            "total_strategies": len(strategies),
+            "analysis_coverage": f"{(completed_analyses/total_indicators)*100:.1f}%" if total_indicators > 0 else "0%"
+        }
+
+    def _phase_2_signal_extraction(self, df):
         """KAI's Phase 2: Enhanced signal extraction with quantitative measures"""
         signals = {
             "reversal_signals": [],
@@ -2076,64 +3137,63 @@ class EnhancedKaiTradingAgent:
             "conflicting_signals": []
         }
 
-        # Enhanced signal detection with scoring
-        for index, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
-
-            note = str(row.get('Note', '')).lower()
-            indicator = row.get('Indicator', 'Unknown')
-            strategy = row.get('Strategy', 'Unknown')
+        # Enhanced signal detection with scoring (one pre-scanned record per note)
+        for match in self._get_match_table(df):
+            note = match["note_lower"]
+            keywords = match["keywords"]
+            categories = match["categories"]
+            indicator = match["indicator"]
+            strategy = match["strategy"]
 
             # Enhanced reversal detection with scoring
-            reversal_score = self._calculate_reversal_score(note, indicator)
+            reversal_score = self._calculate_reversal_score(note, indicator, keywords)
             if reversal_score > 0:
                 signals["reversal_signals"].append({
                     "strategy": strategy,
                     "indicator": indicator,
-                    "message": row.get('Note', ''),
+                    "message": match["note"],
                     "strength": "HIGH" if reversal_score >= 7 else "MEDIUM",
                     "score": reversal_score,
                     "confidence": min(90, reversal_score * 10)
                 })
 
             # Enhanced support/resistance detection with level extraction
-            sr_analysis = self._analyze_support_resistance_phase2(note, indicator, strategy)
+            sr_analysis = self._analyze_support_resistance_phase2(note, indicator, strategy, keywords)
             if sr_analysis:
                 signals["support_signals"].append(sr_analysis)
 
             # Enhanced momentum analysis
-            momentum_analysis = self._analyze_momentum_phase2(note, indicator, strategy)
+            momentum_analysis = self._analyze_momentum_phase2(note, indicator, strategy, keywords)
             if momentum_analysis:
                 signals["momentum_signals"].append(momentum_analysis)
 
             # Volume analysis
-            if any(keyword in note for keyword in ['volume', 'volatility', 'liquidity']):
-                volume_score = self._calculate_volume_score(note)
+            if "volume" in categories:
+                volume_score = self._calculate_volume_score(note, keywords)
                 signals["volume_signals"].append({
                     "strategy": strategy,
                     "indicator": indicator,
-                    "message": row.get('Note', ''),
+                    "message": match["note"],
                     "score": volume_score
                 })
 
             # Breakout signals
-            if any(keyword in note for keyword in ['breakout', 'breaking', 'crossing', 'above', 'below']):
-                breakout_score = self._calculate_breakout_score(note)
+            if "breakout" in categories:
+                breakout_score = self._calculate_breakout_score(note, keywords)
                 signals["breakout_signals"].append({
                     "strategy": strategy,
                     "indicator": indicator,
-                    "message": row.get('Note', ''),
+                    "message": match["note"],
                     "score": breakout_score
                 })
 
             # Divergence detection
-            if any(keyword in note for keyword in ['divergence', 'divergent', 'disagreement']):
+            if "divergence" in categories:
                 signals["divergence_signals"].append({
                     "strategy": strategy,
                     "indicator": indicator,
-                    "message": row.get('Note', ''),
-                    "type": self._classify_divergence(note)
+                    "message": match["note"],
+                    "type": self._classify_divergence(note, keywords)
                 })
 
         # Identify conflicting signals
@@ -2141,19 +3201,19 @@ class EnhancedKaiTradingAgent:
 
         return signals
 
-    def _analyze_support_resistance_phase2(self, note, indicator, strategy):
+    def _analyze_support_resistance_phase2(self, note, indicator, strategy, keywords=None):
         """Enhanced support/resistance analysis for phase 2"""
-        support_keywords = ['support', 'holding', 'bounce', 'floor', 'demand']
-        resistance_keywords = ['resistance', 'rejection', 'ceiling', 'supply', 'top']
+        keywords = self._note_keywords(note, keywords)
+        matcher = self.keyword_matcher
 
         level_type = None
-        if any(keyword in note for keyword in support_keywords):
+        if matcher.has(keywords, "support"):
             level_type = "SUPPORT"
-        elif any(keyword in note for keyword in resistance_keywords):
+        elif matcher.has(keywords, "resistance"):
             level_type = "RESISTANCE"
 
         if level_type:
-            strength = "STRONG" if any(word in note for word in ['strong', 'major', 'key']) else "MODERATE"
+            strength = "STRONG" if matcher.has(keywords, "level_strength") else "MODERATE"
             price_level = self._extract_price_level(note)
 
             return {
@@ -2167,19 +3227,19 @@ class EnhancedKaiTradingAgent:
 
         return None
 
-    def _analyze_momentum_phase2(self, note, indicator, strategy):
+    def _analyze_momentum_phase2(self, note, indicator, strategy, keywords=None):
         """Enhanced momentum analysis for phase 2"""
-        bullish_words = ['bullish', 'breaking up', 'uptrend', 'buy', 'long', 'rally']
-        bearish_words = ['bearish', 'breaking down', 'downtrend', 'sell', 'short', 'decline']
+        keywords = self._note_keywords(note, keywords)
+        matcher = self.keyword_matcher
 
         direction = None
-        if any(word in note for word in bullish_words):
+        if matcher.has(keywords, "bullish"):
             direction = "BULLISH"
-        elif any(word in note for word in bearish_words):
+        elif matcher.has(keywords, "bearish"):
             direction = "BEARISH"
 
         if direction:
-            strength = "STRONG" if any(word in note for word in ['strong', 'powerful', 'accelerating']) else "MODERATE"
+            strength = "STRONG" if matcher.has(keywords, "momentum_strength") else "MODERATE"
 
             return {
                 "strategy": strategy,
@@ -2191,15 +3251,16 @@ class EnhancedKaiTradingAgent:
 
         return None
 
-    def _calculate_breakout_score(self, note):
+    def _calculate_breakout_score(self, note, keywords=None):
         """Calculate breakout signal score"""
+        keywords = self._note_keywords(note, keywords)
         score = 0
 
-        if 'confirmed breakout' in note:
+        if 'confirmed breakout' in keywords:
             score += 3
-        if 'breaking' in note or 'crossing' in note:
+        if 'breaking' in keywords or 'crossing' in keywords:
             score += 2
-        if 'potential breakout' in note:
+        if 'potential breakout' in keywords:
             score += 1
 
         return score
@@ -2232,60 +3293,31 @@ class EnhancedKaiTradingAgent:
             "long_term": []
         }
 
-        # Enhanced keyword mapping
-        time_keywords = {
-            "immediate": [
-                'now', 'immediate', 'today', 'intraday', 'right now', 'currently', 'asap',
-                'urgent', 'instant', 'momentum', 'breakout', 'breaking', 'now!', 'alert',
-                'today only', 'this session', 'current candle', 'next candle', 'vwap', 'volume delta',
-                'stoch rsi', 'rsi', 'macd', 'ao', 'atr', 'mfi', 'fisher'
-            ],
-            "short_term": [
-                'short term', 'this week', 'next few days', 'coming days', '1-7 days',
-                'few days', 'daily', 'day trade', 'overnight', 'swing', 'weekly',
-                'next week', 'weekend', 'friday', 'monday', 'week ahead', 'coming week',
-                'next 3 days', 'next 5 days', 'supertrend', 'ema', 'sma', 'bollinger',
-                'keltner', 'ichimoku', 'chart'
-            ],
-            "medium_term": [
-                'medium term', 'this month', 'next few weeks', '1-4 weeks', 'monthly',
-                'swing trade', 'intermediate', 'coming weeks', 'next month', 'month ahead',
-                'next 2 weeks', 'next 3 weeks', 'rest of month', 'month end', 'rainbow',
-                'alligator', 'pi cycle', 'sar', 'wick delta'
-            ],
-            "long_term": [
-                'long term', '2026', 'next year', 'months ahead', '1-6 months',
-                'quarterly', 'position trade', 'investment', 'hold', 'accumulate',
-                'next quarter', 'coming months', 'next 3 months', 'next 6 months',
-                'year ahead', '2025', '2026', 'future', 'long hold', 'log regression',
-                'monte carlo', 'mvrv', 'nvt', 'roc', 'z-score'
-            ]
-        }
+        # Keyword mapping lives in KAI_KEYWORD_CATEGORIES ("time_<horizon>"), checked in this order
+        horizon_order = ["immediate", "short_term", "medium_term", "long_term"]
 
         signal_count = 0
         classified_count = 0
 
-        for index, row in df.iterrows():
-            if pd.isna(row.get('Note')) or row.get('Note') == '':
-                continue
-
-            note = str(row.get('Note', '')).lower()
-            indicator = row.get('Indicator', 'Unknown')
-            strategy = row.get('Strategy', 'Unknown')
+        for match in self._get_match_table(df):
+            note = match["note_lower"]
+            keywords = match["keywords"]
+            indicator = match["indicator"]
+            strategy = match["strategy"]
 
             signal_count += 1
             time_horizon = None
 
             # STEP 1: Try keyword matching FIRST (HIGHEST PRIORITY)
-            for horizon, keywords in time_keywords.items():
-                if any(keyword in note for keyword in keywords):
+            for horizon in horizon_order:
+                if f"time_{horizon}" in match["categories"]:
                     time_horizon = horizon
                     classified_count += 1
                     break
 
             # STEP 2: If no keywords found, use indicator type classification
             if not time_horizon:
-                time_horizon = self._classify_time_by_indicator(indicator, note)
+                time_horizon = self._classify_time_by_indicator(indicator, note, keywords)
 
             # STEP 3: Validate and ensure we have a valid time_horizon
             if time_horizon not in time_signals:
@@ -2295,8 +3327,8 @@ class EnhancedKaiTradingAgent:
             signal_data = {
                 "indicator": indicator,
                 "strategy": strategy,
-                "message": row.get('Note', ''),
-                "confidence": self._calculate_time_confidence(note),
+                "message": match["note"],
+                "confidence": self._calculate_time_confidence(note, keywords),
                 "time_horizon": time_horizon
             }
 
@@ -2320,7 +3352,7 @@ class EnhancedKaiTradingAgent:
 
         return time_signals
 
-    def _classify_time_by_indicator(self, indicator, note):
+    def _classify_time_by_indicator(self, indicator, note, keywords=None):
         """Intelligent time horizon classification based on indicator type - COMPREHENSIVE VERSION"""
 
         # EXTENSIVE INDICATOR MAPPINGS
@@ -2349,16 +3381,16 @@ class EnhancedKaiTradingAgent:
         ]
 
         indicator_lower = indicator.lower()
-        note_lower = note.lower()
+        keywords = self._note_keywords(note, keywords)
 
         # PRIMARY CLASSIFICATION: Check indicator type
 
         # Check for immediate timeframe signals
         if any(imm_indicator.lower() in indicator_lower for imm_indicator in immediate_indicators):
             # But check if note suggests longer timeframe
-            if any(keyword in note_lower for keyword in ['long term', 'weeks', 'months', 'quarter']):
+            if any(keyword in keywords for keyword in ['long term', 'weeks', 'months', 'quarter']):
                 return "medium_term"
-            elif any(keyword in note_lower for keyword in ['this week', 'few days']):
+            elif any(keyword in keywords for keyword in ['this week', 'few days']):
                 return "short_term"
             self.logger.info(f"Classified {indicator} as IMMEDIATE (indicator match)")
             return "immediate"
@@ -2366,10 +3398,10 @@ class EnhancedKaiTradingAgent:
         # Check for short-term indicators
         elif any(short_indicator.lower() in indicator_lower for short_indicator in short_term_indicators):
             # Check for conflicting timeframes in note
-            if any(keyword in note_lower for keyword in ['immediate', 'today', 'now', 'intraday']):
+            if any(keyword in keywords for keyword in ['immediate', 'today', 'now', 'intraday']):
                 self.logger.info(f"Classified {indicator} as IMMEDIATE (note override)")
                 return "immediate"
-            elif any(keyword in note_lower for keyword in ['weeks', 'month', 'long term']):
+            elif any(keyword in keywords for keyword in ['weeks', 'month', 'long term']):
                 self.logger.info(f"Classified {indicator} as MEDIUM_TERM (note override)")
                 return "medium_term"
             self.logger.info(f"Classified {indicator} as SHORT_TERM (indicator match)")
@@ -2378,10 +3410,10 @@ class EnhancedKaiTradingAgent:
         # Check for medium-term indicators
         elif any(medium_indicator.lower() in indicator_lower for medium_indicator in medium_term_indicators):
             # Check for conflicting timeframes in note
-            if any(keyword in note_lower for keyword in ['immediate', 'today']):
+            if any(keyword in keywords for keyword in ['immediate', 'today']):
                 self.logger.info(f"Classified {indicator} as SHORT_TERM (note override)")
                 return "short_term"
-            elif any(keyword in note_lower for keyword in ['months', 'quarter', 'annual']):
+            elif any(keyword in keywords for keyword in ['months', 'quarter', 'annual']):
                 self.logger.info(f"Classified {indicator} as LONG_TERM (note override)")
                 return "long_term"
             self.logger.info(f"Classified {indicator} as MEDIUM_TERM (indicator match)")
@@ -2390,10 +3422,10 @@ class EnhancedKaiTradingAgent:
         # Check for long-term indicators
         elif any(long_indicator.lower() in indicator_lower for long_indicator in long_term_indicators):
             # Check for conflicting timeframes in note
-            if any(keyword in note_lower for keyword in ['immediate', 'this week']):
+            if any(keyword in keywords for keyword in ['immediate', 'this week']):
                 self.logger.info(f"Classified {indicator} as SHORT_TERM (note override)")
                 return "short_term"
-            elif any(keyword in note_lower for keyword in ['weeks']):
+            elif any(keyword in keywords for keyword in ['weeks']):
                 self.logger.info(f"Classified {indicator} as MEDIUM_TERM (note override)")
                 return "medium_term"
             self.logger.info(f"Classified {indicator} as LONG_TERM (indicator match)")
@@ -2401,16 +3433,16 @@ class EnhancedKaiTradingAgent:
 
         # SECONDARY CLASSIFICATION: Fall back to note content analysis
         else:
-            if any(keyword in note_lower for keyword in ['now', 'today', 'immediate', 'intraday', 'next few hours', 'this hour']):
+            if any(keyword in keywords for keyword in ['now', 'today', 'immediate', 'intraday', 'next few hours', 'this hour']):
                 self.logger.info(f"Classified {indicator} as IMMEDIATE (note-based fallback)")
                 return "immediate"
-            elif any(keyword in note_lower for keyword in ['this week', 'few days', '1-7 days', 'next week', 'daily', 'swing']):
+            elif any(keyword in keywords for keyword in ['this week', 'few days', '1-7 days', 'next week', 'daily', 'swing']):
                 self.logger.info(f"Classified {indicator} as SHORT_TERM (note-based fallback)")
                 return "short_term"
-            elif any(keyword in note_lower for keyword in ['weeks', 'month', 'monthly', '1-4 weeks']):
+            elif any(keyword in keywords for keyword in ['weeks', 'month', 'monthly', '1-4 weeks']):
                 self.logger.info(f"Classified {indicator} as MEDIUM_TERM (note-based fallback)")
                 return "medium_term"
-            elif any(keyword in note_lower for keyword in ['months', 'quarter', 'long term', '1-6 months', 'annual']):
+            elif any(keyword in keywords for keyword in ['months', 'quarter', 'long term', '1-6 months', 'annual']):
                 self.logger.info(f"Classified {indicator} as LONG_TERM (note-based fallback)")
                 return "long_term"
             else:
@@ -2497,36 +3529,38 @@ class EnhancedKaiTradingAgent:
         else:
             return "medium_term"
 
-    def _calculate_time_confidence(self, note):
+    def _calculate_time_confidence(self, note, keywords=None):
         """Calculate confidence score for time horizon predictions"""
+        keywords = self._note_keywords(note, keywords)
+        matcher = self.keyword_matcher
         confidence = 50  # Base confidence
 
         # Increase confidence for specific time references
-        if any(keyword in note.lower() for keyword in ['confirmed', 'definite', 'certain', 'clear']):
+        if matcher.has(keywords, "certainty_high"):
             confidence += 25
-        elif any(keyword in note.lower() for keyword in ['likely', 'probable', 'expected', 'should']):
+        elif matcher.has(keywords, "certainty_medium"):
             confidence += 15
-        elif any(keyword in note.lower() for keyword in ['potential', 'possible', 'might', 'could']):
+        elif matcher.has(keywords, "certainty_low"):
             confidence += 5
 
         # Decrease confidence for uncertain language
-        if any(keyword in note.lower() for keyword in ['uncertain', 'unclear', 'maybe', 'perhaps', 'possibly']):
+        if matcher.has(keywords, "uncertainty"):
             confidence -= 15
-        elif any(keyword in note.lower() for keyword in ['waiting', 'pending', 'monitor', 'watch']):
+        elif matcher.has(keywords, "waiting"):
             confidence -= 10
 
         # Increase confidence for specific timeframes
-        if any(keyword in note.lower() for keyword in ['today', 'now', 'immediate', 'right now', 'this session']):
+        if matcher.has(keywords, "timing_immediate"):
             confidence += 10
-        elif any(keyword in note.lower() for keyword in ['this week', 'next few days', 'coming days']):
+        elif matcher.has(keywords, "timing_days"):
             confidence += 8
-        elif any(keyword in note.lower() for keyword in ['next week', 'next month', 'coming weeks']):
+        elif matcher.has(keywords, "timing_weeks"):
             confidence += 5
 
         # Increase confidence for technical confirmation
-        if any(keyword in note.lower() for keyword in ['confirmed by', 'supported by', 'multiple timeframes', 'confluence']):
+        if matcher.has(keywords, "confirmation"):
             confidence += 12
-        elif any(keyword in note.lower() for keyword in ['breaking', 'crossing', 'bouncing', 'rejecting']):
+        elif matcher.has(keywords, "price_action"):
             confidence += 8
 
         # Ensure confidence stays within reasonable bounds
@@ -2624,7 +3658,7 @@ class EnhancedKaiTradingAgent:
             data_summary = self._prepare_data_for_deepseek(df)
 
             # --- MEMORY INJECTION START ---
-            memory_record = self.get_previous_weekly_close(manual_asset)
+            memory_record = self._recall_price_memory(manual_asset)
             if memory_record:
                 prev_price = float(memory_record['closing_price'])
                 prev_date = memory_record['week_date']
@@ -3135,58 +4169,617 @@ class EnhancedKaiTradingAgent:
 
         return implications
 
+# -------------------------
+# SUPABASE WRITE-BEHIND QUEUE
+# -------------------------
+SUPABASE_WRITE_FLUSH_INTERVAL_SECONDS = 1.0
+SUPABASE_WRITE_MAX_RETRIES = 8
+SUPABASE_WRITE_BACKOFF_BASE = 0.5
+SUPABASE_WRITE_BACKOFF_MAX = 60.0
+SUPABASE_WRITE_DROPPED_KEEP = 100        # Dropped writes kept in memory for inspection (stats / admin)
+SUPABASE_WRITE_JOURNAL_PATH = None  # Opt-in (SUPABASE_WRITE_JOURNAL_PATH secret); keep it outside the source tree
+SUPABASE_WRITE_JOURNAL_EXCLUDE_TABLES = ("users",)  # Rows carrying password hashes / emails never touch disk
+
+class SupabaseWriteQueue:
+    """
+    Process-wide write-behind queue for Supabase mutations.
+
+    Every mutation is queued under a key ("users:alice", "analytics:1", ...) and
+    a newer write for the same key replaces the queued one. A background worker
+    flushes in batches - consecutive upserts to a table with the same column
+    set and distinct conflict keys become one request - retrying failures
+    with jittered backoff. A write that still fails after max_retries is
+    counted, kept in dropped_writes() and handed to on_drop; it is never
+    lost silently. When a journal path is configured,
+    queued writes (except for journal_exclude_tables) are appended to a JSONL
+    journal and replayed after a restart; overlay_pending() lets reads see
+    writes that have not reached the database yet.
+
+    Ops:
+        upsert  - rows upserted (optionally with on_conflict)
+        delete  - rows matching {column: value} deleted
+        replace - table contents replaced by rows (delete all + insert)
+        rpc     - Postgres function `table` called with rows[0] as params
+                  (for non-idempotent updates such as counters; use unique keys)
+        update  - rows[0] applied to rows matching {column: value}; a
+                  conditional update that matches nothing is logged, not retried
+
+    Writes sharing an order_key (e.g. one trading signal's create and later
+    updates) are sent strictly in enqueue order: while an earlier one is
+    backing off or has just failed, the later ones wait behind it.
+    """
+
+    def __init__(self, client, journal_path=None,
+                 journal_exclude_tables=SUPABASE_WRITE_JOURNAL_EXCLUDE_TABLES,
+                 flush_interval=SUPABASE_WRITE_FLUSH_INTERVAL_SECONDS,
+                 max_retries=SUPABASE_WRITE_MAX_RETRIES,
+                 backoff_base=SUPABASE_WRITE_BACKOFF_BASE,
+                 backoff_max=SUPABASE_WRITE_BACKOFF_MAX,
+                 on_drop=None):
+        self.client = client
+        self.on_drop = on_drop
+        self.journal_path = journal_path
+        self.journal_exclude_tables = set(journal_exclude_tables or ())
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._pending = OrderedDict()  # key -> queued write (oldest first)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stats = {"enqueued": 0, "coalesced": 0, "flushed": 0, "requests": 0,
+                       "failures": 0, "dropped": 0, "replayed": 0}
+        self._dropped = deque(maxlen=SUPABASE_WRITE_DROPPED_KEEP)
+
+        self._replay_journal()
+        self._worker = threading.Thread(target=self._run, name="supabase-write-behind", daemon=True)
+        self._worker.start()
+
+    # ---- producer side ----
+    def enqueue(self, key, table, op, rows=None, match=None, on_conflict=None, order_key=None):
+        """Queue a mutation and return immediately (rows are snapshotted)"""
+        write = {
+            "key": key,
+            "table": table,
+            "op": op,
+            "rows": json.loads(json.dumps(rows or [], default=str)),
+            "match": dict(match or {}),
+            "on_conflict": on_conflict,
+            "order_key": order_key,
+            "attempts": 0,
+            "next_attempt_at": 0.0,
+            "queued_at": time.time()
+        }
+        with self._lock:
+            self._seq += 1
+            write["seq"] = self._seq
+            if key in self._pending:
+                self._stats["coalesced"] += 1
+                del self._pending[key]  # Re-queue at the end so ordering follows the latest write
+            self._pending[key] = write
+            self._stats["enqueued"] += 1
+            self._journal_append(write)
+        self._wake.set()
+        return True
+
+    def pending(self, table):
+        """Queued writes for a table, oldest first"""
+        with self._lock:
+            return [copy.deepcopy(w) for w in self._pending.values() if w["table"] == table]
+
+    def has_pending(self, order_key):
+        """True while any write with this order_key is still queued"""
+        with self._lock:
+            return any(w.get("order_key") == order_key for w in self._pending.values())
+
+    def overlay_pending(self, table, rows, key_columns):
+        """
+        Apply queued writes for `table` on top of rows read from the database,
+        so callers read their own writes. key_columns identifies a row.
+        """
+        if isinstance(key_columns, str):
+            key_columns = (key_columns,)
+        writes = self.pending(table)
+        if not writes:
+            return rows
+
+        def row_key(row):
+            return tuple(row.get(column) for column in key_columns)
+
+        merged = OrderedDict((row_key(row), row) for row in rows)
+        for write in writes:
+            if write["op"] == "replace":
+                merged = OrderedDict((row_key(row), row) for row in write["rows"])
+            elif write["op"] == "upsert":
+                for row in write["rows"]:
+                    merged[row_key(row)] = dict(merged.get(row_key(row), {}), **row)
+            elif write["op"] == "delete":
+                for key in [k for k, row in merged.items()
+                            if all(row.get(c) == v for c, v in write["match"].items())]:
+                    del merged[key]
+            elif write["op"] == "update":
+                for key, row in list(merged.items()):
+                    if all(row.get(c) == v for c, v in write["match"].items()):
+                        merged[key] = dict(row, **write["rows"][0])
+        return list(merged.values())
+
+    def flush(self, timeout=10.0):
+        """Block until the queue drains (or timeout); True if nothing is left"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            self._wake.set()
+            time.sleep(0.05)
+        with self._lock:
+            return not self._pending
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["oldest_pending_seconds"] = (
+                time.time() - min(w["queued_at"] for w in self._pending.values()) if self._pending else 0.0
+            )
+            return stats
+
+    # ---- worker side ----
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._flush_once()
+            except Exception as e:
+                logging.error(f"Write-behind flush crashed: {e}")
+
+    def _flush_once(self):
+        if self.client is None:
+            return
+        now = time.time()
+        with self._lock:
+            batch, waiting = [], set()
+            for w in self._pending.values():
+                order_key = w.get("order_key")
+                if order_key is not None and order_key in waiting:
+                    continue  # Stays behind an earlier write for the same order_key
+                if w["next_attempt_at"] > now:
+                    if order_key is not None:
+                        waiting.add(order_key)
+                    continue
+                batch.append(dict(w))
+        if not batch:
+            return
+
+        # Consecutive upserts to the same table collapse into one request when
+        # their rows have the same columns (a missing column would be sent as
+        # NULL) and different conflict keys (a repeated key fails the batch);
+        # deletes/replaces keep their position relative to the table's other writes
+        requests_to_send, open_upserts, last_group_for = [], {}, {}
+        for write in batch:
+            group_key = (write["table"], write["on_conflict"], self._columns(write))
+            identities = {(write["table"], self._conflict_identity(write, row)) for row in write["rows"]}
+            if write["op"] == "upsert" and group_key[2] is not None and group_key in open_upserts:
+                index = open_upserts[group_key]
+                # Only if none of its rows is already in that request or a later one (keeps per-row order)
+                if all(last_group_for.get(identity, -1) < index for identity in identities):
+                    requests_to_send[index].append(write)
+                    last_group_for.update(dict.fromkeys(identities, index))
+                    continue
+            requests_to_send.append([write])
+            index = len(requests_to_send) - 1
+            if write["op"] != "upsert":
+                for existing in [k for k in open_upserts if k[0] == write["table"]]:
+                    del open_upserts[existing]
+            else:
+                open_upserts[group_key] = index
+                last_group_for.update(dict.fromkeys(identities, index))
+
+        changed, failed_order_keys, dropped = False, set(), []
+        for group in requests_to_send:
+            order_keys = {w.get("order_key") for w in group} - {None}
+            if order_keys & failed_order_keys:
+                continue  # An earlier write for the same order_key just failed - retry together later
+            try:
+                self._execute(group)
+                succeeded = True
+            except Exception as e:
+                succeeded = False
+                failed_order_keys |= order_keys
+                logging.warning(f"Write-behind {group[0]['op']} on {group[0]['table']} failed: {e}")
+
+            with self._lock:
+                self._stats["requests"] += 1
+                for write in group:
+                    current = self._pending.get(write["key"])
+                    if current is None or current["seq"] != write["seq"]:
+                        continue  # A newer write for this key arrived meanwhile - it stays queued
+                    if succeeded:
+                        del self._pending[write["key"]]
+                        self._stats["flushed"] += 1
+                        changed = True
+                        continue
+                    self._stats["failures"] += 1
+                    current["attempts"] += 1
+                    if current["attempts"] > self.max_retries:
+                        logging.error(f"Write-behind dropped {write['key']} after {current['attempts']} attempts")
+                        del self._pending[write["key"]]
+                        self._stats["dropped"] += 1
+                        current["dropped_at"] = time.time()
+                        self._dropped.append(current)
+                        dropped.append(current)
+                        changed = True
+                    else:
+                        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** current["attempts"])))
+                        current["next_attempt_at"] = time.time() + delay
+
+        if changed:
+            self._compact_journal()
+        for write in dropped:
+            if self.on_drop:
+                try:
+                    self.on_drop(copy.deepcopy(write))
+                except Exception as e:
+                    logging.error(f"Write-behind on_drop callback failed: {e}")
+
+    @staticmethod
+    def _columns(write):
+        """Column set of an upsert's rows (None if the rows disagree - never merged)"""
+        columns = {frozenset(row) for row in write["rows"]}
+        return next(iter(columns)) if len(columns) == 1 else None
+
+    @staticmethod
+    def _conflict_identity(write, row):
+        """Which stored row an upserted row lands on: on_conflict columns, else id, else the queue key"""
+        if write["on_conflict"]:
+            return tuple(str(row.get(column)) for column in write["on_conflict"].split(","))
+        if "id" in row:
+            return ("id", str(row["id"]))
+        return ("key", write["key"])
+
+    def dropped_writes(self):
+        """Writes given up on after max_retries, newest last (at most SUPABASE_WRITE_DROPPED_KEEP)"""
+        with self._lock:
+            return [copy.deepcopy(w) for w in self._dropped]
+
+    def _execute(self, group):
+        first = group[0]
+        table = self.client.table(first["table"])
+        if first["op"] == "upsert":
+            rows = [row for write in group for row in write["rows"]]
+            if not rows:
+                return
+            query = table.upsert(rows, on_conflict=first["on_conflict"]) if first["on_conflict"] else table.upsert(rows)
+            responses = [query.execute()]
+        elif first["op"] == "delete":
+            query = table.delete()
+            for column, value in first["match"].items():
+                query = query.eq(column, value)
+            responses = [query.execute()]
+        elif first["op"] == "update":
+            query = table.update(first["rows"][0])
+            for column, value in first["match"].items():
+                query = query.eq(column, value)
+            response = query.execute()
+            if hasattr(response, 'error') and response.error:
+                raise RuntimeError(response.error)
+            if not response.data:
+                logging.warning(f"Write-behind update on {first['table']} matched no rows {first['match']} (stale version?)")
+            responses = [response]
+        elif first["op"] == "rpc":
+            responses = [self.client.rpc(first["table"], first["rows"][0] if first["rows"] else {}).execute()]
+        elif first["op"] == "replace":
+            responses = [table.delete().neq('id', 0).execute()]
+            if first["rows"]:
+                responses.append(self.client.table(first["table"]).insert(first["rows"]).execute())
+        else:
+            raise ValueError(f"Unknown write-behind op {first['op']}")
+
+        for response in responses:
+            if hasattr(response, 'error') and response.error:
+                raise RuntimeError(response.error)
+
+    # ---- journal ----
+    def _journaled(self, write):
+        return write["table"] not in self.journal_exclude_tables
+
+    def _open_journal(self, path, mode):
+        # Owner-only permissions: journaled rows can hold personal data
+        return open(os.open(path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if mode == "a" else os.O_TRUNC), 0o600),
+                    mode, encoding="utf-8")
+
+    def _journal_append(self, write):
+        if not self.journal_path or not self._journaled(write):
+            return
+        try:
+            with self._journal_lock, self._open_journal(self.journal_path, "a") as f:
+                f.write(json.dumps(write) + "\n")
+        except OSError as e:
+            logging.warning(f"Write-behind journal append failed: {e}")
+
+    def _compact_journal(self):
+        """Rewrite the journal with only the writes still pending"""
+        if not self.journal_path:
+            return
+        with self._lock:
+            pending = [w for w in self._pending.values() if self._journaled(w)]
+        tmp_path = f"{self.journal_path}.tmp"
+        try:
+            with self._journal_lock:
+                with self._open_journal(tmp_path, "w") as f:
+                    for write in pending:
+                        f.write(json.dumps(write) + "\n")
+                os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logging.warning(f"Write-behind journal compaction failed: {e}")
+
+    def _replay_journal(self):
+        """Re-queue writes that were journaled but never flushed (e.g. before a restart)"""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        write = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from a crash
+                    if not self._journaled(write):
+                        continue  # Written by an older version that journaled every table
+                    write["attempts"], write["next_attempt_at"] = 0, 0.0
+                    self._pending.pop(write["key"], None)
+                    self._pending[write["key"]] = write
+                    self._seq = max(self._seq, write.get("seq", 0))
+            self._stats["replayed"] = len(self._pending)
+            if self._pending:
+                logging.info(f"Write-behind replayed {len(self._pending)} journaled writes")
+        except OSError as e:
+            logging.warning(f"Write-behind journal replay failed: {e}")
+
+@st.cache_resource
+def get_supabase_write_queue():
+    """Process-wide write-behind queue (journal only if the SUPABASE_WRITE_JOURNAL_PATH secret is set)"""
+    write_queue = SupabaseWriteQueue(
+        supabase_client,
+        journal_path=st.secrets.get("SUPABASE_WRITE_JOURNAL_PATH", SUPABASE_WRITE_JOURNAL_PATH)
+    )
+    atexit.register(write_queue.flush, 5.0)
+    return write_queue
+
 # -------------------------
 # SUPABASE DATABASE FUNCTIONS - FIXED WITH PROPER ERROR HANDLING
 # -------------------------
 
 # Users table functions - FIXED DELETION FUNCTIONS
-def supabase_get_users():
-    """Get all users from Supabase - FIXED VERSION"""
+def supabase_get_users(with_server_stamps=False):
+    """
+    Get all users from Supabase - FIXED VERSION. With with_server_stamps,
+    returns (users, updated_at values as stored by the database) so callers
+    can track a watermark that queued writes' client clocks don't move.
+    """
     if not supabase_client:
-        return {}
+        return ({}, []) if with_server_stamps else {}
     try:
         response = supabase_client.table('users').select('*').execute()
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error getting users: {response.error}")
-            return {}
+            return None
+        server_stamps = [row.get('updated_at') for row in response.data or []]
+        # Writes still in the write-behind queue win over what the database returned
+        rows = get_supabase_write_queue().overlay_pending('users', response.data, 'username')
         users = {}
-        for user in response.data:
+        for user in rows:
             users[user['username']] = user
-        return users
+        return (users, server_stamps) if with_server_stamps else users
     except Exception as e:
         st.error(f"Error getting users: {e}")
-        return {}
+        return None
+
+def supabase_create_user_if_absent(username, user_data):
+    """
+    Insert a user row only if the username does not exist yet - synchronous,
+    never queued or journaled, so a seeded default can't overwrite a real row.
+    True if inserted, False if the user already existed, None on failure.
+    """
+    if not supabase_client:
+        return None
+    try:
+        row = dict(user_data, username=username)
+        response = supabase_client.table('users')\
+            .upsert(row, on_conflict='username', ignore_duplicates=True).execute()
+        if hasattr(response, 'error') and response.error:
+            logging.error(f"Supabase error creating user {username}: {response.error}")
+            return None
+        return bool(response.data)
+    except Exception as e:
+        logging.error(f"Error creating user {username}: {e}")
+        return None
+
+# users.updated_at drives incremental refreshes of the shared UserDirectory:
+#   alter table users add column if not exists updated_at timestamptz not null default now();
+#   create index if not exists users_updated_at on users (updated_at);
+#   create or replace function touch_updated_at() returns trigger as $$
+#     begin new.updated_at = now(); return new; end; $$ language plpgsql;
+#   create trigger users_touch_updated_at before insert or update on users
+#     for each row execute function touch_updated_at();
+def supabase_get_users_changed_since(watermark):
+    """
+    (rows, server updated_at values) for users with updated_at >= watermark;
+    rows have queued writes applied, the stamps don't. None if unsupported/failed.
+    """
+    if not supabase_client:
+        return None
+    try:
+        response = supabase_client.table('users').select('*').gte('updated_at', watermark).execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error getting changed users: {response.error}")
+            return None
+        server_stamps = [row.get('updated_at') for row in response.data or []]
+        return get_supabase_write_queue().overlay_pending('users', response.data or [], 'username'), server_stamps
+    except Exception as e:
+        logging.warning(f"Error getting changed users: {e}")
+        return None
+
+def supabase_get_usernames():
+    """Set of all usernames (queued writes applied) - used to notice deletes; None on failure"""
+    if not supabase_client:
+        return None
+    try:
+        response = supabase_client.table('users').select('username').execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error getting usernames: {response.error}")
+            return None
+        rows = get_supabase_write_queue().overlay_pending('users', response.data or [], 'username')
+        return {row['username'] for row in rows}
+    except Exception as e:
+        logging.warning(f"Error getting usernames: {e}")
+        return None
+
+# Server-computed tiles for the admin dashboards (one round trip, no row transfer):
+#   create or replace function admin_user_metrics() returns json language sql stable as $$
+#     select json_build_object(
+#       'total_users', count(*),
+#       'active_users', count(*) filter (where coalesce(is_active, true)),
+#       'online_users', coalesce(sum(active_sessions), 0),
+#       'verified_users', count(*) filter (where coalesce(email_verified, false)),
+#       'verified_non_admin', count(*) filter (where coalesce(email_verified, false) and username <> 'admin'),
+#       'plan_distribution', (select coalesce(json_object_agg(plan, n), '{}'::json)
+#                             from (select coalesce(plan, 'unknown') as plan, count(*) as n from users group by 1) p)
+#     ) from users $$;
+#   create index if not exists users_created_username on users (created, username);
+USER_LIST_COLUMNS = ('username, name, email, plan, expires, created, last_login, is_active, login_count, '
+                     'active_sessions, email_verified, verification_date, verification_admin')
+USER_PAGE_SORT_KEYS = ('username', 'created')
+ADMIN_USER_PAGE_SIZE = 25
+USER_METRICS_TTL_SECONDS = 30
+
+def keyset_seek_filter(field, op, value, tie_field, tie_value, nulls_last=True):
+    """
+    PostgREST or_() filter for the rows strictly past (value, tie_value) in
+    an ordering on (field, tie_field), where op is 'gt' / 'lt' in that
+    ordering's direction and NULL field values sort last (nulls_last) or first.
+    """
+    tie = f'{tie_field}.{op}."{tie_value}"'
+    if value is None:
+        # Cursor row is among the NULLs: only NULLs further on (plus every non-NULL if NULLs come first)
+        return f'and({field}.is.null,{tie})' if nulls_last else f'{field}.not.is.null,and({field}.is.null,{tie})'
+    seek = f'{field}.{op}."{value}",and({field}.eq."{value}",{tie})'
+    return f'{seek},{field}.is.null' if nulls_last else seek
+
+def supabase_query_users(plan=None, is_active=None, email_verified=None, inactive_before=None,
+                         exclude_admin=False, order_by='username', after=None, limit=25,
+                         columns=USER_LIST_COLUMNS):
+    """
+    One keyset page of users, filtered and ordered server-side.
+    `after` is the cursor returned with the previous page (a username, or
+    [created, username] when ordering by created - users without a created
+    date come last). Returns (rows, next_cursor); next_cursor is None on the
+    last page.
+    """
+    if not supabase_client:
+        return [], None
+    if order_by not in USER_PAGE_SORT_KEYS:
+        raise ValueError(f"order_by must be one of {USER_PAGE_SORT_KEYS}")
+    try:
+        query = supabase_client.table('users').select(columns)
+        if plan:
+            query = query.eq('plan', plan)
+        if is_active is not None:
+            query = query.eq('is_active', is_active)
+        if email_verified is not None:
+            query = query.eq('email_verified', email_verified)
+        if exclude_admin:
+            query = query.neq('username', 'admin')
+        if inactive_before:
+            # Never logged in counts from the account creation date
+            query = query.or_(f'last_login.lt."{inactive_before}",and(last_login.is.null,created.lt."{inactive_before}")')
+
+        if after is not None:
+            if order_by == 'created':
+                created, username = after
+                query = query.or_(keyset_seek_filter('created', 'gt', created, 'username', username))
+            else:
+                query = query.gt('username', after)
+        if order_by == 'created':
+            query = query.order('created', nullsfirst=False).order('username')
+        else:
+            query = query.order('username')
+
+        # One extra row tells us whether there is a next page
+        response = query.limit(limit + 1).execute()
+        if hasattr(response, 'error') and response.error:
+            st.error(f"Supabase error querying users: {response.error}")
+            return [], None
+        rows = response.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Queued edits to users on this page win over the database copy
+        pending = {}
+        for write in get_supabase_write_queue().pending('users'):
+            if write['op'] == 'upsert':
+                for row in write['rows']:
+                    pending[row['username']] = row
+            elif write['op'] == 'delete':
+                pending[write['match'].get('username')] = None
+        merged = []
+        for row in rows:
+            if row['username'] not in pending:
+                merged.append(row)
+            elif pending[row['username']] is not None:
+                queued = {k: v for k, v in pending[row['username']].items() if k != 'password_hash'}
+                merged.append({**row, **queued})
+        rows = merged
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = [last.get('created'), last['username']] if order_by == 'created' else last['username']
+        return rows, next_cursor
+    except Exception as e:
+        st.error(f"Error querying users: {e}")
+        return [], None
+
+def supabase_get_user_metrics():
+    """Aggregates from the admin_user_metrics() function; None if unavailable"""
+    if not supabase_client:
+        return None
+    try:
+        response = supabase_client.rpc('admin_user_metrics').execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error getting user metrics: {response.error}")
+            return None
+        return response.data or None
+    except Exception as e:
+        logging.warning(f"Error getting user metrics: {e}")
+        return None
 
 def supabase_save_users(users):
-    """Save users to Supabase - FIXED VERSION"""
+    """Save users to Supabase - FIXED VERSION (queued write-behind, one row per user)"""
     if not supabase_client:
         return False
     try:
-        # Convert users dict to list
-        users_list = []
+        write_queue = get_supabase_write_queue()
         for username, user_data in users.items():
             user_data['username'] = username
-            users_list.append(user_data)
-
-        # Upsert all users
-        response = supabase_client.table('users').upsert(users_list).execute()
-        if hasattr(response, 'error') and response.error:
-            st.error(f"Supabase error saving users: {response.error}")
-            return False
+            user_data['updated_at'] = datetime.now().astimezone().isoformat()  # The trigger overrides with now()
+            write_queue.enqueue(f"users:{username}", 'users', 'upsert', [user_data])
         return True
     except Exception as e:
         st.error(f"Error saving users: {e}")
         return False
 
 def supabase_delete_user(username):
-    """Delete user from Supabase - FIXED VERSION"""
+    """Delete user from Supabase - FIXED VERSION (queued write-behind)"""
     if not supabase_client:
         return False
     try:
-        response = supabase_client.table('users').delete().eq('username', username).execute()
-        if hasattr(response, 'error') and response.error:
-            st.error(f"Supabase error deleting user: {response.error}")
-            return False
+        # Same key as the user's upserts, so a queued save can't resurrect the user
+        get_supabase_write_queue().enqueue(f"users:{username}", 'users', 'delete', match={'username': username})
         st.success(f"✅ User '{username}' deleted from Supabase")
         return True
     except Exception as e:
@@ -3203,28 +4796,178 @@ def supabase_get_analytics():
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error getting analytics: {response.error}")
             return {}
-        if response.data:
-            return response.data[0]  # Assuming single analytics record
+        write_queue = get_supabase_write_queue()
+        rows = write_queue.overlay_pending('analytics', response.data or [], 'id')
+        if rows:
+            analytics = rows[0]  # Assuming single analytics record
+            for write in write_queue.pending('record_login'):
+                analytics['total_logins'] = (analytics.get('total_logins') or 0) + 1
+                if write['rows'][0]['p_success']:
+                    analytics['successful_logins'] = (analytics.get('successful_logins') or 0) + 1
+            return analytics
         return {}
     except Exception as e:
         st.error(f"Error getting analytics: {e}")
         return {}
 
-def supabase_save_analytics(analytics):
-    """Save analytics to Supabase - FIXED VERSION"""
+# Login counters are only ever bumped in the database, never upserted from a stale in-memory copy:
+#   alter table analytics alter column total_logins set default 0, alter column successful_logins set default 0;
+#   create table if not exists analytics_counter_requests (
+#     request_id uuid primary key, created_at timestamptz not null default now());
+#   create or replace function record_login(p_success boolean, p_request_id uuid default null)
+#   returns void language plpgsql as $$
+#   begin
+#     if p_request_id is not null then
+#       insert into analytics_counter_requests (request_id) values (p_request_id) on conflict do nothing;
+#       if not found then return; end if;
+#     end if;
+#     insert into analytics (id, total_logins, successful_logins)
+#     values (1, 1, case when p_success then 1 else 0 end)
+#     on conflict (id) do update
+#       set total_logins = analytics.total_logins + 1,
+#           successful_logins = analytics.successful_logins + case when p_success then 1 else 0 end;
+#   end $$;
+ANALYTICS_COUNTER_FIELDS = ("total_logins", "successful_logins")
+
+def supabase_save_analytics(analytics, counters=()):
+    """
+    Save analytics to Supabase - FIXED VERSION (queued write-behind). Counter
+    fields are left out unless named in `counters` (a one-off seed).
+    """
     if not supabase_client:
         return False
     try:
         analytics['id'] = 1  # Single analytics record
-        response = supabase_client.table('analytics').upsert(analytics).execute()
-        if hasattr(response, 'error') and response.error:
-            st.error(f"Supabase error saving analytics: {response.error}")
-            return False
+        row = {k: v for k, v in analytics.items() if k not in ANALYTICS_COUNTER_FIELDS or k in counters}
+        get_supabase_write_queue().enqueue('analytics:1', 'analytics', 'upsert', [row])
         return True
     except Exception as e:
         st.error(f"Error saving analytics: {e}")
         return False
 
+def supabase_record_login(success):
+    """Queue one atomic bump of the login counters (record_login RPC, idempotent per request id)"""
+    if not supabase_client:
+        return False
+    try:
+        request_id = str(uuid.uuid4())
+        get_supabase_write_queue().enqueue(
+            f"analytics:rpc:{request_id}", 'record_login', 'rpc',
+            [{'p_success': bool(success), 'p_request_id': request_id}]
+        )
+        return True
+    except Exception as e:
+        logging.warning(f"Error queueing login counter: {e}")
+        return False
+
+# Analytics events table functions - append-only history
+#   create table analytics_events (
+#       id uuid primary key, event_type text not null, username text,
+#       success boolean, details jsonb, created_at timestamptz not null
+#   );
+#   create index analytics_events_type_created on analytics_events (event_type, created_at desc);
+#   create or replace function analytics_events_by_day(p_event_type text)
+#   returns table (day date, events bigint) language sql stable as $$
+#     select created_at::date, count(*) from analytics_events
+#     where event_type = p_event_type group by 1 order by 1 desc $$;
+ANALYTICS_EVENTS_TABLE = 'analytics_events'
+
+# Legacy list fields of the analytics row -> event_type they migrate to
+LEGACY_ANALYTICS_HISTORIES = {
+    "login_history": "login",
+    "user_registrations": "registration",
+    "deleted_users": "user_deleted",
+    "plan_changes": "plan_change",
+    "password_changes": "password_change",
+    "username_changes": "username_change",
+    "email_verifications": "email_verification"
+}
+
+def build_analytics_event(event_type, username=None, success=None, created_at=None, event_id=None, **details):
+    """One analytics_events row"""
+    return {
+        'id': event_id or str(uuid.uuid4()),
+        'event_type': event_type,
+        'username': username,
+        'success': success,
+        'details': details,
+        'created_at': created_at or datetime.now().isoformat()
+    }
+
+def supabase_append_analytics_events(events):
+    """Append analytics events - one row each, queued write-behind (idempotent on id)"""
+    if not supabase_client:
+        return False
+    try:
+        write_queue = get_supabase_write_queue()
+        for event in events:
+            write_queue.enqueue(f"{ANALYTICS_EVENTS_TABLE}:{event['id']}", ANALYTICS_EVENTS_TABLE,
+                                'upsert', [event], on_conflict='id')
+        return True
+    except Exception as e:
+        logging.warning(f"Error appending analytics events: {e}")
+        return False
+
+def supabase_get_analytics_events(event_type=None, limit=20, offset=0, columns='*'):
+    """Newest-first page of analytics events (queued events included on the first page)"""
+    if not supabase_client:
+        return []
+    try:
+        query = supabase_client.table(ANALYTICS_EVENTS_TABLE).select(columns).order('created_at', desc=True)
+        if event_type:
+            query = query.eq('event_type', event_type)
+        response = query.range(offset, offset + limit - 1).execute()
+        if hasattr(response, 'error') and response.error:
+            st.error(f"Supabase error getting analytics events: {response.error}")
+            return []
+        events = response.data or []
+
+        if offset == 0:
+            queued = [
+                row for write in get_supabase_write_queue().pending(ANALYTICS_EVENTS_TABLE)
+                for row in write['rows'] if not event_type or row.get('event_type') == event_type
+            ]
+            if queued:
+                seen = {event.get('id') for event in events}
+                events = events + [row for row in queued if row['id'] not in seen]
+                events = sorted(events, key=lambda e: e.get('created_at') or '', reverse=True)[:limit]
+        return events
+    except Exception as e:
+        st.error(f"Error getting analytics events: {e}")
+        return []
+
+def supabase_count_analytics_events_by_day(event_type, page_size=500, max_pages=200):
+    """
+    {YYYY-MM-DD: count} over all events of a type, grouped in the database
+    (analytics_events_by_day RPC); pages through created_at if the RPC is missing
+    """
+    if not supabase_client:
+        return {}
+    try:
+        response = supabase_client.rpc('analytics_events_by_day', {'p_event_type': event_type}).execute()
+        if hasattr(response, 'error') and response.error:
+            raise RuntimeError(response.error)
+        counts = {str(row['day'])[:10]: row['events'] for row in response.data or []}
+        for write in get_supabase_write_queue().pending(ANALYTICS_EVENTS_TABLE):
+            for row in write['rows']:
+                if row.get('event_type') == event_type:
+                    day = (row.get('created_at') or '')[:10]
+                    counts[day] = counts.get(day, 0) + 1
+        return counts
+    except Exception as e:
+        logging.warning(f"analytics_events_by_day RPC unavailable: {e}")
+
+    counts = {}
+    for page in range(max_pages):
+        events = supabase_get_analytics_events(event_type, limit=page_size, offset=page * page_size,
+                                               columns='id, created_at')
+        for event in events:
+            day = (event.get('created_at') or '')[:10]
+            counts[day] = counts.get(day, 0) + 1
+        if len(events) < page_size:
+            break
+    return counts
+
 # Strategy analyses table functions - FIXED VERSION
 def supabase_get_strategy_analyses():
     """Get strategy analyses from Supabase - FIXED"""
@@ -3235,8 +4978,11 @@ def supabase_get_strategy_analyses():
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error getting strategy analyses: {response.error}")
             return {}
+        rows = get_supabase_write_queue().overlay_pending(
+            'strategy_analyses', response.data, ('strategy_name', 'indicator_name')
+        )
         strategies = {}
-        for item in response.data:
+        for item in rows:
             strategy_name = item['strategy_name']
             indicator_name = item['indicator_name']
             if strategy_name not in strategies:
@@ -3255,35 +5001,41 @@ def supabase_get_strategy_analyses():
         st.error(f"❌ Error getting strategy analyses: {e}")
         return {}
 
+def strategy_analysis_record(strategy_name, indicator_name, meta):
+    """strategy_analyses row for one indicator (defaults match what load returns)"""
+    return {
+        'strategy_name': strategy_name,
+        'indicator_name': indicator_name,
+        'note': meta.get('note', ''),
+        'status': meta.get('status', 'Open'),
+        'momentum': meta.get('momentum', 'Not Defined'),
+        'strategy_tag': meta.get('strategy_tag', 'Neutral'),
+        'analysis_date': meta.get('analysis_date', ''),
+        'last_modified': meta.get('last_modified', ''),
+        'modified_by': meta.get('modified_by', 'system')
+    }
+
 def supabase_save_strategy_analyses(strategy_data):
     """Save strategy analyses to Supabase - FIXED VERSION"""
+    records = []
+    for strategy_name, indicators in strategy_data.items():
+        for indicator_name, meta in indicators.items():
+            records.append(strategy_analysis_record(strategy_name, indicator_name, meta))
+    return supabase_upsert_strategy_analyses(records)
+
+def supabase_upsert_strategy_analyses(records):
+    """Upsert the given strategy_analyses rows (write-behind - flushed as one batched request)"""
     if not supabase_client:
         return False
     try:
-        records = []
-        for strategy_name, indicators in strategy_data.items():
-            for indicator_name, meta in indicators.items():
-                records.append({
-                    'strategy_name': strategy_name,
-                    'indicator_name': indicator_name,
-                    'note': meta.get('note', ''),
-                    'status': meta.get('status', 'Open'),
-                    'momentum': meta.get('momentum', 'Not Defined'),
-                    'strategy_tag': meta.get('strategy_tag', 'Neutral'),
-                    'analysis_date': meta.get('analysis_date', ''),
-                    'last_modified': meta.get('last_modified', ''),
-                    'modified_by': meta.get('modified_by', 'system')
-                })
-
-        if records:
+        write_queue = get_supabase_write_queue()
+        for record in records:
             # Use upsert with on_conflict to handle unique constraint
-            response = supabase_client.table('strategy_analyses').upsert(
-                records,
+            write_queue.enqueue(
+                f"strategy_analyses:{record['strategy_name']}:{record['indicator_name']}",
+                'strategy_analyses', 'upsert', [record],
                 on_conflict='strategy_name,indicator_name'
-            ).execute()
-            if hasattr(response, 'error') and response.error:
-                st.error(f"Supabase error saving strategy analyses: {response.error}")
-                return False
+            )
         return True
     except Exception as e:
         st.error(f"❌ Error saving strategy analyses: {e}")
@@ -3352,6 +5104,8 @@ def supabase_clear_gallery_images():
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error clearing gallery images: {response.error}")
             return False
+        prune_gallery_blobs(response.data or [])
+        get_gallery_page_cache().invalidate()
         return True
     except Exception as e:
         st.error(f"Error clearing gallery images: {e}")
@@ -3367,11 +5121,160 @@ def supabase_get_trading_signals():
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error getting trading signals: {response.error}")
             return []
-        return response.data
+        return get_supabase_write_queue().overlay_pending('trading_signals', response.data, 'signal_id')
     except Exception as e:
         st.error(f"Error getting trading signals: {e}")
         return []
 
+# signals_access_tracking: one row per username, bumped atomically in the database
+#   create unique index if not exists signals_access_tracking_username on signals_access_tracking (username);
+#   create index if not exists signals_access_tracking_recent on signals_access_tracking (last_access desc, username);
+#   -- Queued increments are retried/replayed, so each carries a request id applied at most once
+#   create table if not exists signals_access_requests (
+#     request_id uuid primary key, created_at timestamptz not null default now());
+#   create or replace function track_signals_access(p_username text, p_at timestamptz default now(),
+#                                                   p_request_id uuid default null)
+#   returns void language plpgsql as $$
+#   begin
+#     if p_request_id is not null then
+#       insert into signals_access_requests (request_id) values (p_request_id) on conflict do nothing;
+#       if not found then return; end if;
+#     end if;
+#     insert into signals_access_tracking (username, first_access, last_access, access_count)
+#     values (p_username, p_at, p_at, 1)
+#     on conflict (username) do update
+#       set last_access = greatest(signals_access_tracking.last_access, excluded.last_access),
+#           access_count = signals_access_tracking.access_count + 1;
+#   end $$;
+#   -- housekeeping: delete from signals_access_requests where created_at < now() - interval '30 days';
+#   create or replace function signals_access_stats() returns json language sql stable as $$
+#     select json_build_object('total_users', count(*), 'total_accesses', coalesce(sum(access_count), 0))
+#     from signals_access_tracking $$;
+SIGNALS_ACCESS_PAGE_SIZE = 25
+
+def supabase_track_signals_access(username, accessed_at=None):
+    """
+    Queue one atomic increment (track_signals_access RPC) - never coalesced
+    with other accesses; the request id makes retries and replays idempotent
+    """
+    if not supabase_client:
+        return False
+    try:
+        request_id = str(uuid.uuid4())
+        get_supabase_write_queue().enqueue(
+            f"signals_access_tracking:rpc:{request_id}", 'track_signals_access', 'rpc',
+            [{'p_username': username, 'p_at': accessed_at or datetime.now().astimezone().isoformat(),
+              'p_request_id': request_id}]
+        )
+        return True
+    except Exception as e:
+        logging.warning(f"Error queueing signals access for {username}: {e}")
+        return False
+
+def _pending_signals_access_usernames():
+    """Usernames with a queued access increment"""
+    return {write['rows'][0]['p_username']
+            for write in get_supabase_write_queue().pending('track_signals_access') if write['op'] == 'rpc'}
+
+def _overlay_signals_access(rows, new_usernames=()):
+    """
+    Apply queued access increments/edits to rows read from signals_access_tracking.
+    Increments for users not in rows only create a row if the username is in
+    new_usernames (known to have no row in the table yet); others are skipped.
+    """
+    write_queue = get_supabase_write_queue()
+    by_username = {row['username']: dict(row) for row in rows}
+    order = [row['username'] for row in rows]
+    writes = write_queue.pending('signals_access_tracking') + write_queue.pending('track_signals_access')
+    for write in sorted(writes, key=lambda w: w['seq']):
+        if write['op'] == 'rpc':
+            params = write['rows'][0]
+            row = by_username.get(params['p_username'])
+            if row is None:
+                if params['p_username'] not in new_usernames:
+                    continue
+                row = by_username[params['p_username']] = {
+                    'username': params['p_username'], 'first_access': params['p_at'],
+                    'last_access': params['p_at'], 'access_count': 0
+                }
+                order.insert(0, params['p_username'])
+            row['access_count'] = (row.get('access_count') or 0) + 1
+            row['last_access'] = max(str(row.get('last_access') or ''), params['p_at'])
+        elif write['op'] == 'upsert':
+            for queued in write['rows']:
+                if queued['username'] in by_username:
+                    by_username[queued['username']].update(queued)
+        elif write['op'] == 'delete':
+            by_username.pop(write['match'].get('username'), None)
+        elif write['op'] == 'replace':
+            by_username = {row['username']: dict(row) for row in write['rows']}
+            order = list(by_username)
+    return [by_username[username] for username in order if username in by_username]
+
+def supabase_get_signals_access_page(after=None, limit=SIGNALS_ACCESS_PAGE_SIZE):
+    """
+    Most recent accesses first, keyset-paginated on (last_access desc, username).
+    after is the cursor from the previous page; returns (rows, next_cursor).
+    """
+    if not supabase_client:
+        return [], None
+    try:
+        query = supabase_client.table('signals_access_tracking')\
+            .select('username, first_access, last_access, access_count')
+        if after is not None:
+            last_access, username = after
+            query = query.or_(f'last_access.lt."{last_access}",and(last_access.eq."{last_access}",username.gt."{username}")')
+        response = query.order('last_access', desc=True).order('username').limit(limit + 1).execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error getting signals access page: {response.error}")
+            return [], None
+        rows = response.data or []
+        has_more = len(rows) > limit
+        new_usernames = set()
+        if after is None:
+            # Queued first accesses go on top - but only for users the table doesn't have yet
+            missing = _pending_signals_access_usernames() - {row['username'] for row in rows}
+            if missing:
+                existing = supabase_client.table('signals_access_tracking')\
+                    .select('username').in_('username', sorted(missing)).execute()
+                new_usernames = missing - {row['username'] for row in existing.data or []}
+        rows = _overlay_signals_access(rows[:limit], new_usernames)
+        next_cursor = [rows[-1]['last_access'], rows[-1]['username']] if has_more and rows else None
+        return rows, next_cursor
+    except Exception as e:
+        logging.warning(f"Error getting signals access page: {e}")
+        return [], None
+
+def supabase_get_signals_access_stats():
+    """{'total_users', 'total_accesses'} from signals_access_stats(); exact row count if the RPC is missing"""
+    if not supabase_client:
+        return {"total_users": 0, "total_accesses": 0}
+    try:
+        response = supabase_client.rpc('signals_access_stats').execute()
+        if response.data:
+            return response.data
+    except Exception as e:
+        logging.warning(f"signals_access_stats RPC unavailable: {e}")
+    try:
+        response = supabase_client.table('signals_access_tracking').select('username', count='exact').limit(1).execute()
+        return {"total_users": response.count or 0, "total_accesses": None}
+    except Exception as e:
+        logging.warning(f"Error counting signals access rows: {e}")
+        return {"total_users": 0, "total_accesses": None}
+
+def supabase_delete_signals_access(username):
+    """Remove one user's tracking row (queued write-behind)"""
+    if not supabase_client:
+        return False
+    try:
+        get_supabase_write_queue().enqueue(
+            f"signals_access_tracking:{username}", 'signals_access_tracking', 'delete', match={'username': username}
+        )
+        return True
+    except Exception as e:
+        logging.warning(f"Error deleting signals access for {username}: {e}")
+        return False
+
 # SIMPLE DATABASE FUNCTIONS
 def supabase_get_signals_access_tracking():
     """Simple: Get who accessed signals room"""
@@ -3381,20 +5284,19 @@ def supabase_get_signals_access_tracking():
         response = supabase_client.table('signals_access_tracking').select('*').execute()
         if hasattr(response, 'error') and response.error:
             return []
-        return response.data
+        return get_supabase_write_queue().overlay_pending('signals_access_tracking', response.data, 'username')
     except Exception:
         return []
 
 def supabase_save_signals_access_tracking(tracking_data):
-    """Simple: Save access tracking"""
+    """Simple: Save access tracking (upsert per username - never empties the table)"""
     if not supabase_client:
         return False
     try:
-        # Clear and replace (simple approach)
-        delete_response = supabase_client.table('signals_access_tracking').delete().neq('id', 0).execute()
-        
-        if tracking_data:
-            response = supabase_client.table('signals_access_tracking').insert(tracking_data).execute()
+        write_queue = get_supabase_write_queue()
+        for track in tracking_data:
+            write_queue.enqueue(f"signals_access_tracking:{track['username']}", 'signals_access_tracking',
+                                'upsert', [track], on_conflict='username')
         return True
     except Exception:
         return False
@@ -3413,6 +5315,7 @@ def load_signals_access_tracking():
             return []
         
         data = response.data if hasattr(response, 'data') else []
+        data = get_supabase_write_queue().overlay_pending('signals_access_tracking', data or [], 'username')
         logging.info(f"✅ Loaded {len(data)} access tracking records")
         return data or []
         
@@ -3427,54 +5330,32 @@ def save_signals_access_tracking(tracking_data):
             logging.warning("⚠️ Supabase client not available")
             return False
         
-        # Clear existing tracking data first
-        try:
-            delete_response = supabase_client.table('signals_access_tracking').delete().neq('id', 0).execute()
-            if hasattr(delete_response, 'error') and delete_response.error:
-                logging.warning(f"⚠️ Could not clear existing tracking (may be normal): {delete_response.error}")
-        except Exception as delete_error:
-            logging.warning(f"⚠️ Clear operation failed (may be normal): {delete_error}")
-        
-        # If we have tracking data to save
-        if tracking_data:
-            # Ensure each record has required fields
-            cleaned_data = []
-            for track in tracking_data:
-                cleaned_track = {
-                    'username': track.get('username', 'unknown'),
-                    'first_access': track.get('first_access', datetime.now().isoformat()),
-                    'last_access': track.get('last_access', datetime.now().isoformat()),
-                    'access_count': track.get('access_count', 1)
-                }
-                cleaned_data.append(cleaned_track)
-            
-            # Insert the cleaned data
-            insert_response = supabase_client.table('signals_access_tracking').insert(cleaned_data).execute()
-            
-            if hasattr(insert_response, 'error') and insert_response.error:
-                logging.error(f"❌ Database insert error: {insert_response.error}")
-                return False
-            
-            logging.info(f"✅ Saved {len(cleaned_data)} access tracking records")
-            return True
-        else:
-            # No data to save is still successful
-            logging.info("✅ Cleared all access tracking (no data to save)")
-            return True
+        # Ensure each record has required fields
+        cleaned_data = []
+        for track in tracking_data or []:
+            cleaned_track = {
+                'username': track.get('username', 'unknown'),
+                'first_access': track.get('first_access', datetime.now().isoformat()),
+                'last_access': track.get('last_access', datetime.now().isoformat()),
+                'access_count': track.get('access_count', 1)
+            }
+            cleaned_data.append(cleaned_track)
+
+        # Upsert on username (queued write-behind) - no delete-all window
+        if not supabase_save_signals_access_tracking(cleaned_data):
+            return False
+        logging.info(f"✅ Queued {len(cleaned_data)} access tracking records")
+        return True
         
     except Exception as e:
         logging.error(f"❌ Error saving access tracking: {e}")
         return False
         
 def track_signals_access(username):
-    """Track signals access - FIXED VERSION"""
+    """Track signals access - one atomic increment per room entry"""
     try:
-        # Initialize if needed
-        if 'signals_access_tracking' not in st.session_state:
-            st.session_state.signals_access_tracking = load_signals_access_tracking()
-        
-        tracking = st.session_state.signals_access_tracking
-        current_time = datetime.now().isoformat()
+        tracking = st.session_state.get('signals_access_tracking', [])
+        current_time = datetime.now().astimezone().isoformat()
         
         # Find or create user entry
         user_entry = None
@@ -3499,43 +5380,89 @@ def track_signals_access(username):
         # Always update session state
         st.session_state.signals_access_tracking = tracking
         
-        # Try to save to DB (don't block if fails)
-        try:
-            if supabase_client:
-                # Clear old data first
-                supabase_client.table('signals_access_tracking').delete().neq('id', 0).execute()
-                # Insert new data
-                if tracking:
-                    supabase_client.table('signals_access_tracking').insert(tracking).execute()
-        except Exception as db_error:
-            logging.warning(f"⚠️ DB save failed but continuing: {db_error}")
+        # Queue the increment (write-behind - never blocks the rerun)
+        if not supabase_track_signals_access(username, current_time):
+            logging.warning(f"⚠️ DB save failed but continuing for: {username}")
         
         logging.info(f"✅ Tracked access for: {username}")
         
     except Exception as e:
         logging.error(f"❌ Track access failed: {e}")
         
+# trading_signals is written one signal at a time, with optimistic versioning:
+#   alter table trading_signals add column if not exists version integer not null default 1;
+#   create unique index if not exists trading_signals_signal_id on trading_signals (signal_id);
+#   create index if not exists trading_signals_status_created on trading_signals (status, created_at desc);
+#   create index if not exists trading_signals_asset_status on trading_signals (asset, status);
+def _trading_signal_row(signal):
+    return {k: v for k, v in signal.items() if k != 'id'}
+
+def _trading_signal_order_key(signal_id):
+    """Queue order_key: one signal's writes reach the database in the order they were made"""
+    return f"trading_signals:{signal_id}"
+
 def supabase_save_trading_signals(signals):
-    """Save trading signals to Supabase - FIXED VERSION"""
+    """Save trading signals to Supabase - upsert per signal_id (queued write-behind, no table wipe)"""
     if not supabase_client:
         return False
     try:
-        # Clear and replace all signals
-        delete_response = supabase_client.table('trading_signals').delete().neq('id', 0).execute()
-        if hasattr(delete_response, 'error') and delete_response.error:
-            st.error(f"Supabase error clearing trading signals: {delete_response.error}")
-            return False
-
-        if signals:
-            response = supabase_client.table('trading_signals').insert(signals).execute()
-            if hasattr(response, 'error') and response.error:
-                st.error(f"Supabase error saving trading signals: {response.error}")
-                return False
+        write_queue = get_supabase_write_queue()
+        for signal in signals:
+            write_queue.enqueue(f"trading_signals:{signal['signal_id']}:v{signal.get('version', 1)}",
+                                'trading_signals', 'upsert', [_trading_signal_row(signal)], on_conflict='signal_id',
+                                order_key=_trading_signal_order_key(signal['signal_id']))
         return True
     except Exception as e:
         st.error(f"Error saving trading signals: {e}")
         return False
 
+def supabase_update_trading_signal(signal, expected_version):
+    """Queue a conditional update: applies only if the row is still at expected_version"""
+    if not supabase_client:
+        return False
+    try:
+        get_supabase_write_queue().enqueue(
+            f"trading_signals:{signal['signal_id']}:v{signal['version']}", 'trading_signals', 'update',
+            [_trading_signal_row(signal)], match={'signal_id': signal['signal_id'], 'version': expected_version},
+            order_key=_trading_signal_order_key(signal['signal_id'])
+        )
+        return True
+    except Exception as e:
+        st.error(f"Error updating trading signal: {e}")
+        return False
+
+def supabase_update_trading_signal_now(signal, expected_version):
+    """
+    Conditional update sent immediately (admin actions that must report
+    conflicts): True if applied, False if the row is no longer at
+    expected_version (or gone), None if the request failed
+    """
+    if not supabase_client:
+        return None
+    try:
+        response = supabase_client.table('trading_signals').update(_trading_signal_row(signal))\
+            .eq('signal_id', signal['signal_id']).eq('version', expected_version).execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error updating trading signal: {response.error}")
+            return None
+        return bool(response.data)
+    except Exception as e:
+        logging.warning(f"Error updating trading signal: {e}")
+        return None
+
+def supabase_delete_trading_signal(signal_id):
+    """Queue deletion of one signal"""
+    if not supabase_client:
+        return False
+    try:
+        get_supabase_write_queue().enqueue(f"trading_signals:{signal_id}:delete", 'trading_signals', 'delete',
+                                           match={'signal_id': signal_id},
+                                           order_key=_trading_signal_order_key(signal_id))
+        return True
+    except Exception as e:
+        st.error(f"Error deleting trading signal: {e}")
+        return False
+
 # NEW: App settings table functions for Signals Room Password
 def supabase_get_app_settings():
     """Get app settings from Supabase - FIXED VERSION"""
@@ -3547,7 +5474,7 @@ def supabase_get_app_settings():
             st.error(f"Supabase error getting app settings: {response.error}")
             return {}
         settings = {}
-        for item in response.data:
+        for item in get_supabase_write_queue().overlay_pending('app_settings', response.data, 'setting_name'):
             settings[item['setting_name']] = item['setting_value']
         return settings
     except Exception as e:
@@ -3559,18 +5486,12 @@ def supabase_save_app_settings(settings):
     if not supabase_client:
         return False
     try:
-        records = []
+        write_queue = get_supabase_write_queue()
         for setting_name, setting_value in settings.items():
-            records.append({
+            write_queue.enqueue(f"app_settings:{setting_name}", 'app_settings', 'upsert', [{
                 'setting_name': setting_name,
                 'setting_value': setting_value
-            })
-
-        if records:
-            response = supabase_client.table('app_settings').upsert(records).execute()
-            if hasattr(response, 'error') and response.error:
-                st.error(f"Supabase error saving app settings: {response.error}")
-                return False
+            }])
         return True
     except Exception as e:
         st.error(f"Error saving app settings: {e}")
@@ -3578,85 +5499,88 @@ def supabase_save_app_settings(settings):
 
 # Strategy indicator images table functions - FIXED VERSION
 def supabase_get_strategy_indicator_images():
-    """Get strategy indicator images from Supabase - FIXED"""
+    """
+    Metadata index of strategy indicator images {strategy: {indicator: meta}} -
+    no bytes_b64; image bytes are fetched per image on first view
+    """
     if not supabase_client:
         return {}
     try:
-        response = supabase_client.table('strategy_indicator_images').select('*').execute()
+        response = supabase_client.table('strategy_indicator_images')\
+            .select('strategy_name, indicator_name, name, format, uploaded_by, timestamp').execute()
         if hasattr(response, 'error') and response.error:
             st.error(f"Supabase error getting strategy indicator images: {response.error}")
             return {}
         images_data = {}
         for item in response.data:
-            strategy_name = item['strategy_name']
-            indicator_name = item['indicator_name']
-            if strategy_name not in images_data:
-                images_data[strategy_name] = {}
-            # Convert base64 back to bytes
-            if 'bytes_b64' in item:
-                try:
-                    item['bytes'] = base64.b64decode(item['bytes_b64'])
-                    images_data[strategy_name][indicator_name] = item
-                except Exception as e:
-                    st.error(f"Error decoding image for {strategy_name}/{indicator_name}: {e}")
-                    continue
+            images_data.setdefault(item['strategy_name'], {})[item['indicator_name']] = item
         return images_data
     except Exception as e:
         st.error(f"Error getting strategy indicator images: {e}")
         return {}
 
+# One row per chart; writes are single-row upserts on the pair:
+#   create unique index if not exists strategy_indicator_images_pair
+#       on strategy_indicator_images (strategy_name, indicator_name);
+
+def strategy_indicator_image_record(strategy_name, indicator_name, img_data):
+    """strategy_indicator_images row for one chart (bytes base64-encoded)"""
+    record = {
+        'strategy_name': strategy_name,
+        'indicator_name': indicator_name,
+        'name': img_data.get('name', f"{strategy_name}_{indicator_name}"),
+        'format': img_data.get('format', 'PNG'),
+        'uploaded_by': img_data.get('uploaded_by', 'unknown'),
+        'timestamp': img_data.get('timestamp', datetime.now().isoformat())
+    }
+    if 'bytes' in img_data:
+        record['bytes_b64'] = base64.b64encode(img_data['bytes']).decode('utf-8')
+    return record
+
+def supabase_upsert_strategy_indicator_image(strategy_name, indicator_name, img_data):
+    """Upsert ONE strategy indicator image on (strategy_name, indicator_name)"""
+    if not supabase_client:
+        return False
+    try:
+        record = strategy_indicator_image_record(strategy_name, indicator_name, img_data)
+        response = supabase_client.table('strategy_indicator_images')\
+            .upsert(record, on_conflict='strategy_name,indicator_name').execute()
+        if hasattr(response, 'error') and response.error:
+            st.error(f"Supabase error saving strategy indicator image: {response.error}")
+            return False
+        return True
+    except Exception as e:
+        st.error(f"❌ Error saving strategy indicator image for {strategy_name}/{indicator_name}: {e}")
+        return False
+
 def supabase_save_strategy_indicator_images(images_data):
-    """Save strategy indicator images to Supabase - FIXED"""
+    """
+    Save strategy indicator images to Supabase - upserts only the images that
+    are new or whose timestamp changed (existing rows read metadata-only)
+    """
     if not supabase_client:
         return False
     try:
-        # Get all existing records to delete only what we're replacing
-        existing_response = supabase_client.table('strategy_indicator_images').select('*').execute()
+        existing_response = supabase_client.table('strategy_indicator_images')\
+            .select('strategy_name, indicator_name, timestamp').execute()
         if hasattr(existing_response, 'error') and existing_response.error:
             st.error(f"Supabase error getting existing strategy indicator images: {existing_response.error}")
             return False
-        existing_records = existing_response.data if existing_response.data else []
-
-        records = []
-        for strategy_name, indicators in images_data.items():
-            for indicator_name, img_data in indicators.items():
-                # Create a clean record
-                record = {
-                    'strategy_name': strategy_name,
-                    'indicator_name': indicator_name,
-                    'name': img_data.get('name', f"{strategy_name}_{indicator_name}"),
-                    'format': img_data.get('format', 'PNG'),
-                    'uploaded_by': img_data.get('uploaded_by', 'unknown'),
-                    'timestamp': img_data.get('timestamp', datetime.now().isoformat())
-                }
-
-                # Convert bytes to base64
-                if 'bytes' in img_data:
-                    try:
-                        record['bytes_b64'] = base64.b64encode(img_data['bytes']).decode('utf-8')
-                    except Exception as e:
-                        st.error(f"Error encoding image for {strategy_name}/{indicator_name}: {e}")
-                        continue
-
-                records.append(record)
-
-        # Delete existing records for the strategies we're updating
-        if records:
-            strategies_to_update = list(set([r['strategy_name'] for r in records]))
-            for strategy in strategies_to_update:
-                delete_response = supabase_client.table('strategy_indicator_images').delete().eq('strategy_name', strategy).execute()
-                if hasattr(delete_response, 'error') and delete_response.error:
-                    st.error(f"Supabase error deleting strategy indicator images for {strategy}: {delete_response.error}")
-                    return False
-
-        # Insert new records
-        if records:
-            response = supabase_client.table('strategy_indicator_images').insert(records).execute()
-            if hasattr(response, 'error') and response.error:
-                st.error(f"Supabase error saving strategy indicator images: {response.error}")
-                return False
+        existing = {
+            (row['strategy_name'], row['indicator_name']): row.get('timestamp')
+            for row in existing_response.data or []
+        }
 
-        return True
+        success = True
+        for strategy_name, indicators in images_data.items():
+            for indicator_name, img_data in indicators.items():
+                if (strategy_name, indicator_name) in existing and \
+                        existing[(strategy_name, indicator_name)] == img_data.get('timestamp'):
+                    continue  # Unchanged - don't re-upload its bytes
+                if 'bytes' not in img_data:
+                    continue
+                success = supabase_upsert_strategy_indicator_image(strategy_name, indicator_name, img_data) and success
+        return success
     except Exception as e:
         st.error(f"❌ Error saving strategy indicator images: {e}")
         return False
@@ -3690,27 +5614,28 @@ def supabase_get_kai_analyses():
         st.error(f"Error getting KAI analyses: {e}")
         return []
 
+def _build_kai_analysis_record(analysis_data):
+    """kai_analyses row for an analysis dict (shared by single and bulk saves)"""
+    return {
+        'id': str(uuid.uuid4()),
+        'analysis_data': analysis_data,
+        'uploaded_by': st.session_state.user['username'],
+        'created_at': datetime.now().isoformat(),
+        'analysis_type': analysis_data.get('analysis_type', 'standard'),
+        'deepseek_enhanced': analysis_data.get('deepseek_enhanced', False),
+        'confidence_score': analysis_data.get('confidence_assessment', 0),
+        'total_strategies': analysis_data.get('overview_metrics', {}).get('total_strategies', 0),
+        'reversal_signals': len(analysis_data.get('signal_details', {}).get('reversal_signals', [])),
+        'risk_score': analysis_data.get('risk_assessment_data', {}).get('overall_risk_score', 0)
+    }
+
 def supabase_save_kai_analysis(analysis_data):
     """Save KAI analysis to Supabase - FIXED VERSION"""
     if not supabase_client:
         return False
     try:
-        # Generate a unique ID for this analysis
-        analysis_id = str(uuid.uuid4())
-
-        # Prepare the record with enhanced metadata
-        record = {
-            'id': analysis_id,
-            'analysis_data': analysis_data,
-            'uploaded_by': st.session_state.user['username'],
-            'created_at': datetime.now().isoformat(),
-            'analysis_type': analysis_data.get('analysis_type', 'standard'),
-            'deepseek_enhanced': analysis_data.get('deepseek_enhanced', False),
-            'confidence_score': analysis_data.get('confidence_assessment', 0),
-            'total_strategies': analysis_data.get('overview_metrics', {}).get('total_strategies', 0),
-            'reversal_signals': len(analysis_data.get('signal_details', {}).get('reversal_signals', [])),
-            'risk_score': analysis_data.get('risk_assessment_data', {}).get('overall_risk_score', 0)
-        }
+        # Prepare the record with enhanced metadata (and a unique ID)
+        record = _build_kai_analysis_record(analysis_data)
 
         response = supabase_client.table('kai_analyses').insert(record).execute()
         if hasattr(response, 'error') and response.error:
@@ -3721,6 +5646,24 @@ def supabase_save_kai_analysis(analysis_data):
         st.error(f"Error saving KAI analysis: {e}")
         return False
 
+def supabase_save_kai_analyses_bulk(analyses):
+    """Save several KAI analyses to Supabase in one insert (batch runs)"""
+    if not supabase_client:
+        return False
+    if not analyses:
+        return True
+    try:
+        records = [_build_kai_analysis_record(analysis_data) for analysis_data in analyses]
+
+        response = supabase_client.table('kai_analyses').insert(records).execute()
+        if hasattr(response, 'error') and response.error:
+            st.error(f"Supabase error saving KAI batch: {response.error}")
+            return False
+        return True
+    except Exception as e:
+        st.error(f"Error saving KAI batch: {e}")
+        return False
+
 def supabase_get_latest_kai_analysis():
     """Get the latest KAI analysis from Supabase"""
     if not supabase_client:
@@ -3737,6 +5680,20 @@ def supabase_get_latest_kai_analysis():
         st.error(f"Error getting latest KAI analysis: {e}")
         return None
 
+def supabase_get_latest_kai_analysis_id():
+    """{'id': ...} of the newest KAI analysis ({} if there are none), or None if the read failed"""
+    if not supabase_client:
+        return None
+    try:
+        response = supabase_client.table('kai_analyses').select('id').order('created_at', desc=True).limit(1).execute()
+        if hasattr(response, 'error') and response.error:
+            logging.warning(f"Supabase error getting latest KAI analysis id: {response.error}")
+            return None
+        return response.data[0] if response.data else {}
+    except Exception as e:
+        logging.warning(f"Error getting latest KAI analysis id: {e}")
+        return None
+
 def supabase_delete_kai_analysis(analysis_id):
     """Delete a specific KAI analysis from Supabase"""
     if not supabase_client:
@@ -3938,18 +5895,10 @@ def init_session():
     # --- Trading Signals Room state ---
     if 'signals_room_view' not in st.session_state:
         st.session_state.signals_room_view = 'active_signals'
-    if 'active_signals' not in st.session_state:
-        st.session_state.active_signals = load_signals_data()
     
-    # 🔧 FIX: Initialize signals_access_tracking PROPERLY
+    # Accesses of this session only - the admin views page through the table instead
     if 'signals_access_tracking' not in st.session_state:
         st.session_state.signals_access_tracking = []
-    # Then load from database
-    try:
-        st.session_state.signals_access_tracking = load_signals_access_tracking()
-    except Exception as e:
-        logging.warning(f"Could not load access tracking: {e}")
-        st.session_state.signals_access_tracking = []
     
     if 'signal_creation_mode' not in st.session_state:
         st.session_state.signal_creation_mode = 'quick'
@@ -4066,8 +6015,18 @@ def load_kai_analyses():
     return supabase_get_kai_analyses()
 
 def save_kai_analysis(analysis_data):
-    """Save KAI analysis to Supabase"""
-    return supabase_save_kai_analysis(analysis_data)
+    """Save KAI analysis to Supabase (refreshes KAI's chat memory)"""
+    saved = supabase_save_kai_analysis(analysis_data)
+    if saved:
+        get_kai_memory_context_cache().invalidate()
+    return saved
+
+def save_kai_analyses_bulk(analyses):
+    """Save a batch of KAI analyses to Supabase in one insert"""
+    saved = supabase_save_kai_analyses_bulk(analyses)
+    if saved:
+        get_kai_memory_context_cache().invalidate()
+    return saved
 
 def get_latest_kai_analysis():
     """Get the latest KAI analysis from Supabase"""
@@ -4075,11 +6034,17 @@ def get_latest_kai_analysis():
 
 def delete_kai_analysis(analysis_id):
     """Delete a specific KAI analysis"""
-    return supabase_delete_kai_analysis(analysis_id)
+    deleted = supabase_delete_kai_analysis(analysis_id)
+    if deleted:
+        get_kai_memory_context_cache().invalidate()
+    return deleted
 
 def clear_all_kai_analyses():
     """Clear ALL KAI analyses (admin only)"""
-    return supabase_clear_all_kai_analyses()
+    cleared = supabase_clear_all_kai_analyses()
+    if cleared:
+        get_kai_memory_context_cache().invalidate()
+    return cleared
 
 # -------------------------
 # DATA PERSISTENCE SETUP
@@ -4088,7 +6053,8 @@ def setup_data_persistence():
     """Set up periodic data saving to prevent data loss"""
     current_time = time.time()
     if current_time - st.session_state.last_save_time > 300:  # 5 minutes
-        user_manager.save_users()
+        # Users are saved row by row as they change - re-upserting every row here
+        # would bump updated_at on all of them and defeat incremental refreshes
         user_manager.save_analytics()
         
         # Save strategy analyses data - FIXED: Save from session state
@@ -4101,31 +6067,95 @@ def setup_data_persistence():
         # ❌ REMOVED: save_gallery_images() - paginated system saves directly to Supabase on upload
         # Gallery images are now saved immediately when uploaded, not periodically
         
-        # Save signals data
-        try:
-            save_signals_data(st.session_state.active_signals)
-        except Exception as e:
-            logging.warning(f"⚠️ Error saving signals data: {e}")
+        # Signals are written per signal by TradingSignalStore when they change
         
-        # Save strategy indicator images - FIXED: Now properly saves to Supabase
-        try:
-            save_strategy_indicator_images(st.session_state.strategy_indicator_images)
-        except Exception as e:
-            logging.warning(f"⚠️ Error saving strategy indicator images: {e}")
+        # Strategy indicator images are upserted one row at a time on upload/delete
         
         st.session_state.last_save_time = current_time
 
 # -------------------------
 # STRATEGY ANALYSES DATA PERSISTENCE - FIXED VERSION
 # -------------------------
+class StrategyAnalysesTracker:
+    """
+    Change tracking for st.session_state.strategy_analyses_data.
+    Remembers the persisted state of every (strategy, indicator) row so a save
+    only upserts rows that changed.
+    """
+
+    def __init__(self, data=None):
+        self._persisted = {}   # (strategy, indicator) -> row as last loaded/saved
+        self.metrics = {
+            "saves": 0,
+            "noop_saves": 0,
+            "rows_written": 0,
+            "rows_skipped": 0,
+            "last_written": 0,
+            "last_skipped": 0
+        }
+        if data:
+            self.reset(data)
+
+    def reset(self, data):
+        """Treat data as exactly what is stored in Supabase (after a load)"""
+        self._persisted = {
+            (strategy_name, indicator_name): strategy_analysis_record(strategy_name, indicator_name, meta)
+            for strategy_name, indicators in data.items()
+            for indicator_name, meta in indicators.items()
+        }
+
+    def dirty_records(self, data):
+        """(key, row) pairs that differ from what was last persisted"""
+        dirty = []
+        for strategy_name, indicators in data.items():
+            for indicator_name, meta in indicators.items():
+                key = (strategy_name, indicator_name)
+                record = strategy_analysis_record(strategy_name, indicator_name, meta)
+                if self._persisted.get(key) != record:
+                    dirty.append((key, record))
+        return dirty
+
+    def mark_saved(self, dirty):
+        for key, record in dirty:
+            self._persisted[key] = record
+
+    def record_save(self, written, skipped):
+        self.metrics["saves"] += 1
+        self.metrics["rows_written"] += written
+        self.metrics["rows_skipped"] += skipped
+        self.metrics["last_written"] = written
+        self.metrics["last_skipped"] = skipped
+        if not written:
+            self.metrics["noop_saves"] += 1
+
+def get_strategy_analyses_tracker():
+    """Per-session change tracker for strategy_analyses_data"""
+    if 'strategy_analyses_tracker' not in st.session_state:
+        st.session_state.strategy_analyses_tracker = StrategyAnalysesTracker(
+            st.session_state.get('strategy_analyses_data') or {}
+        )
+    return st.session_state.strategy_analyses_tracker
+
 def load_data():
     """Load strategy analyses data from Supabase - FIXED"""
     data = supabase_get_strategy_analyses()
+    st.session_state.strategy_analyses_tracker = StrategyAnalysesTracker(data)
     return data
 
 def save_data(data):
-    """Save strategy analyses data to Supabase - FIXED"""
-    success = supabase_save_strategy_analyses(data)
+    """Save strategy analyses data to Supabase - only rows changed since the last load/save"""
+    tracker = get_strategy_analyses_tracker()
+    dirty = tracker.dirty_records(data)
+    total_rows = sum(len(indicators) for indicators in data.values())
+
+    success = True
+    if dirty:
+        success = supabase_upsert_strategy_analyses([record for _, record in dirty])
+    if success:
+        tracker.mark_saved(dirty)
+        tracker.record_save(len(dirty), total_rows - len(dirty))
+        if dirty:
+            logging.info(f"strategy_analyses: wrote {len(dirty)} rows, skipped {total_rows - len(dirty)} unchanged")
     return success
 
 def generate_filtered_csv_bytes(data, target_date):
@@ -4152,7 +6182,7 @@ def generate_filtered_csv_bytes(data, target_date):
 # STRATEGY INDICATOR IMAGES PERSISTENCE - FIXED VERSION
 # -------------------------
 def load_strategy_indicator_images():
-    """Load strategy indicator images from Supabase - FIXED"""
+    """Load the strategy indicator image metadata index (bytes are fetched lazily)"""
     images_data = supabase_get_strategy_indicator_images()
     return images_data
 
@@ -4162,11 +6192,14 @@ def save_strategy_indicator_images(images_data):
     return success
 
 def get_strategy_indicator_image(strategy_name, indicator_name):
-    """Get image for a specific strategy indicator - FIXED"""
-    if strategy_name in st.session_state.strategy_indicator_images:
-        if indicator_name in st.session_state.strategy_indicator_images[strategy_name]:
-            return st.session_state.strategy_indicator_images[strategy_name][indicator_name]
-    return None
+    """Get image (metadata + lazily fetched bytes) for a specific strategy indicator"""
+    meta = st.session_state.strategy_indicator_images.get(strategy_name, {}).get(indicator_name)
+    if not meta:
+        return None
+    img_bytes = get_strategy_image_lazy(strategy_name, indicator_name, meta.get('timestamp'))
+    if img_bytes is None:
+        return None
+    return dict(meta, bytes=img_bytes)
 
 def save_strategy_indicator_image(strategy_name, indicator_name, image_data):
     """Save image for a specific strategy indicator - FIXED"""
@@ -4181,10 +6214,16 @@ def save_strategy_indicator_image(strategy_name, indicator_name, image_data):
     if 'timestamp' not in image_data:
         image_data['timestamp'] = datetime.now().isoformat()
 
-    st.session_state.strategy_indicator_images[strategy_name][indicator_name] = image_data
+    # Session keeps metadata only; the bytes go to the shared byte cache
+    st.session_state.strategy_indicator_images[strategy_name][indicator_name] = {
+        k: v for k, v in image_data.items() if k != 'bytes'
+    }
+    cache = get_strategy_image_cache()
+    cache.invalidate(lambda key: key[:2] == (strategy_name, indicator_name))
+    cache.put((strategy_name, indicator_name, image_data['timestamp']), image_data.get('bytes'))
 
-    # Save to Supabase immediately
-    success = save_strategy_indicator_images(st.session_state.strategy_indicator_images)
+    # Save to Supabase immediately - just this image
+    success = supabase_upsert_strategy_indicator_image(strategy_name, indicator_name, image_data)
 
     return success
 
@@ -4198,26 +6237,188 @@ def delete_strategy_indicator_image(strategy_name, indicator_name):
             if not st.session_state.strategy_indicator_images[strategy_name]:
                 del st.session_state.strategy_indicator_images[strategy_name]
 
-            # Save to Supabase immediately
-            success = save_strategy_indicator_images(st.session_state.strategy_indicator_images)
-
-            # Also delete from Supabase directly
-            supabase_delete_strategy_indicator_image(strategy_name, indicator_name)
+            get_strategy_image_cache().invalidate(lambda key: key[:2] == (strategy_name, indicator_name))
 
-            return success
+            # Delete just this row from Supabase
+            return supabase_delete_strategy_indicator_image(strategy_name, indicator_name)
 
     return False
 
 # -------------------------
 # TRADING SIGNALS DATA PERSISTENCE
 # -------------------------
+SIGNAL_STORE_REFRESH_SECONDS = 60  # Re-read trading_signals at most this often (other processes' changes)
+
+class TradingSignalStore:
+    """
+    Process-wide trading signals keyed by signal_id, with status and asset
+    indexes for the confirmation queue / published / overview views.
+    Every change is written for that one signal only; updates carry the
+    version they were based on, so when two admins act on the same signal
+    the second one gets a conflict instead of silently overwriting. Updates
+    go to the database synchronously (unless the signal's create is still
+    queued, in which case they queue behind it) so the conflict is reported
+    to the admin who made the change.
+    """
+
+    def __init__(self, refresh_seconds=SIGNAL_STORE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._signals = {}
+        self._by_status = {}
+        self._by_asset = {}
+        self._lock = threading.RLock()
+        self._loaded_at = None
+
+    # --- indexes ---
+    def _index(self, signal):
+        self._signals[signal['signal_id']] = signal
+        self._by_status.setdefault(signal.get('status'), set()).add(signal['signal_id'])
+        self._by_asset.setdefault(signal.get('asset'), set()).add(signal['signal_id'])
+
+    def _unindex(self, signal_id):
+        signal = self._signals.pop(signal_id, None)
+        if signal:
+            self._by_status.get(signal.get('status'), set()).discard(signal_id)
+            self._by_asset.get(signal.get('asset'), set()).discard(signal_id)
+        return signal
+
+    # --- reads ---
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and self._loaded_at and time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return self
+            rows = supabase_get_trading_signals()
+            self._signals, self._by_status, self._by_asset = {}, {}, {}
+            for row in rows:
+                if row.get('signal_id'):
+                    row.setdefault('version', 1)
+                    row.setdefault('confirmations', [])
+                    self._index(row)
+            self._loaded_at = time.monotonic()
+        return self
+
+    def get(self, signal_id):
+        self.refresh()
+        with self._lock:
+            signal = self._signals.get(signal_id)
+            return copy.deepcopy(signal) if signal else None
+
+    def list(self, status=None, asset=None):
+        """Signals (copies) filtered through the indexes, oldest first"""
+        self.refresh()
+        with self._lock:
+            ids = set(self._signals)
+            if status is not None:
+                ids &= self._by_status.get(status, set())
+            if asset is not None:
+                ids &= self._by_asset.get(asset, set())
+            signals = [copy.deepcopy(self._signals[i]) for i in ids]
+        return sorted(signals, key=lambda s: s.get('created_at') or '')
+
+    def count(self, status=None):
+        self.refresh()
+        with self._lock:
+            return len(self._signals) if status is None else len(self._by_status.get(status, ()))
+
+    # --- writes (one signal each) ---
+    def create(self, signal):
+        """Add a new signal -> (ok, signal or message)"""
+        signal = dict(signal, version=1)
+        with self._lock:
+            if signal['signal_id'] in self._signals:
+                return False, "Signal id already exists"
+            self._index(signal)
+        if not supabase_save_trading_signals([signal]):
+            with self._lock:
+                self._unindex(signal['signal_id'])
+            return False, "Could not save the signal - please try again"
+        return True, copy.deepcopy(signal)
+
+    def _restore(self, signal_id, updated, previous):
+        """Put previous back unless something newer replaced updated meanwhile"""
+        with self._lock:
+            if self._signals.get(signal_id, {}).get('version') == updated['version']:
+                self._unindex(signal_id)
+                self._index(previous)
+
+    def update(self, signal_id, changes, expected_version):
+        """Apply changes if the signal is still at expected_version -> (ok, signal or message)"""
+        with self._lock:
+            current = self._signals.get(signal_id)
+            if current is None:
+                return False, "Signal no longer exists"
+            if current.get('version', 1) != expected_version:
+                return False, "Signal was changed by another admin - please review it again"
+            updated = dict(copy.deepcopy(current), **changes)
+            updated['version'] = expected_version + 1
+            self._unindex(signal_id)
+            self._index(updated)
+
+        if get_supabase_write_queue().has_pending(_trading_signal_order_key(signal_id)):
+            # Not in the database yet - queue behind the pending create/updates
+            if supabase_update_trading_signal(updated, expected_version):
+                return True, copy.deepcopy(updated)
+            self._restore(signal_id, updated, current)
+            return False, "Could not save the signal - please try again"
+
+        applied = supabase_update_trading_signal_now(updated, expected_version)
+        if applied:
+            return True, copy.deepcopy(updated)
+        if applied is False:
+            # Another process changed or deleted it: show the admin what the database has now
+            self.refresh(force=True)
+            return False, "Signal was changed by another admin - please review it again"
+        self._restore(signal_id, updated, current)
+        return False, "Could not save the signal - please try again"
+
+    def delete(self, signal_id, expected_version=None):
+        with self._lock:
+            current = self._signals.get(signal_id)
+            if current is None:
+                return False
+            if expected_version is not None and current.get('version', 1) != expected_version:
+                return False
+            self._unindex(signal_id)
+        return supabase_delete_trading_signal(signal_id)
+
+    def save_changed(self, signals):
+        """Persist only the signals that differ from the store (and delete the ones missing)"""
+        self.refresh()
+        incoming = {s['signal_id']: s for s in signals if s.get('signal_id')}
+        ok = True
+        with self._lock:
+            removed = [sid for sid in self._signals if sid not in incoming]
+            changed = []
+            for signal_id, signal in incoming.items():
+                current = self._signals.get(signal_id)
+                if current is None:
+                    changed.append(dict(signal, version=1))
+                elif {k: v for k, v in signal.items() if k != 'version'} != \
+                        {k: v for k, v in current.items() if k != 'version'}:
+                    changed.append(dict(signal, version=current.get('version', 1) + 1))
+            for signal_id in removed:
+                self._unindex(signal_id)
+            for signal in changed:
+                self._unindex(signal['signal_id'])
+                self._index(copy.deepcopy(signal))
+        if changed:
+            ok = supabase_save_trading_signals(changed) and ok
+        for signal_id in removed:
+            ok = supabase_delete_trading_signal(signal_id) and ok
+        return ok
+
+@st.cache_resource
+def get_trading_signal_store():
+    """Process-wide trading signal store shared by every session"""
+    return TradingSignalStore()
+
 def load_signals_data():
-    """Load trading signals from Supabase"""
-    return supabase_get_trading_signals()
+    """Load trading signals (from the shared signal store)"""
+    return get_trading_signal_store().list()
 
 def save_signals_data(signals):
-    """Save trading signals to Supabase"""
-    return supabase_save_trading_signals(signals)
+    """Save trading signals - only the ones that changed are written"""
+    return get_trading_signal_store().save_changed(signals)
 
 # -------------------------
 # GALLERY IMAGE PERSISTENCE
@@ -4233,7 +6434,7 @@ def load_gallery_images_metadata_only():
         # ⚡ CRITICAL OPTIMIZATION: We explicitly exclude 'bytes_b64'
         # This makes the query 100x faster because we aren't downloading images yet
         response = supabase_client.table('gallery_images')\
-            .select('id, name, description, uploaded_by, timestamp, likes, format, strategies')\
+            .select(GALLERY_IMAGE_COLUMNS)\
             .execute()
             
         return response.data if response.data else []
@@ -4241,33 +6442,621 @@ def load_gallery_images_metadata_only():
         logging.error(f"Metadata load failed: {e}")
         return []
 
-def get_strategy_image_lazy(strategy_name, indicator_name):
-    """Fetch ONE specific image only when needed (Lazy Loading)"""
-    # 1. Check if we already loaded it this session (Cache Check)
-    cache_key = f"img_{strategy_name}_{indicator_name}"
-    if cache_key in st.session_state:
-        return st.session_state[cache_key]
-    
-    # 2. If not in cache, fetch JUST THIS ONE image from Supabase
+STRATEGY_IMAGE_CACHE_MAX_MB = 64  # Decoded chart bytes kept in memory per process (all sessions)
+
+class ImageByteCache:
+    """
+    Process-wide LRU of decoded image bytes, bounded by total size rather
+    than entry count. Shared by every session so each chart is downloaded
+    and base64-decoded once per process instead of once per session.
+    """
+
+    def __init__(self, max_bytes=STRATEGY_IMAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> bytes
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if not data or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, match):
+        """Drop every entry whose key satisfies match(key)"""
+        with self._lock:
+            for key in [k for k in self._entries if match(k)]:
+                self._size -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "megabytes": round(self._size / (1024 * 1024), 2),
+                    "max_megabytes": round(self.max_bytes / (1024 * 1024), 2),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+@st.cache_resource
+def get_strategy_image_cache():
+    """Process-wide decoded strategy chart bytes"""
+    return ImageByteCache()
+
+def get_strategy_image_lazy(strategy_name, indicator_name, version=None):
+    """
+    Fetch ONE specific image only when needed (Lazy Loading). `version` (the
+    image timestamp) is part of the cache key so a re-upload is never served stale.
+    """
+    cache = get_strategy_image_cache()
+    cache_key = (strategy_name, indicator_name, version)
+    img_bytes = cache.get(cache_key)
+    if img_bytes is not None:
+        return img_bytes
+
+    # Not cached in this process - fetch JUST THIS ONE image from Supabase
+    if not supabase_client:
+        return None
     try:
         response = supabase_client.table('strategy_indicator_images')\
             .select('bytes_b64')\
             .eq('strategy_name', strategy_name)\
             .eq('indicator_name', indicator_name)\
             .single().execute()
-            
+
         if response.data and response.data.get('bytes_b64'):
-            # Decode the specific image
             img_bytes = base64.b64decode(response.data['bytes_b64'])
-            
-            # Save to session cache so we don't fetch it again
-            st.session_state[cache_key] = img_bytes
+            cache.put(cache_key, img_bytes)
             return img_bytes
-            
     except Exception as e:
+        logging.warning(f"Lazy image fetch failed for {strategy_name}/{indicator_name}: {e}")
+    return None
+
+# Gallery image bytes live in a blob store keyed by content hash; gallery_images
+# rows carry only the key and metadata:
+#   alter table gallery_images add column if not exists content_key text;
+#   alter table gallery_images add column if not exists width integer;
+#   alter table gallery_images add column if not exists height integer;
+#   alter table gallery_images add column if not exists thumbnail_key text;
+#   alter table gallery_images add column if not exists preview_key text;
+# Legacy rows keep bytes_b64 until backfill_gallery_derivatives() moves them
+# into the blob store, and are still readable meanwhile.
+
+GALLERY_BLOB_BUCKET = "gallery-images"     # Supabase Storage bucket (GALLERY_BLOB_BUCKET secret)
+GALLERY_BLOB_LOCAL_ROOT = ".gallery_blobs"  # LocalBlobStore root (GALLERY_BLOB_LOCAL_ROOT secret)
+GALLERY_IMAGE_COLUMNS = ("id, name, filename, description, uploaded_by, timestamp, likes, "
+                         "strategies, file_format, file_size, width, height, content_key, "
+                         "thumbnail_key, preview_key")
+GALLERY_IMAGE_VARIANTS = {"thumbnail": (480, 480), "preview": (1280, 1280)}  # Bounding boxes
+GALLERY_DERIVATIVE_FORMAT = "WEBP"      # Falls back to JPEG if Pillow lacks WebP support
+GALLERY_DERIVATIVE_QUALITY = 80
+GALLERY_BACKFILL_BATCH_SIZE = 20
+GALLERY_SIGNED_URL_SECONDS = 3600
+GALLERY_FETCH_MAX_WORKERS = 8           # Parallel blob downloads / decodes per page (all sessions)
+GALLERY_PAGE_CACHE_MAX_PAGES = 64       # Metadata pages kept per process (all sessions)
+GALLERY_PAGE_CACHE_TTL_SECONDS = 60     # Bounds staleness from uploads made in other processes
+
+class BlobStore:
+    """Minimal object store interface: immutable byte blobs addressed by key"""
+
+    def put(self, key, data, content_type="application/octet-stream"):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Blob bytes, or None if the key does not exist"""
+        raise NotImplementedError
+
+    def delete(self, keys):
+        raise NotImplementedError
+
+    def url(self, key):
+        """Browser-fetchable URL for the blob, or None if the backend cannot serve one"""
+        return None
+
+    def urls(self, keys):
+        """{key: url} for the keys the backend can serve (a page of cards at once)"""
+        found = {}
+        for key in keys:
+            url = self.url(key)
+            if url:
+                found[key] = url
+        return found
+
+class SupabaseStorageBlobStore(BlobStore):
+    """Blobs in a Supabase Storage bucket"""
+
+    def __init__(self, client, bucket=GALLERY_BLOB_BUCKET, url_seconds=GALLERY_SIGNED_URL_SECONDS):
+        self.client = client
+        self.bucket = bucket
+        self.url_seconds = url_seconds
+        self._urls = {}  # key -> (expires_at, signed url)
+        self._lock = threading.Lock()
+
+    def put(self, key, data, content_type="application/octet-stream"):
+        # Keys are content hashes, so overwriting an existing key is a no-op
+        self.client.storage.from_(self.bucket).upload(
+            key, data, file_options={"content-type": content_type, "upsert": "true"}
+        )
+
+    def get(self, key):
+        try:
+            return self.client.storage.from_(self.bucket).download(key)
+        except Exception as e:
+            logging.warning(f"Blob download failed for {self.bucket}/{key}: {e}")
+            return None
+
+    def delete(self, keys):
+        if keys:
+            self.client.storage.from_(self.bucket).remove(list(keys))
+
+    def url(self, key):
+        # Signed URLs are reused until they are within 10% of expiry
+        now = time.time()
+        with self._lock:
+            expires_at, url = self._urls.get(key, (0, None))
+            if url and expires_at - now > self.url_seconds * 0.1:
+                return url
+        try:
+            signed = self.client.storage.from_(self.bucket).create_signed_url(key, self.url_seconds)
+            url = signed.get('signedURL') or signed.get('signedUrl')
+        except Exception as e:
+            logging.warning(f"Signed URL failed for {self.bucket}/{key}: {e}")
+            return None
+        if url:
+            with self._lock:
+                self._urls[key] = (now + self.url_seconds, url)
+        return url
+
+    def urls(self, keys):
+        # Cached URLs are reused; the rest are signed in a single request
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                expires_at, url = self._urls.get(key, (0, None))
+                if url and expires_at - now > self.url_seconds * 0.1:
+                    found[key] = url
+                else:
+                    missing.append(key)
+        if not missing:
+            return found
+        try:
+            signed = self.client.storage.from_(self.bucket).create_signed_urls(missing, self.url_seconds)
+        except Exception as e:
+            logging.warning(f"Signed URLs failed for {len(missing)} blobs in {self.bucket}: {e}")
+            return found
+        with self._lock:
+            for item in signed or []:
+                url = item.get('signedURL') or item.get('signedUrl')
+                if url and not item.get('error') and item.get('path') in missing:
+                    self._urls[item['path']] = (now + self.url_seconds, url)
+                    found[item['path']] = url
+        return found
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a local directory (development and offline tests)"""
+
+    def __init__(self, root=GALLERY_BLOB_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, key, data, content_type="application/octet-stream"):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+@st.cache_resource
+def get_gallery_blob_store():
+    """Process-wide gallery blob store: 'supabase' (default) or 'local' (GALLERY_BLOB_BACKEND secret)"""
+    backend = st.secrets.get("GALLERY_BLOB_BACKEND", "supabase").lower()
+    if backend == "supabase" and supabase_client:
+        return SupabaseStorageBlobStore(supabase_client, st.secrets.get("GALLERY_BLOB_BUCKET", GALLERY_BLOB_BUCKET))
+    if backend != "local":
+        logging.warning("Supabase client unavailable - gallery blobs stored on local disk")
+    return LocalBlobStore(st.secrets.get("GALLERY_BLOB_LOCAL_ROOT", GALLERY_BLOB_LOCAL_ROOT))
+
+@st.cache_resource
+def get_gallery_image_cache():
+    """Process-wide gallery image bytes (content keys are immutable, so never stale)"""
+    return ImageByteCache()
+
+def _gallery_blob_ext(file_format):
+    return {"JPEG": "jpg"}.get(file_format, file_format.lower())
+
+def gallery_blob_key(data, file_format):
+    """Content-addressed key: identical uploads share one blob"""
+    return f"{hashlib.sha256(data).hexdigest()}.{_gallery_blob_ext(file_format)}"
+
+def image_dimensions(data):
+    """(width, height) from the image header, or (None, None) if unreadable"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+def render_image_derivative(data, size, image_format=GALLERY_DERIVATIVE_FORMAT):
+    """Downscale image bytes to fit `size`; returns (bytes, format)"""
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail(size, Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        out = io.BytesIO()
+        try:
+            image.convert("RGBA" if has_alpha else "RGB").save(
+                out, format=image_format, quality=GALLERY_DERIVATIVE_QUALITY, method=4)
+        except (KeyError, OSError):
+            image_format = "JPEG"  # Pillow built without WebP
+            out = io.BytesIO()
+            image.convert("RGB").save(out, format=image_format, quality=GALLERY_DERIVATIVE_QUALITY, optimize=True)
+        return out.getvalue(), image_format
+
+def store_gallery_image_derivatives(content_key, data):
+    """Generate and store every GALLERY_IMAGE_VARIANTS derivative; returns their row fields"""
+    store, cache = get_gallery_blob_store(), get_gallery_image_cache()
+    stem = content_key.rsplit(".", 1)[0]
+    fields = {}
+    for variant, size in GALLERY_IMAGE_VARIANTS.items():
+        derivative, image_format = render_image_derivative(data, size)
+        key = f"{stem}.{variant}.{_gallery_blob_ext(image_format)}"
+        store.put(key, derivative, content_type=f"image/{image_format.lower()}")
+        cache.put(key, derivative)
+        fields[f"{variant}_key"] = key
+    return fields
+
+def store_gallery_image_bytes(data, file_format):
+    """Write image bytes and derivatives to the blob store; returns the row fields that reference them"""
+    key = gallery_blob_key(data, file_format)
+    get_gallery_blob_store().put(key, data, content_type=f"image/{file_format.lower()}")
+    get_gallery_image_cache().put(key, data)
+    width, height = image_dimensions(data)
+    return {"content_key": key, "file_size": len(data), "width": width, "height": height,
+            "file_format": file_format, **store_gallery_image_derivatives(key, data)}
+
+def load_gallery_image_bytes(img_data, variant=None):
+    """
+    Image bytes for a gallery row, fetched on demand: from the process cache or
+    blob store by content_key, else from the row's legacy bytes_b64 column.
+    `variant` ('thumbnail' / 'preview') returns that derivative when the row
+    has one and the full image otherwise.
+    """
+    variant_key = img_data.get(f"{variant}_key") if variant else None
+    if variant_key:
+        cache = get_gallery_image_cache()
+        image_bytes = cache.get(variant_key)
+        if image_bytes is None:
+            image_bytes = get_gallery_blob_store().get(variant_key)
+            if image_bytes:
+                cache.put(variant_key, image_bytes)
+        if image_bytes:
+            return image_bytes
+    if img_data.get('bytes'):
+        return img_data['bytes']
+    image_bytes = None
+    key = img_data.get('content_key')
+    if key:
+        cache = get_gallery_image_cache()
+        image_bytes = cache.get(key)
+        if image_bytes is None:
+            image_bytes = get_gallery_blob_store().get(key)
+            if image_bytes:
+                cache.put(key, image_bytes)
+    else:
+        b64_data = img_data.get('bytes_b64')
+        if not b64_data and img_data.get('id') is not None and supabase_client:
+            try:
+                resp = supabase_client.table('gallery_images').select('bytes_b64')\
+                    .eq('id', img_data['id']).single().execute()
+                b64_data = (resp.data or {}).get('bytes_b64')
+            except Exception as e:
+                logging.warning(f"Legacy image fetch failed for {img_data.get('name')}: {e}")
+        if b64_data:
+            try:
+                image_bytes = base64.b64decode(b64_data)
+            except Exception as e:
+                logging.warning(f"Failed to decode bytes_b64 for {img_data.get('name')}: {e}")
+    if image_bytes:
+        img_data['bytes'] = image_bytes
+    return image_bytes
+
+@st.cache_resource
+def get_gallery_fetch_pool():
+    """Process-wide pool for page-level gallery byte fetches"""
+    return ThreadPoolExecutor(max_workers=GALLERY_FETCH_MAX_WORKERS, thread_name_prefix="gallery-fetch")
+
+def prefetch_gallery_page_bytes(rows, variant="thumbnail", store=None, cache=None, pool=None):
+    """
+    Fetch the bytes for a whole page of metadata rows up front so the cards
+    render from memory: blob store keys not already cached are downloaded in
+    parallel, and legacy bytes_b64 rows are read in ONE in_('id', ...) query
+    and base64-decoded on the same pool. Background callers pass the
+    store/cache/pool resolved on the script thread.
+    """
+    store = store or get_gallery_blob_store()
+    cache = cache or get_gallery_image_cache()
+    pool = pool or get_gallery_fetch_pool()
+    missing_keys, legacy_rows = [], {}
+    for row in rows:
+        if row.get('bytes'):
+            continue
+        key = row.get(f"{variant}_key") or row.get('content_key')
+        if key:
+            if cache.get(key) is None:
+                missing_keys.append(key)
+        elif row.get('id') is not None:
+            legacy_rows[row['id']] = row
+
+    futures = {pool.submit(store.get, key): key for key in dict.fromkeys(missing_keys)}
+    if legacy_rows and supabase_client:
+        try:
+            resp = supabase_client.table('gallery_images').select('id, bytes_b64')\
+                .in_('id', list(legacy_rows)).execute()
+            for item in (resp.data or []):
+                if item.get('bytes_b64'):
+                    futures[pool.submit(base64.b64decode, item['bytes_b64'])] = legacy_rows[item['id']]
+        except Exception as e:
+            logging.warning(f"Legacy gallery page fetch failed: {e}")
+
+    for future in as_completed(futures):
+        target = futures[future]
+        try:
+            data = future.result()
+        except Exception as e:
+            logging.warning(f"Gallery byte fetch failed: {e}")
+            continue
+        if not data:
+            continue
+        if isinstance(target, dict):
+            target['bytes'] = data
+        else:
+            cache.put(target, data)
+    return rows
+
+class GalleryPageCache:
+    """
+    Process-wide LRU + TTL cache of gallery metadata pages keyed by
+    (cursor, per_page, sort_by, filter_author, filter_strategy, min_likes),
+    plus the matching filtered counts, with background prefetch of
+    neighbouring pages. Rows are handed out as copies so bytes a session
+    attaches never end up in the shared cache. invalidate() bumps a
+    generation so a prefetch started before an upload/like/purge cannot
+    store its stale result afterwards.
+    """
+
+    def __init__(self, max_pages=GALLERY_PAGE_CACHE_MAX_PAGES, ttl_seconds=GALLERY_PAGE_CACHE_TTL_SECONDS):
+        self.max_pages = max_pages
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, (rows, prev_cursor, next_cursor) or count)
+        self._inflight = {}  # key -> Future of a background prefetch
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gallery-prefetch")
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, tuple):
+            rows, *cursors = value
+            return ([dict(row) for row in rows], *cursors)
+        return value
+
+    def _fresh_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def get(self, key):
+        """A copy of the cached page (or count), or None on miss/expiry"""
+        with self._lock:
+            value = self._fresh_locked(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._copy(value)
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False  # Invalidated while this page was being fetched
+            self._entries[key] = (time.time(), self._copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_pages:
+                self._entries.popitem(last=False)
+            return True
+
+    def get_or_fetch(self, key, fetch):
+        """Cached page, else wait for an in-flight prefetch of it, else fetch(*key) now"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            future = self._inflight.get(key)
+            generation = self._generation
+        if future is not None:
+            try:
+                future.result(timeout=10)
+            except Exception:
+                pass
+            value = self.get(key)
+            if value is not None:
+                return value
+        value = fetch(*key)
+        self.put(key, value, generation)
+        return value
+
+    def prefetch(self, key, fetch, after=None):
+        """Fetch a page on the background thread unless it is cached or already in flight"""
+        with self._lock:
+            if key in self._inflight or self._fresh_locked(key) is not None:
+                return
+            # Submitted under the lock, so the job's cleanup cannot run before registration
+            self._inflight[key] = self._executor.submit(self._prefetch_job, key, fetch, self._generation, after)
+
+    def _prefetch_job(self, key, fetch, generation, after):
+        try:
+            page = fetch(*key)
+            if self.put(key, page, generation):
+                self.prefetched += 1
+                if after:
+                    after(page)
+        except Exception as e:
+            logging.warning(f"Gallery page prefetch failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def invalidate(self):
+        """Drop every page and count (uploads, likes and purges reorder or reshape pages)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self._entries), "inflight": len(self._inflight), "hits": self.hits,
+                    "misses": self.misses, "prefetched": self.prefetched}
+
+@st.cache_resource
+def get_gallery_page_cache():
+    """Process-wide gallery page cache"""
+    return GalleryPageCache()
+
+def gallery_image_download_url(img_data):
+    """
+    Link for downloading the full image: a blob store URL when the backend can
+    serve one (the browser fetches it only on click), else an inline data URI.
+    """
+    url = get_gallery_blob_store().url(img_data['content_key']) if img_data.get('content_key') else None
+    if url:
+        return url
+    image_bytes = load_gallery_image_bytes(img_data)
+    if not image_bytes:
         return None
+    file_format = str(img_data.get('format') or img_data.get('file_format') or 'png').lower()
+    return f"data:image/{file_format};base64,{base64.b64encode(image_bytes).decode()}"
+
+def gallery_page_download_urls(rows):
+    """{content_key: url} for a page's blob-backed rows, signed in one request (no image bytes are read)"""
+    keys = [row['content_key'] for row in rows if row.get('content_key')]
+    return get_gallery_blob_store().urls(keys) if keys else {}
+
+def gallery_card_download_url(img_data, page_urls, button_key, label="⬇️"):
+    """
+    Download link for a grid card: the page's blob URL when there is one,
+    otherwise (legacy rows, local blob store) a `label` button that builds the
+    data URI for this one card on click. Returns None while not yet requested.
+    """
+    url = page_urls.get(img_data.get('content_key'))
+    if url:
+        return url
+    if st.session_state.get('gallery_download_requested') == button_key:
+        return gallery_image_download_url(img_data)
+    if st.button(label, key=f"prepare_dl_{button_key}", help="Prepare download", use_container_width=True):
+        st.session_state.gallery_download_requested = button_key
+        st.rerun()
     return None
 
+def prune_gallery_blobs(deleted_rows):
+    """Delete the blobs (and derivatives) of deleted rows that no remaining gallery_images row references"""
+    blob_keys = {}
+    for row in deleted_rows:
+        if row.get('content_key'):
+            blob_keys[row['content_key']] = [row.get(f"{variant}_key") for variant in GALLERY_IMAGE_VARIANTS]
+    if not blob_keys or not supabase_client:
+        return
+    try:
+        resp = supabase_client.table('gallery_images').select('content_key')\
+            .in_('content_key', list(blob_keys)).execute()
+        referenced = {row['content_key'] for row in (resp.data or [])}
+        orphaned = {key for content_key, derived in blob_keys.items() if content_key not in referenced
+                    for key in [content_key, *derived] if key}
+        get_gallery_blob_store().delete(orphaned)
+        get_gallery_image_cache().invalidate(lambda key: key in orphaned)
+    except Exception as e:
+        logging.warning(f"Gallery blob prune failed: {e}")
+
+def backfill_gallery_derivatives(batch_size=GALLERY_BACKFILL_BATCH_SIZE, limit=None, progress=None):
+    """
+    Batch job: move legacy bytes_b64 rows into the blob store and generate the
+    thumbnail/preview derivatives for rows that have none. Walks rows by id so
+    a row that fails is skipped rather than retried forever. Returns counts.
+    """
+    counts = {"processed": 0, "failed": 0}
+    if not supabase_client:
+        return counts
+    last_id = None
+    while limit is None or counts["processed"] + counts["failed"] < limit:
+        query = supabase_client.table('gallery_images')\
+            .select('id, name, file_format, content_key')\
+            .is_('thumbnail_key', 'null').order('id').limit(batch_size)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.execute().data or []
+        if not rows:
+            break
+        for row in rows:
+            last_id = row['id']
+            try:
+                data = load_gallery_image_bytes(row)
+                if not data:
+                    raise ValueError("no image bytes")
+                if row.get('content_key'):
+                    fields = store_gallery_image_derivatives(row['content_key'], data)
+                else:
+                    file_format = (row.get('file_format') or Image.open(io.BytesIO(data)).format or 'PNG').upper()
+                    fields = {**store_gallery_image_bytes(data, file_format), "bytes_b64": None}
+                supabase_client.table('gallery_images').update(fields).eq('id', row['id']).execute()
+                counts["processed"] += 1
+            except Exception as e:
+                logging.warning(f"Gallery backfill failed for {row.get('name')} (id {row['id']}): {e}")
+                counts["failed"] += 1
+            if progress:
+                progress(counts)
+    return counts
+
 @st.cache_data(ttl=60)
 @st.cache_data(ttl=60)
 def load_gallery_images():
@@ -4283,28 +7072,19 @@ def load_gallery_images():
         
         # Fetch from database with retry
         try:
-            response = supabase_client.table('gallery_images').select('*').execute()
+            # Metadata only - bytes come from the blob store via load_gallery_image_bytes()
+            response = supabase_client.table('gallery_images').select(GALLERY_IMAGE_COLUMNS).execute()
             
             if hasattr(response, 'error') and response.error:
                 raise RuntimeError(f"Supabase error: {response.error}")
             
             images = []
-            decode_errors = 0
             
             for item in (response.data or []):
                 try:
-                    # Try to decode image bytes from base64
-                    if 'bytes_b64' in item and item['bytes_b64']:
-                        try:
-                            item['bytes'] = base64.b64decode(item['bytes_b64'])
-                        except Exception as e:
-                            logging.warning(f"Failed to decode {item.get('name')}: {e}")
-                            decode_errors += 1
-                            continue
-                    
                     # Ensure format field exists (CRITICAL)
                     if not item.get('format'):
-                        item['format'] = 'PNG'  # Safe default
+                        item['format'] = item.get('file_format') or 'PNG'  # Safe default
                     
                     # Normalize strategies field
                     item["strategies"] = item.get("strategies") or [item.get("strategy") or "Unspecified"]
@@ -4318,9 +7098,6 @@ def load_gallery_images():
                     logging.warning(f"Skipping corrupted image: {e}")
                     continue
             
-            if decode_errors > 0:
-                logging.info(f"⚠️ {decode_errors} images had decode errors but continued")
-            
             # Cache successful load
             if images:
                 _cache_set("lk_gallery_images", images)
@@ -4618,16 +7395,20 @@ def render_kai_chat_interface():
         with st.chat_message("user", avatar=USER_AVATAR):
             st.markdown(prompt)
 
-        # 3. Get KAI response
+        # 3. Stream KAI response token by token
         with st.chat_message("assistant", avatar=KAI_AVATAR):
-            # Create a placeholder for the "Thinking..." animation
-            message_placeholder = st.empty()
-            with st.spinner("Analyzing market data..."):
-                # Initialize the agent to get the response
-                agent = EnhancedKaiTradingAgent(use_deepseek=st.session_state.use_deepseek)
-                response = agent.chat_with_kai(prompt, st.session_state.kai_chat_messages)
-                
-                # Update the placeholder with the final response
+            agent = EnhancedKaiTradingAgent(use_deepseek=st.session_state.use_deepseek)
+            response_stream = agent.chat_with_kai_stream(prompt, st.session_state.kai_chat_messages)
+            
+            if hasattr(st, "write_stream"):
+                response = st.write_stream(response_stream)
+            else:
+                # Older Streamlit: render the growing text into a placeholder
+                message_placeholder = st.empty()
+                response = ""
+                for chunk in response_stream:
+                    response += chunk
+                    message_placeholder.markdown(response + "▌")
                 message_placeholder.markdown(response)
                 
         # 4. Add KAI message to history
@@ -4995,6 +7776,103 @@ def render_kai_analysis_archive(is_admin):
                     meta_info=f" | {nice_date} at {nice_time}"
                 )
 
+def render_kai_batch_analysis(reuse_cached=True):
+    """Admin Tool: Analyze several strategy CSVs / assets in one run"""
+    st.markdown("### 📦 Batch Analysis")
+    st.caption("Upload one CSV per asset, or a single CSV with an Asset/Symbol column.")
+
+    batch_mode = st.radio(
+        "Batch source:", ["Several CSVs", "One multi-asset CSV"],
+        horizontal=True, key="kai_batch_mode"
+    )
+    batch_files = st.file_uploader(
+        "Strategy CSVs", type=['csv'],
+        key="kai_batch_upload_many" if batch_mode == "Several CSVs" else "kai_batch_upload_one",
+        accept_multiple_files=(batch_mode == "Several CSVs")
+    )
+    if not batch_files:
+        return
+    if not isinstance(batch_files, list):
+        batch_files = [batch_files]
+
+    hint_agent = EnhancedKaiTradingAgent(use_deepseek=False)
+
+    def price_input(asset, key):
+        """Closing price input pre-filled with the last recorded weekly close"""
+        hint = 0.0
+        try:
+            last_record = hint_agent.get_previous_weekly_close(asset)
+            if last_record:
+                hint = float(last_record['closing_price'])
+        except Exception:
+            pass
+        return st.number_input(f"{asset} Weekly Close ($):", min_value=0.0, value=hint,
+                               format="%.2f", key=key)
+
+    jobs = []
+    try:
+        if batch_mode == "Several CSVs":
+            known_assets = ["ETH", "BTC", "SOL"]
+            for i, batch_file in enumerate(batch_files):
+                guessed = next((a for a in known_assets if a in batch_file.name.upper()), known_assets[0])
+                col_asset, col_price = st.columns(2)
+                with col_asset:
+                    asset = st.selectbox(f"{batch_file.name}:", known_assets,
+                                         index=known_assets.index(guessed), key=f"kai_batch_asset_{i}")
+                with col_price:
+                    price = price_input(asset, f"kai_batch_price_{i}")
+                batch_file.seek(0)
+                jobs.append({"label": batch_file.name, "df": pd.read_csv(batch_file),
+                             "asset": asset, "price": price})
+        else:
+            batch_file = batch_files[0]
+            batch_file.seek(0)
+            multi_df = pd.read_csv(batch_file)
+            asset_columns = [c for c in KAI_BATCH_ASSET_COLUMNS if c in multi_df.columns] or list(multi_df.columns)
+            asset_column = st.selectbox("Asset column:", asset_columns, key="kai_batch_asset_column")
+            assets = sorted(multi_df[asset_column].dropna().astype(str).str.strip().str.upper().unique())
+            prices = {}
+            price_cols = st.columns(max(1, min(3, len(assets))))
+            for i, asset in enumerate(assets):
+                with price_cols[i % len(price_cols)]:
+                    prices[asset] = price_input(asset, f"kai_batch_price_{asset}")
+            jobs = EnhancedKaiTradingAgent.build_batch_jobs(
+                multi_df, prices=prices, asset_column=asset_column, label=batch_file.name
+            )
+    except Exception as e:
+        st.error(f"Could not read batch: {e}")
+        return
+
+    if not jobs or not st.button(f"🚀 Analyze {len(jobs)} Jobs with KAI", type="primary", key="kai_batch_run"):
+        return
+
+    agent = EnhancedKaiTradingAgent(use_deepseek=st.session_state.use_deepseek)
+    progress = st.progress(0.0, text=f"KAI is analyzing {len(jobs)} jobs...")
+
+    def on_progress(done, total, result):
+        status = "failed" if result["error"] else "done"
+        progress.progress(done / total, text=f"{done}/{total} · {result['label']} {status}")
+
+    batch_started = time.perf_counter()
+    results = agent.analyze_batch(jobs, use_cache=reuse_cached, progress_callback=on_progress)
+    batch_seconds = time.perf_counter() - batch_started
+
+    completed = [r["analysis"] for r in results if r["analysis"]]
+    if completed and save_kai_analyses_bulk(completed):
+        st.success(f"✅ {len(completed)}/{len(results)} analyses complete & archived in {batch_seconds:.1f}s")
+    elif not completed:
+        st.error("No analyses completed")
+
+    st.dataframe(pd.DataFrame([{
+        "Job": r["label"],
+        "Asset": r["asset"],
+        "Close": r["price"],
+        "Status": f"❌ {r['error']}" if r["error"] else "✅",
+        "Confidence": (r["analysis"] or {}).get("confidence_assessment"),
+        "DeepSeek": (r["analysis"] or {}).get("deepseek_enhanced"),
+        "Seconds": round(r["seconds"], 2)
+    } for r in results]), use_container_width=True, hide_index=True)
+
 def render_kai_csv_uploader():
     """Admin Tool: Upload CSV Analysis + Teach Memory"""
     st.subheader("⚙️ KAI Data Center")
@@ -5029,6 +7907,10 @@ def render_kai_csv_uploader():
         )
         
         uploaded_file = st.file_uploader("Strategy CSV", type=['csv'], key="kai_main_upload")
+        reuse_cached = st.checkbox(
+            "♻️ Reuse cached result for identical uploads", value=True, key="kai_reuse_cached",
+            help="Same CSV + asset + price returns the stored report instead of re-running DeepSeek."
+        )
         
         if uploaded_file and st.button("🚀 Analyze with KAI", type="primary"):
             df = pd.read_csv(uploaded_file)
@@ -5039,7 +7921,8 @@ def render_kai_csv_uploader():
                 analysis = agent.analyze_strategy_data(
                     df, 
                     manual_asset=sel_asset, 
-                    manual_price=closing_price
+                    manual_price=closing_price,
+                    use_cache=reuse_cached
                 )
                 
             if analysis:
@@ -5081,6 +7964,54 @@ def render_kai_csv_uploader():
             except Exception as e:
                 st.error(f"Memory upload failed: {e}")
 
+    # Several CSVs / assets in one run
+    with st.expander("📦 Batch Analysis (several CSVs or assets)"):
+        render_kai_batch_analysis(reuse_cached=reuse_cached)
+
+    # Health of the shared DeepSeek connection pool
+    with st.expander("📡 DeepSeek Connection Metrics"):
+        ds_metrics = get_deepseek_client().metrics()
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Requests", ds_metrics["requests"])
+        m2.metric("Retries", ds_metrics["retries"])
+        m3.metric("Errors", ds_metrics["errors"])
+        m4.metric("p95 Latency", f"{ds_metrics['latency_p95']:.2f}s")
+        st.caption(f"Status codes: {ds_metrics['status_counts'] or 'none yet'} | "
+                   f"in flight {ds_metrics['in_flight']}/{get_deepseek_client().max_concurrency}, "
+                   f"throttled {ds_metrics['throttled']} | "
+                   f"avg {ds_metrics['latency_avg']:.2f}s, p50 {ds_metrics['latency_p50']:.2f}s | "
+                   f"chat time-to-first-token {ds_metrics['time_to_first_token_avg']:.2f}s")
+
+    # Shared spot price cache used by KAI's chat memory
+    with st.expander("💱 Spot Price Service"):
+        sp_stats = get_spot_price_service().stats()
+        s1, s2, s3, s4 = st.columns(4)
+        s1.metric("Cache Hits", sp_stats["hits"])
+        s2.metric("Stale Served", sp_stats["stale_hits"])
+        s3.metric("Coalesced", sp_stats["coalesced"])
+        s4.metric("Feed Calls", sp_stats["feed_calls"])
+        st.caption(f"Feed: {sp_stats['feed']} | symbols cached: {sp_stats['symbols']} | "
+                   f"watched: {sp_stats['watched']} | misses: {sp_stats['misses']} | "
+                   f"feed errors: {sp_stats['feed_errors']}")
+
+    # Write-behind queue health (dropped writes never reached the database)
+    with st.expander("💾 Database Write Queue"):
+        wq = get_supabase_write_queue()
+        wq_stats = wq.stats()
+        w1, w2, w3, w4 = st.columns(4)
+        w1.metric("Pending", wq_stats["pending"])
+        w2.metric("Flushed", wq_stats["flushed"])
+        w3.metric("Failures", wq_stats["failures"])
+        w4.metric("Dropped", wq_stats["dropped"])
+        dropped = wq.dropped_writes()
+        if dropped:
+            st.warning(f"⚠️ {len(dropped)} write(s) were given up on after retries - the data below was not saved")
+            st.dataframe(pd.DataFrame([
+                {"Dropped": datetime.fromtimestamp(w["dropped_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+                 "Table": w["table"], "Op": w["op"], "Key": w["key"], "Attempts": w["attempts"]}
+                for w in reversed(dropped)
+            ]), use_container_width=True)
+
 # -------------------------
 # ENHANCED KAI ANALYSIS REPORT DISPLAY
 # -------------------------
@@ -5595,74 +8526,416 @@ def check_email_quality(email):
     if domain in disposable_domains:
         issues.append("⚠️ Possible disposable email")
 
-    # Check for common patterns in fake emails
-    if 'fake' in email.lower() or 'test' in email.lower() or 'temp' in email.lower():
-        issues.append("⚠️ Contains suspicious keywords")
+    # Check for common patterns in fake emails
+    if 'fake' in email.lower() or 'test' in email.lower() or 'temp' in email.lower():
+        issues.append("⚠️ Contains suspicious keywords")
+
+    # Check for very short local part
+    local_part = email.split('@')[0]
+    if len(local_part) < 2:
+        issues.append("⚠️ Very short username")
+
+    if not issues:
+        issues.append("✅ Email appears valid")
+
+    return issues
+
+# -------------------------
+# SHARED USER DIRECTORY (process-wide, incrementally refreshed)
+# -------------------------
+USER_DIRECTORY_SYNC_SECONDS = 15            # Min gap between incremental (updated_at) refreshes
+USER_DIRECTORY_RECONCILE_SECONDS = 10 * 60  # Username-only pass that notices rows deleted elsewhere
+USER_DIRECTORY_SYNC_OVERLAP_SECONDS = 30    # Re-read window behind the watermark for late-committing transactions
+
+class UserDirectory(dict):
+    """
+    username -> user row, shared by every session of the process, with an
+    email index for O(1) lookups. After the first full load only rows whose
+    updated_at is at/after the watermark (minus an overlap) are fetched; the
+    watermark only follows updated_at values read back from the database.
+    Deletions made by other processes are picked up by a periodic
+    username-only reconcile.
+    """
+
+    def __init__(self, sync_seconds=USER_DIRECTORY_SYNC_SECONDS,
+                 reconcile_seconds=USER_DIRECTORY_RECONCILE_SECONDS,
+                 overlap_seconds=USER_DIRECTORY_SYNC_OVERLAP_SECONDS):
+        super().__init__()
+        self.sync_seconds = sync_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.overlap_seconds = overlap_seconds
+        self.lock = threading.RLock()
+        self.watermark = None
+        self.loaded = False
+        self.load_failed = False  # Last full load could not read the table
+        self._by_email = {}
+        self._last_sync = 0.0
+        self._last_reconcile = 0.0
+        self.metrics = {"full_loads": 0, "incremental_syncs": 0, "rows_fetched": 0, "reconciles": 0}
+
+    # --- email index maintenance ---
+    @staticmethod
+    def _email_key(email):
+        return (email or "").strip().lower()
+
+    def __setitem__(self, username, row):
+        with self.lock:
+            if username in self:
+                self._unindex(username)
+            super().__setitem__(username, row)
+            if self._email_key(row.get("email")):
+                self._by_email[self._email_key(row.get("email"))] = username
+
+    def __delitem__(self, username):
+        with self.lock:
+            self._unindex(username)
+            super().__delitem__(username)
+
+    def pop(self, username, *default):
+        with self.lock:
+            if username in self:
+                self._unindex(username)
+            return super().pop(username, *default)
+
+    def _unindex(self, username):
+        email = self._email_key(dict.get(self, username, {}).get("email"))
+        if self._by_email.get(email) == username:
+            del self._by_email[email]
+
+    def username_for_email(self, email):
+        return self._by_email.get(self._email_key(email))
+
+    def email_exists(self, email):
+        return self._email_key(email) in self._by_email
+
+    def reindex_email(self, username):
+        """Call after changing a user's email in place"""
+        with self.lock:
+            self._by_email = {k: v for k, v in self._by_email.items() if v != username}
+            email = self._email_key(self[username].get("email"))
+            if email:
+                self._by_email[email] = username
+
+    # --- refresh ---
+    @staticmethod
+    def _parse_timestamp(value):
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.astimezone()
+        except (TypeError, ValueError):
+            return None
+
+    def _advance_watermark(self, server_stamps):
+        for value in server_stamps:
+            stamp = self._parse_timestamp(value)
+            if stamp and (self.watermark is None or stamp > self.watermark):
+                self.watermark = stamp
+
+    def load(self):
+        """Full load (first use, or when updated_at isn't available); keeps the current rows if the read fails"""
+        result = supabase_get_users(with_server_stamps=True)
+        if result is None:
+            self.load_failed = True
+            self._last_sync = time.monotonic()  # Retry after sync_seconds, not on every rerun
+            return self
+        users, server_stamps = result
+        with self.lock:
+            self.load_failed = False
+            for username in list(self):
+                if username not in users:
+                    del self[username]
+            for username, row in users.items():
+                self[username] = row
+            self.watermark = None
+            self._advance_watermark(server_stamps)
+            self.loaded = True
+            self._last_sync = self._last_reconcile = time.monotonic()
+            self.metrics["full_loads"] += 1
+            self.metrics["rows_fetched"] += len(users)
+        return self
+
+    def sync(self, force=False):
+        """Fetch rows changed since the watermark (no-op within sync_seconds unless forced)"""
+        now = time.monotonic()
+        if not self.loaded or self.watermark is None:
+            if self.loaded and not force and now - self._last_sync < self.sync_seconds:
+                return self
+            return self.load()
+        if not force and now - self._last_sync < self.sync_seconds:
+            return self
+
+        since = self.watermark - timedelta(seconds=self.overlap_seconds)
+        result = supabase_get_users_changed_since(since.isoformat())
+        if result is None:
+            return self.load()
+        changed, server_stamps = result
+        with self.lock:
+            for row in changed:
+                self[row["username"]] = row
+            self._advance_watermark(server_stamps)
+            self._last_sync = now
+            self.metrics["incremental_syncs"] += 1
+            self.metrics["rows_fetched"] += len(changed)
+
+        if force or now - self._last_reconcile >= self.reconcile_seconds:
+            self.reconcile()
+        return self
+
+    def reconcile(self):
+        """Drop users deleted by other processes (fetches usernames only)"""
+        usernames = supabase_get_usernames()
+        if usernames is None:
+            return self
+        with self.lock:
+            for username in [u for u in self if u not in usernames]:
+                del self[username]
+            self._last_reconcile = time.monotonic()
+            self.metrics["reconciles"] += 1
+        return self
+
+    def stats(self):
+        return {**self.metrics, "users": len(self), "emails_indexed": len(self._by_email),
+                "watermark": self.watermark.isoformat() if self.watermark else None}
+
+@st.cache_resource
+def get_user_directory():
+    """Process-wide user directory shared by every session"""
+    return UserDirectory()
+
+# -------------------------
+# PASSWORD HASHING (bounded worker pool)
+# -------------------------
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+PASSWORD_HASH_MAX_WORKERS = 4             # bcrypt releases the GIL, so threads hash in parallel
+PASSWORD_HASH_QUEUE_PER_WORKER = 8        # Queued + running jobs allowed per worker before logins are shed
+PASSWORD_HASH_PER_USER_INFLIGHT = 2       # Concurrent hash/verify jobs one username may hold
+PASSWORD_HASH_WAIT_SECONDS = 10.0         # How long a login waits for a pool slot / result
+PASSWORD_BCRYPT_ROUNDS = 12               # Cost factor for new hashes (BCRYPT_ROUNDS secret)
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing pool or the user's in-flight quota is exhausted"""
+
+PASSWORD_HASHER_BUSY_MESSAGE = "Server busy, try again"
+
+class PasswordHasher:
+    """
+    Runs bcrypt hash/verify on a bounded thread pool instead of the Streamlit
+    script thread. A global slot semaphore caps queued work so a login burst
+    is shed instead of piling up, and a per-user counter stops one username
+    (e.g. a password-guessing loop) from occupying the whole pool.
+    """
+
+    def __init__(self, rounds=PASSWORD_BCRYPT_ROUNDS, max_workers=PASSWORD_HASH_MAX_WORKERS,
+                 per_user_inflight=PASSWORD_HASH_PER_USER_INFLIGHT, wait_seconds=PASSWORD_HASH_WAIT_SECONDS):
+        self.rounds = int(rounds)
+        self.max_workers = max_workers
+        self.per_user_inflight = per_user_inflight
+        self.wait_seconds = wait_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers * PASSWORD_HASH_QUEUE_PER_WORKER)
+        self._user_inflight = {}
+        self._lock = threading.Lock()
+        self.metrics = {"hashed": 0, "verified": 0, "rejected_busy": 0, "rejected_user": 0,
+                        "upgrades": 0, "busy_seconds": 0.0}
+
+    # --- raw bcrypt (runs on the pool) ---
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _checkpw(plain_password, hashed_password):
+        try:
+            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        except (ValueError, TypeError, AttributeError):
+            # Invalid / legacy (non-bcrypt) hash
+            return False
+
+    def needs_rehash(self, hashed_password):
+        """True for non-bcrypt hashes and bcrypt hashes below the configured cost"""
+        try:
+            return int(hashed_password.split('$')[2]) < self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    # --- admission control ---
+    def _acquire(self, username):
+        if username is not None:
+            with self._lock:
+                if self._user_inflight.get(username, 0) >= self.per_user_inflight:
+                    self.metrics["rejected_user"] += 1
+                    raise PasswordHasherBusy(f"Too many concurrent password checks for '{username}'")
+                self._user_inflight[username] = self._user_inflight.get(username, 0) + 1
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            self._release_user(username)
+            with self._lock:
+                self.metrics["rejected_busy"] += 1
+            raise PasswordHasherBusy("Password hashing pool is saturated")
+
+    def _release_user(self, username):
+        if username is None:
+            return
+        with self._lock:
+            remaining = self._user_inflight.get(username, 0) - 1
+            if remaining > 0:
+                self._user_inflight[username] = remaining
+            else:
+                self._user_inflight.pop(username, None)
+
+    def submit(self, fn, *args, username=None):
+        """Run fn(*args) on the pool; the future's slot is freed when it finishes"""
+        self._acquire(username)
+
+        def run():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.metrics["busy_seconds"] += time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            self._release_user(username)
+            raise
+
+        def done(_):
+            self._slots.release()
+            self._release_user(username)
 
-    # Check for very short local part
-    local_part = email.split('@')[0]
-    if len(local_part) < 2:
-        issues.append("⚠️ Very short username")
+        future.add_done_callback(done)
+        return future
 
-    if not issues:
-        issues.append("✅ Email appears valid")
+    # --- blocking API used by UserManager ---
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.wait_seconds)
+        except FuturesTimeoutError:
+            raise PasswordHasherBusy("Timed out waiting for the password hashing pool")
+
+    def hash(self, password, username=None):
+        result = self._result(self.submit(self._hash, password, username=username))
+        with self._lock:
+            self.metrics["hashed"] += 1
+        return result
+
+    def verify(self, plain_password, hashed_password, username=None):
+        result = self._result(self.submit(self._checkpw, plain_password, hashed_password, username=username))
+        with self._lock:
+            self.metrics["verified"] += 1
+        return result
+
+    def rehash_in_background(self, password, on_hashed, username=None):
+        """Hash password off the login path and hand the new hash to on_hashed(new_hash)"""
+        def run():
+            new_hash = self._hash(password)
+            on_hashed(new_hash)
+            with self._lock:
+                self.metrics["upgrades"] += 1
+            return new_hash
 
-    return issues
+        try:
+            future = self.submit(run, username=username)
+        except PasswordHasherBusy:
+            return None  # Try again on the next login
+        future.add_done_callback(
+            lambda f: f.exception() and logging.warning(f"Background password rehash failed: {f.exception()}")
+        )
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {**self.metrics, "rounds": self.rounds, "max_workers": self.max_workers,
+                    "users_in_flight": len(self._user_inflight)}
+
+@st.cache_resource
+def get_password_hasher():
+    """Process-wide bcrypt pool shared by every session"""
+    return PasswordHasher(rounds=st.secrets.get("BCRYPT_ROUNDS", PASSWORD_BCRYPT_ROUNDS))
 
 class UserManager:
     def __init__(self):
+        self.users = get_user_directory()
+        self._metrics_cache = None
         self.load_data()
 
     def load_data(self):
-        """Load users and analytics data from Supabase - FIXED VERSION"""
+        """Refresh users (changed rows only after the first load) and analytics from Supabase"""
         try:
-            self.users = supabase_get_users()
+            self.users.sync(force=True)
             self.analytics = supabase_get_analytics()
 
             if "admin" not in self.users:
-                self.create_default_admin()
-                self.save_users()
+                self._seed_default_admin()
 
             if not self.analytics:
-                self.analytics = { "total_logins": 0, "active_users": 0, "revenue_today": 0, "user_registrations": [], "login_history": [], "deleted_users": [], "plan_changes": [], "password_changes": [], "email_verifications": [] }
+                self.analytics = { "total_logins": 0, "successful_logins": 0, "active_users": 0, "revenue_today": 0 }
                 self.save_analytics()
+            else:
+                self._migrate_legacy_histories()
 
         except Exception as e:
+            # Nothing is written back after a failed read: defaults saved now
+            # could later overwrite the real admin row / counters
             st.error(f"❌ Error loading data: {e}")
-            self.users = {}
-            self.analytics = { "total_logins": 0, "active_users": 0, "revenue_today": 0, "user_registrations": [], "login_history": [], "deleted_users": [], "plan_changes": [], "password_changes": [], "email_verifications": [] }
-            self.create_default_admin()
-            self.save_users()
-            self.save_analytics()
+            self.analytics = { "total_logins": 0, "successful_logins": 0, "active_users": 0, "revenue_today": 0 }
+
+    def _seed_default_admin(self):
+        """Create the default admin only when the database positively has no admin row"""
+        if self.users.load_failed or not self.users.loaded:
+            logging.warning("User table unreadable - not seeding the default admin")
+            return
+        created, msg = self.create_default_admin()
+        if not created:
+            logging.warning(f"Default admin not seeded: {msg}")
+            return
+        if not supabase_client:
+            return  # Offline: in-memory only
+        created = supabase_create_user_if_absent("admin", self.users["admin"])
+        if not created:
+            # Already exists (or unknown): never keep the default password locally
+            self.users.pop("admin", None)
+            if created is False:
+                self.users.load()
 
     def create_default_admin(self):
         """Create default admin account with a SECURE password hash"""
+        try:
+            password_hash = self.hash_password("ChangeThis123!")
+        except PasswordHasherBusy:
+            return False, PASSWORD_HASHER_BUSY_MESSAGE
         self.users["admin"] = {
-            "password_hash": self.hash_password("ChangeThis123!"),
+            "password_hash": password_hash,
             "name": "System Administrator", "plan": "admin", "expires": "2030-12-31",
             "created": datetime.now().isoformat(), "last_login": None, "login_count": 0,
             "active_sessions": 0, "max_sessions": 3, "is_active": True,
             "email": "admin@tradinganalysis.com", "subscription_id": "admin_account",
             "email_verified": True, "verification_date": datetime.now().isoformat()
         }
+        return True, "Default admin created"
 
-    # --- NEW SECURE HASHING METHODS (using bcrypt directly) ---
-    def hash_password(self, password):
-        """Hashes a password using bcrypt."""
-        password_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
-        hashed_bytes = bcrypt.hashpw(password_bytes, salt)
-        return hashed_bytes.decode('utf-8')
+    # --- NEW SECURE HASHING METHODS (bcrypt on the shared PasswordHasher pool) ---
+    def hash_password(self, password, username=None):
+        """Hashes a password using bcrypt (off the script thread)."""
+        return get_password_hasher().hash(password, username=username)
 
-    def verify_password(self, plain_password, hashed_password):
-        """Verifies a plain password against a bcrypt hash."""
-        try:
-            plain_password_bytes = plain_password.encode('utf-8')
-            hashed_password_bytes = hashed_password.encode('utf-8')
-            return bcrypt.checkpw(plain_password_bytes, hashed_password_bytes)
-        except (ValueError, TypeError):
-            # This handles cases where the hash might be invalid, preventing a crash.
-            return False
+    def verify_password(self, plain_password, hashed_password, username=None):
+        """Verifies a plain password against a bcrypt hash (False for invalid hashes)."""
+        return get_password_hasher().verify(plain_password, hashed_password, username=username)
+
+    def _upgrade_password_hash(self, username, password, old_hash):
+        """Re-hash legacy / low-cost hashes in the background after a successful login"""
+        user = self.users[username]
+
+        def store(new_hash):
+            # Skip if the password changed while we were hashing
+            if user.get("password_hash") == old_hash:
+                user["password_hash"] = new_hash
+                supabase_save_users({username: user})
+
+        return get_password_hasher().rehash_in_background(password, store, username=username)
 
     # --- LEGACY METHOD FOR MIGRATION (private) ---
     def _verify_legacy_password(self, password, password_hash):
@@ -5671,24 +8944,71 @@ class UserManager:
         return hashlib.sha256((password + salt).encode()).hexdigest() == password_hash
 
     # --- THE REST OF YOUR CODE IS UNCHANGED ---
-    def save_users(self):
+    def refresh(self):
+        """Cheap per-rerun refresh: incremental user sync, rate limited by the directory"""
+        self.users.sync()
+
+    def save_users(self, *usernames):
+        """Save the given users (all users if none given)"""
+        self._metrics_cache = None
+        if usernames:
+            return supabase_save_users({u: self.users[u] for u in usernames if u in self.users})
         return supabase_save_users(self.users)
 
-    def save_analytics(self):
-        return supabase_save_analytics(self.analytics)
+    def save_analytics(self, counters=()):
+        """Save the aggregate counters row (histories live in analytics_events)"""
+        return supabase_save_analytics(self.analytics, counters=counters)
+
+    def log_event(self, event_type, username=None, success=None, **details):
+        """Append one analytics event (single-row insert, never rewrites history)"""
+        return supabase_append_analytics_events([build_analytics_event(event_type, username, success, **details)])
+
+    def _migrate_legacy_histories(self):
+        """
+        Move the unbounded history lists of the old analytics row into
+        analytics_events (deterministic ids, so concurrent migrations don't
+        duplicate) and keep only the counters on the row.
+        """
+        legacy = {k: self.analytics.get(k) for k in LEGACY_ANALYTICS_HISTORIES if self.analytics.get(k)}
+        if not legacy:
+            return
+        events = []
+        for field, entries in legacy.items():
+            for index, entry in enumerate(entries):
+                entry = dict(entry)
+                fingerprint = f"{field}:{index}:{json.dumps(entry, sort_keys=True, default=str)}"
+                created_at = entry.pop('timestamp', None) or entry.get('deleted_at')
+                username = entry.pop('username', None)
+                success = entry.pop('success', None)
+                events.append(build_analytics_event(
+                    LEGACY_ANALYTICS_HISTORIES[field], username, success, created_at=created_at,
+                    event_id=str(uuid.uuid5(uuid.NAMESPACE_URL, fingerprint)), **entry
+                ))
+        seed_counters = ()
+        if "successful_logins" not in self.analytics:
+            # One-off seed of the counter column, sent with the same row write; afterwards only record_login touches it
+            self.analytics["successful_logins"] = sum(1 for e in legacy.get("login_history", []) if e.get("success"))
+            seed_counters = ("successful_logins",)
+        if supabase_append_analytics_events(events):
+            for field in LEGACY_ANALYTICS_HISTORIES:
+                if field in self.analytics:
+                    self.analytics[field] = []  # Clear the column too - upsert only touches sent keys
+            self.save_analytics(counters=seed_counters)
+            logging.info(f"Migrated {len(events)} analytics history entries to {ANALYTICS_EVENTS_TABLE}")
 
     def periodic_cleanup(self):
-        session_reset_count = 0
+        reset_usernames = []
         for username in self.users:
             if self.users[username].get('active_sessions', 0) > 0:
                 self.users[username]['active_sessions'] = 0
-                session_reset_count += 1
-        if session_reset_count > 0:
-            self.save_users()
+                reset_usernames.append(username)
+        if reset_usernames:
+            self.save_users(*reset_usernames)
 
     def register_user(self, username, password, name, email, plan="trial"):
-        self.load_data()
+        self.users.sync(force=True)
         if username in self.users: return False, "Username already exists"
+        if self.users.email_exists(email): return False, "Email address already registered"
         if not re.match("^[a-zA-Z0-9_]{3,20}$", username): return False, "Username must be 3-20 characters (letters, numbers, _)"
         if len(password) < 8: return False, "Password must be at least 8 characters"
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email): return False, "Invalid email address"
@@ -5696,8 +9016,12 @@ class UserManager:
         plan_config = Config.PLANS.get(plan, Config.PLANS["trial"])
         expires = (datetime.now() + timedelta(days=plan_config["duration"])).strftime("%Y-%m-%d")
 
+        try:
+            password_hash = self.hash_password(password)
+        except PasswordHasherBusy:
+            return False, PASSWORD_HASHER_BUSY_MESSAGE
         self.users[username] = {
-            "password_hash": self.hash_password(password),
+            "password_hash": password_hash,
             "name": name, "email": email, "plan": plan, "expires": expires,
             "created": datetime.now().isoformat(), "last_login": None, "login_count": 0,
             "active_sessions": 0, "max_sessions": plan_config["max_sessions"], "is_active": True,
@@ -5705,32 +9029,37 @@ class UserManager:
             "payment_status": "active" if plan == "trial" else "pending", "email_verified": False,
             "verification_date": None, "verification_notes": "", "verification_admin": None
         }
-        if 'user_registrations' not in self.analytics: self.analytics['user_registrations'] = []
-        self.analytics["user_registrations"].append({ "username": username, "plan": plan, "timestamp": datetime.now().isoformat() })
-        
-        users_saved, analytics_saved = self.save_users(), self.save_analytics()
-        if users_saved and analytics_saved:
+        users_saved = self.save_users(username)
+        if users_saved:
+            self.log_event("registration", username, plan=plan)
             return True, f"Account created successfully! {plan_config['name']} activated."
         else:
             if username in self.users: del self.users[username]
             return False, "Error saving user data. Please try again."
 
-    def authenticate(self, username, password):
-        if 'login_history' not in self.analytics: self.analytics['login_history'] = []
-        self.analytics["total_logins"] = self.analytics.get("total_logins", 0) + 1
-        self.analytics["login_history"].append({ "username": username, "timestamp": datetime.now().isoformat(), "success": False })
+    def _record_login(self, username, success):
+        """Atomic server-side login counters + one login event (constant cost however long the history)"""
+        self.analytics["total_logins"] = self.analytics.get("total_logins", 0) + 1  # Local view only
+        if success:
+            self.analytics["successful_logins"] = self.analytics.get("successful_logins", 0) + 1
+        self.log_event("login", username, success)
+        return supabase_record_login(success)
 
+    def authenticate(self, username, password):
         if username not in self.users:
-            self.save_analytics(); return False, "Invalid username or password"
+            self._record_login(username, False); return False, "Invalid username or password"
 
         user = self.users[username]
         current_hash = user.get("password_hash")
 
-        if not user.get("is_active", True): return False, "Account deactivated. Please contact support."
+        if not user.get("is_active", True):
+            self._record_login(username, False); return False, "Account deactivated. Please contact support."
 
         password_verified, is_legacy_hash = False, False
         try:
-            if self.verify_password(password, current_hash): password_verified = True
+            if self.verify_password(password, current_hash, username=username): password_verified = True
+        except PasswordHasherBusy:
+            return False, "Too many login attempts in progress. Please try again in a moment."
         except (ValueError, TypeError): pass
 
         if not password_verified:
@@ -5738,22 +9067,20 @@ class UserManager:
                 password_verified, is_legacy_hash = True, True
 
         if not password_verified:
-            self.save_analytics(); return False, "Invalid username or password"
+            self._record_login(username, False); return False, "Invalid username or password"
         
         expires = user.get("expires")
         if expires and datetime.strptime(expires, "%Y-%m-%d").date() < date.today():
-            return False, "Subscription expired. Please renew your plan."
+            self._record_login(username, False); return False, "Subscription expired. Please renew your plan."
 
-        if is_legacy_hash:
-            st.toast("Upgrading account security...", icon="🛡️")
-            user["password_hash"] = self.hash_password(password)
+        if is_legacy_hash or get_password_hasher().needs_rehash(current_hash):
+            self._upgrade_password_hash(username, password, current_hash)
 
         user["last_login"] = datetime.now().isoformat()
         user["login_count"] = user.get("login_count", 0) + 1
         user["active_sessions"] = user.get("active_sessions", 0) + 1
-        self.analytics["login_history"][-1]["success"] = True
 
-        users_saved, analytics_saved = self.save_users(), self.save_analytics()
+        users_saved, analytics_saved = self.save_users(username), self._record_login(username, True)
         return (True, "Login successful") if users_saved and analytics_saved else (False, "Error saving login data")
     
     def create_test_user(self, plan="trial"):
@@ -5761,8 +9088,12 @@ class UserManager:
         test_email = f"test{int(time.time())}@example.com"
         plan_config = Config.PLANS.get(plan, Config.PLANS["trial"])
         expires = (datetime.now() + timedelta(days=plan_config["duration"])).strftime("%Y-%m-%d")
+        try:
+            password_hash = self.hash_password("test12345")
+        except PasswordHasherBusy:
+            return None, PASSWORD_HASHER_BUSY_MESSAGE
         self.users[test_username] = {
-            "password_hash": self.hash_password("test12345"),
+            "password_hash": password_hash,
             "name": f"Test User {test_username}", "email": test_email, "plan": plan,
             "expires": expires, "created": datetime.now().isoformat(), "last_login": None,
             "login_count": 0, "active_sessions": 0, "max_sessions": plan_config["max_sessions"],
@@ -5770,8 +9101,7 @@ class UserManager:
             "payment_status": "active", "email_verified": False, "verification_date": None,
             "verification_notes": "", "verification_admin": None
         }
-        self.analytics["user_registrations"].append({ "username": test_username, "plan": plan, "timestamp": datetime.now().isoformat() })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(test_username) and self.log_event("registration", test_username, plan=plan, test_user=True):
             return test_username, f"Test user '{test_username}' created with {plan} plan!"
         else:
             return None, "Error creating test user"
@@ -5780,11 +9110,9 @@ class UserManager:
         if username not in self.users: return False, "User not found"
         if username == "admin": return False, "Cannot delete admin account"
         user_data = self.users.pop(username)
-        if 'deleted_users' not in self.analytics: self.analytics['deleted_users'] = []
-        self.analytics['deleted_users'].append({ "username": username, "plan": user_data.get('plan', 'unknown'), "created": user_data.get('created', 'unknown'), "deleted_at": datetime.now().isoformat() })
         supabase_success = supabase_delete_user(username)
-        users_saved, analytics_saved = self.save_users(), self.save_analytics()
-        return (True, f"User '{username}' has been permanently deleted") if users_saved and analytics_saved and supabase_success else (False, "Error deleting user data")
+        analytics_saved = self.log_event("user_deleted", username, plan=user_data.get('plan', 'unknown'), created=user_data.get('created', 'unknown'))
+        return (True, f"User '{username}' has been permanently deleted") if analytics_saved and supabase_success else (False, "Error deleting user data")
 
     def change_user_plan(self, username, new_plan):
         if username not in self.users: return False, "User not found"
@@ -5795,9 +9123,7 @@ class UserManager:
         new_plan_config = Config.PLANS.get(new_plan, {})
         expires = "2030-12-31" if new_plan == "admin" else (datetime.now() + timedelta(days=new_plan_config.get("duration", 30))).strftime("%Y-%m-%d")
         user_data.update({'plan': new_plan, 'expires': expires, 'max_sessions': new_plan_config.get('max_sessions', 1) if new_plan != "admin" else 3})
-        if 'plan_changes' not in self.analytics: self.analytics['plan_changes'] = []
-        self.analytics['plan_changes'].append({ "username": username, "old_plan": old_plan, "new_plan": new_plan, "timestamp": datetime.now().isoformat(), "admin": st.session_state.get("username", "System") })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(username) and self.log_event("plan_change", username, old_plan=old_plan, new_plan=new_plan, admin=st.session_state.get("username", "System")):
             return True, f"User '{username}' plan changed from {old_plan} to {new_plan}"
         else:
             return False, "Error saving plan change"
@@ -5805,17 +9131,18 @@ class UserManager:
     def logout(self, username):
         if username in self.users:
             self.users[username]["active_sessions"] = max(0, self.users[username].get("active_sessions", 1) - 1)
-            self.save_users()
+            self.save_users(username)
 
     def change_admin_password(self, current_password, new_password, changed_by="admin"):
         admin_user = self.users.get("admin")
         if not admin_user: return False, "Admin account not found"
-        if not self.verify_password(current_password, admin_user["password_hash"]): return False, "Current password is incorrect"
-        if self.verify_password(new_password, admin_user["password_hash"]): return False, "New password cannot be the same as current password"
-        admin_user["password_hash"] = self.hash_password(new_password)
-        if 'password_changes' not in self.analytics: self.analytics['password_changes'] = []
-        self.analytics['password_changes'].append({ "username": "admin", "timestamp": datetime.now().isoformat(), "changed_by": changed_by })
-        if self.save_users() and self.save_analytics():
+        try:
+            if not self.verify_password(current_password, admin_user["password_hash"]): return False, "Current password is incorrect"
+            if self.verify_password(new_password, admin_user["password_hash"]): return False, "New password cannot be the same as current password"
+            admin_user["password_hash"] = self.hash_password(new_password)
+        except PasswordHasherBusy:
+            return False, PASSWORD_HASHER_BUSY_MESSAGE
+        if self.save_users("admin") and self.log_event("password_change", "admin", changed_by=changed_by):
             return True, "Admin password changed successfully!"
         else:
             return False, "Error saving password change"
@@ -5824,11 +9151,12 @@ class UserManager:
         if username not in self.users: return False, "User not found"
         if len(new_password) < 8: return False, "Password must be at least 8 characters"
         user_data = self.users[username]
-        if self.verify_password(new_password, user_data["password_hash"]): return False, "New password cannot be the same as current password"
-        user_data["password_hash"] = self.hash_password(new_password)
-        if 'password_changes' not in self.analytics: self.analytics['password_changes'] = []
-        self.analytics['password_changes'].append({ "username": username, "timestamp": datetime.now().isoformat(), "changed_by": changed_by, "type": "admin_forced_change" })
-        if self.save_users() and self.save_analytics():
+        try:
+            if self.verify_password(new_password, user_data["password_hash"]): return False, "New password cannot be the same as current password"
+            user_data["password_hash"] = self.hash_password(new_password)
+        except PasswordHasherBusy:
+            return False, PASSWORD_HASHER_BUSY_MESSAGE
+        if self.save_users(username) and self.log_event("password_change", username, changed_by=changed_by, type="admin_forced_change"):
             return True, f"Password for '{username}' changed successfully!"
         else:
             return False, "Error saving password change"
@@ -5839,41 +9167,61 @@ class UserManager:
             return False, "User not found"
 
         user_data = self.users[username]
-        if not self.verify_password(current_password, user_data["password_hash"]):
-            return False, "Current password is incorrect"
-
-        if len(new_password) < 8:
-            return False, "New password must be at least 8 characters"
+        try:
+            if not self.verify_password(current_password, user_data["password_hash"]):
+                return False, "Current password is incorrect"
 
-        if self.verify_password(new_password, user_data["password_hash"]):
-            return False, "New password cannot be the same as current password"
+            if len(new_password) < 8:
+                return False, "New password must be at least 8 characters"
 
-        user_data["password_hash"] = self.hash_password(new_password)
-        if 'password_changes' not in self.analytics:
-            self.analytics['password_changes'] = []
-        self.analytics['password_changes'].append({
-            "username": username, "timestamp": datetime.now().isoformat(),
-            "changed_by": username, "type": "user_self_change"
-        })
+            if self.verify_password(new_password, user_data["password_hash"]):
+                return False, "New password cannot be the same as current password"
 
-        if self.save_users() and self.save_analytics():
+            user_data["password_hash"] = self.hash_password(new_password)
+        except PasswordHasherBusy:
+            return False, PASSWORD_HASHER_BUSY_MESSAGE
+        if self.save_users(username) and self.log_event("password_change", username, changed_by=username, type="user_self_change"):
             return True, "Password changed successfully!"
         else:
             return False, "Error saving password change"
 
+    def _user_metrics(self):
+        """
+        Tile aggregates computed by the database (admin_user_metrics), cached
+        for USER_METRICS_TTL_SECONDS; falls back to scanning the directory if
+        the function isn't installed.
+        """
+        cached = getattr(self, "_metrics_cache", None)
+        if cached and time.monotonic() - cached[0] < USER_METRICS_TTL_SECONDS:
+            return cached[1]
+        metrics = supabase_get_user_metrics()
+        if not metrics:
+            users = list(self.users.items())
+            metrics = {
+                "total_users": len(users),
+                "active_users": sum(1 for _, u in users if u.get('is_active', True)),
+                "online_users": sum(u.get('active_sessions', 0) or 0 for _, u in users),
+                "verified_users": sum(1 for _, u in users if u.get('email_verified', False)),
+                "verified_non_admin": sum(1 for name, u in users if name != "admin" and u.get('email_verified', False)),
+                "plan_distribution": pd.Series([u.get('plan', 'unknown') for _, u in users]).value_counts().to_dict()
+            }
+        self._metrics_cache = (time.monotonic(), metrics)
+        return metrics
+
     def get_business_metrics(self):
-        total_users = len(self.users)
-        active_users = sum(1 for u in self.users.values() if u.get('is_active', True))
-        online_users = sum(u.get('active_sessions', 0) for u in self.users.values())
-        plan_counts = pd.Series([u.get('plan', 'unknown') for u in self.users.values()]).value_counts().to_dict()
-        verified_users = sum(1 for u in self.users.values() if u.get('email_verified', False))
+        metrics = self._user_metrics()
         return {
-            "total_users": total_users, "active_users": active_users, "online_users": online_users,
-            "plan_distribution": plan_counts, "total_logins": self.analytics.get("total_logins", 0),
-            "revenue_today": self.analytics.get("revenue_today", 0), "verified_users": verified_users,
-            "unverified_users": total_users - verified_users
+            "total_users": metrics["total_users"], "active_users": metrics["active_users"],
+            "online_users": metrics["online_users"], "plan_distribution": metrics["plan_distribution"],
+            "total_logins": self.analytics.get("total_logins", 0),
+            "revenue_today": self.analytics.get("revenue_today", 0), "verified_users": metrics["verified_users"],
+            "unverified_users": metrics["total_users"] - metrics["verified_users"]
         }
 
+    def query_users(self, after=None, limit=ADMIN_USER_PAGE_SIZE, **filters):
+        """One keyset page of users (no password hashes) - see supabase_query_users for filters"""
+        return supabase_query_users(after=after, limit=limit, **filters)
+
     def export_user_credentials(self):
         try:
             df = pd.DataFrame.from_dict(self.users, orient='index')
@@ -5888,17 +9236,18 @@ class UserManager:
         if new_username in self.users: return False, "New username already exists"
         if not re.match("^[a-zA-Z0-9_]{3,20}$", new_username): return False, "New username must be 3-20 characters (letters, numbers, _)"
         self.users[new_username] = self.users.pop(old_username)
-        if 'username_changes' not in self.analytics: self.analytics['username_changes'] = []
-        self.analytics['username_changes'].append({ "old_username": old_username, "new_username": new_username, "timestamp": datetime.now().isoformat(), "changed_by": changed_by })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(new_username) and self.log_event("username_change", new_username, old_username=old_username, new_username=new_username, changed_by=changed_by):
             return True, f"Username changed from '{old_username}' to '{new_username}'"
         else:
             self.users[old_username] = self.users.pop(new_username) # Revert change on failure
             return False, "Error saving username change"
         
-    def get_user_credentials_display(self):
+    def get_user_credentials_display(self, after=None, limit=ADMIN_USER_PAGE_SIZE, **filters):
+        """One page of credential rows plus the cursor for the next page"""
         users_list = []
-        for username, user_data in self.users.items():
+        rows, next_cursor = self.query_users(after=after, limit=limit, **filters)
+        for user_data in rows:
+            username = user_data["username"]
             users_list.append({
                 "username": username, "name": user_data.get("name", ""), "email": user_data.get("email", ""),
                 "plan": user_data.get("plan", ""), "expires": user_data.get("expires", ""), "created": user_data.get("created", ""),
@@ -5906,7 +9255,7 @@ class UserManager:
                 "active_sessions": user_data.get("active_sessions", 0), "email_verified": user_data.get("email_verified", False),
                 "verification_date": user_data.get("verification_date", ""), "verification_admin": user_data.get("verification_admin", "")
             })
-        return users_list
+        return users_list, next_cursor
 
     def verify_user_email(self, username, admin_username, notes=""):
         if username not in self.users: return False, "User not found"
@@ -5914,9 +9263,7 @@ class UserManager:
         user_data = self.users[username]
         if user_data.get("email_verified", False): return False, "Email is already verified"
         user_data.update({"email_verified": True, "verification_date": datetime.now().isoformat(), "verification_admin": admin_username, "verification_notes": notes})
-        if 'email_verifications' not in self.analytics: self.analytics['email_verifications'] = []
-        self.analytics['email_verifications'].append({ "username": username, "email": user_data.get("email", ""), "verified_by": admin_username, "timestamp": datetime.now().isoformat(), "notes": notes })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(username) and self.log_event("email_verification", username, email=user_data.get("email", ""), verified_by=admin_username, notes=notes):
             return True, f"Email for '{username}' has been verified successfully!"
         else:
             return False, "Error saving verification data"
@@ -5927,31 +9274,31 @@ class UserManager:
         user_data = self.users[username]
         if not user_data.get("email_verified", False): return False, "Email is not verified"
         user_data.update({"email_verified": False, "verification_date": None, "verification_admin": None, "verification_notes": reason})
-        if 'email_verifications' not in self.analytics: self.analytics['email_verifications'] = []
-        self.analytics['email_verifications'].append({ "username": username, "email": user_data.get("email", ""), "action": "revoked", "revoked_by": admin_username, "timestamp": datetime.now().isoformat(), "reason": reason })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(username) and self.log_event("email_verification", username, email=user_data.get("email", ""), action="revoked", revoked_by=admin_username, reason=reason):
             return True, f"Email verification for '{username}' has been revoked!"
         else:
             return False, "Error saving verification data"
 
     def get_email_verification_stats(self):
-        total_users = len(self.users) -1 # Exclude admin
-        verified_count = sum(1 for u, d in self.users.items() if u != "admin" and d.get("email_verified", False))
+        metrics = self._user_metrics()
+        total_users = metrics["total_users"] - 1 # Exclude admin
+        verified_count = metrics["verified_non_admin"]
         return {
             "total_users": total_users, "verified_count": verified_count, "unverified_count": total_users - verified_count,
             "verification_rate": (verified_count / total_users) * 100 if total_users > 0 else 0
         }
 
-    def get_inactive_users(self, days_threshold=30):
+    def get_inactive_users(self, days_threshold=30, plan=None):
+        """Usernames with no login (or, never logged in, no signup) since the cutoff - filtered server-side"""
         inactive_users = []
-        cutoff_date = datetime.now() - timedelta(days=days_threshold)
-        for username, user_data in self.users.items():
-            if username == "admin": continue
-            last_login_str = user_data.get('last_login')
-            last_activity_date = datetime.fromisoformat(last_login_str) if last_login_str else datetime.fromisoformat(user_data.get('created'))
-            if last_activity_date < cutoff_date:
-                inactive_users.append(username)
-        return inactive_users
+        cutoff = (datetime.now() - timedelta(days=days_threshold)).isoformat()
+        cursor = None
+        while True:
+            rows, cursor = self.query_users(after=cursor, limit=500, plan=plan, inactive_before=cutoff,
+                                            exclude_admin=True, columns='username')
+            inactive_users.extend(row['username'] for row in rows)
+            if cursor is None:
+                return inactive_users
 
     def upgrade_user_to_premium_tier(self, username, plan_key, duration_days, admin_username):
         if username not in self.users: return False, "User not found"
@@ -5962,9 +9309,7 @@ class UserManager:
             'expires': (datetime.now() + timedelta(days=duration_days)).strftime("%Y-%m-%d"),
             'max_sessions': Config.PLANS.get(plan_key, {}).get('max_sessions', 3)
         })
-        if 'plan_changes' not in self.analytics: self.analytics['plan_changes'] = []
-        self.analytics['plan_changes'].append({ "username": username, "old_plan": old_plan, "new_plan": plan_key, "timestamp": datetime.now().isoformat(), "admin": admin_username, "duration_days": duration_days })
-        if self.save_users() and self.save_analytics():
+        if self.save_users(username) and self.log_event("plan_change", username, old_plan=old_plan, new_plan=plan_key, admin=admin_username, duration_days=duration_days):
             return True, f"{username} upgraded to {Config.PLANS.get(plan_key, {}).get('name', plan_key)}"
         else: return False, "Error saving upgrade"
 
@@ -5979,7 +9324,13 @@ class UserManager:
         return success_count, error_count, errors
 
 # Initialize user manager
-user_manager = UserManager()
+@st.cache_resource
+def get_user_manager():
+    """One UserManager per process - sessions share its UserDirectory and analytics counters"""
+    return UserManager()
+
+user_manager = get_user_manager()
+user_manager.refresh()
 
 # -------------------------
 # FIXED: DELETE USER CONFIRMATION DIALOG - WORKING VERSION WITH BACK BUTTON
@@ -6080,10 +9431,7 @@ def render_bulk_delete_inactive():
         )
 
     # Get inactive users - FIXED: Now uses the corrected method
-    inactive_users = user_manager.get_inactive_users(days_threshold)
-
-    if include_trial_only:
-        inactive_users = [user for user in inactive_users if user_manager.users[user].get('plan') == 'trial']
+    inactive_users = user_manager.get_inactive_users(days_threshold, plan="trial" if include_trial_only else None)
 
     if not inactive_users:
         st.success("✅ No inactive users found matching your criteria!")
@@ -6242,7 +9590,7 @@ def render_manage_user_plan():
             user_data['is_active'] = is_active
             user_data['max_sessions'] = max_sessions
 
-            if user_manager.save_users():
+            if user_manager.save_users(username):
                 st.success("User settings updated successfully!")
                 time.sleep(2)
                 st.session_state.manage_user_plan = None
@@ -6840,9 +10188,11 @@ def render_quick_signal_form():
                     "confidence": "Medium"
                 }
 
-                # Add to active signals
-                st.session_state.active_signals.append(new_signal)
-                save_signals_data(st.session_state.active_signals)
+                # Add to the signal store (one row written)
+                ok, result = get_trading_signal_store().create(new_signal)
+                if not ok:
+                    st.error(f"❌ {result}")
+                    return
 
                 st.success("✅ Signal launched successfully! Waiting for confirmation...")
                 st.balloons()
@@ -6929,9 +10279,11 @@ def render_detailed_signal_form():
                     "confidence": confidence
                 }
 
-                # Add to active signals
-                st.session_state.active_signals.append(new_signal)
-                save_signals_data(st.session_state.active_signals)
+                # Add to the signal store (one row written)
+                ok, result = get_trading_signal_store().create(new_signal)
+                if not ok:
+                    st.error(f"❌ {result}")
+                    return
 
                 st.success("✅ Detailed signal launched successfully! Waiting for confirmation...")
                 st.balloons()
@@ -6944,8 +10296,9 @@ def render_signal_confirmation_interface():
 
     st.subheader("🔍 Signal Confirmation Queue")
 
-    # Get pending confirmation signals
-    pending_signals = [s for s in st.session_state.active_signals if s["status"] == "pending_confirmation"]
+    # Get pending confirmation signals (status index)
+    signal_store = get_trading_signal_store()
+    pending_signals = signal_store.list(status="pending_confirmation")
 
     if not pending_signals:
         st.info("🎉 No signals waiting for confirmation. All signals are confirmed!")
@@ -7012,28 +10365,34 @@ def render_signal_confirmation_interface():
                 if st.button("✅ Confirm", key=f"confirm_{signal['signal_id']}", use_container_width=True):
                     # Add confirmation
                     if st.session_state.user['username'] not in [c['admin'] for c in signal['confirmations']]:
-                        signal['confirmations'].append({
+                        confirmations = signal['confirmations'] + [{
                             "admin": st.session_state.user['username'],
                             "timestamp": datetime.now().isoformat(),
                             "notes": "Signal confirmed"
-                        })
-                        save_signals_data(st.session_state.active_signals)
-                        st.success("✅ Signal confirmed!")
-
-                        # AUTO-PUBLISH after 1 confirmation (FIXED)
-                        signal['status'] = 'published'
-                        signal['published_at'] = datetime.now().isoformat()
-                        save_signals_data(st.session_state.active_signals)
-                        st.success("🎉 Signal automatically published!")
+                        }]
+                        # AUTO-PUBLISH after 1 confirmation (FIXED) - confirmation + publish in one versioned write
+                        ok, result = signal_store.update(signal['signal_id'], {
+                            "confirmations": confirmations,
+                            "status": "published",
+                            "published_at": datetime.now().isoformat()
+                        }, expected_version=signal['version'])
+                        if ok:
+                            st.success("✅ Signal confirmed!")
+                            st.success("🎉 Signal automatically published!")
+                        else:
+                            st.warning(f"⚠️ {result}")
                         st.rerun()
                     else:
                         st.warning("⚠️ You have already confirmed this signal")
 
             with col2:
                 if st.button("❌ Reject", key=f"reject_{signal['signal_id']}", use_container_width=True):
-                    signal['status'] = 'rejected'
-                    save_signals_data(st.session_state.active_signals)
-                    st.error("❌ Signal rejected!")
+                    ok, result = signal_store.update(signal['signal_id'], {"status": "rejected"},
+                                                     expected_version=signal['version'])
+                    if ok:
+                        st.error("❌ Signal rejected!")
+                    else:
+                        st.warning(f"⚠️ {result}")
                     st.rerun()
 
             with col3:
@@ -7048,10 +10407,9 @@ def render_published_signals_interface():
 
     st.subheader("📢 Published Signals")
 
-    # Get published signals
-    published_signals = [s for s in st.session_state.active_signals if s["status"] == "published"]
-
-    if not published_signals:
+    # Get published signals (status index)
+    signal_store = get_trading_signal_store()
+    if not signal_store.count(status="published"):
         st.info("📭 No published signals yet. Confirm some signals first!")
         return
 
@@ -7066,10 +10424,9 @@ def render_published_signals_interface():
     with col3:
         filter_signal_type = st.selectbox("Filter by Type", ["All Types"] + SIGNAL_CONFIG["signal_types"], key="published_filter_type")
 
-    # Apply filters
-    filtered_signals = published_signals.copy()
-    if filter_asset != "All Assets":
-        filtered_signals = [s for s in filtered_signals if s["asset"] == filter_asset]
+    # Apply filters (asset via the asset index)
+    filtered_signals = signal_store.list(status="published",
+                                         asset=None if filter_asset == "All Assets" else filter_asset)
     if filter_timeframe != "All Timeframes":
         filtered_signals = [s for s in filtered_signals if s["timeframe"] == filter_timeframe]
     if filter_signal_type != "All Types":
@@ -7104,10 +10461,11 @@ def render_published_signals_interface():
             with col4:
                 # Remove signal button for admin
                 if st.button("🗑️ Remove", key=f"remove_{signal['signal_id']}", use_container_width=True):
-                    # Remove signal from active signals
-                    st.session_state.active_signals = [s for s in st.session_state.active_signals if s['signal_id'] != signal['signal_id']]
-                    save_signals_data(st.session_state.active_signals)
-                    st.success("✅ Signal removed!")
+                    # Remove just this signal
+                    if signal_store.delete(signal['signal_id'], expected_version=signal['version']):
+                        st.success("✅ Signal removed!")
+                    else:
+                        st.warning("⚠️ Signal was changed or removed by another admin")
                     st.rerun()
 
 def render_active_signals_overview():
@@ -7116,8 +10474,7 @@ def render_active_signals_overview():
     st.subheader("📱 Active Trading Signals")
 
     # Get active signals (published and not expired)
-    active_signals = [s for s in st.session_state.active_signals
-                     if s["status"] == "published"]
+    active_signals = get_trading_signal_store().list(status="published")
 
     if not active_signals:
         st.info("📭 No active signals available. Check back later for new trading opportunities!")
@@ -7360,16 +10717,11 @@ def render_user_image_gallery():
             st.rerun()
 
         # Lazy Load High-Res Data
-        if 'bytes_b64' not in img_data or not img_data['bytes_b64']:
-             try:
-                 resp = supabase_client.table('gallery_images').select('bytes_b64').eq('id', img_data['id']).single().execute()
-                 if resp.data: img_data['bytes_b64'] = resp.data['bytes_b64']
-             except: pass
+        decoded = load_gallery_image_bytes(img_data)
 
         # Display The Big Image
-        if img_data.get('bytes_b64'):
+        if decoded:
             try:
-                decoded = base64.b64decode(img_data['bytes_b64'])
                 st.image(decoded, use_column_width=True)
                 
                 # Caption
@@ -7469,59 +10821,59 @@ def render_user_image_gallery():
             return
 
         total_pages = (total_images + per_page - 1) // per_page
-        current_page = min(st.session_state.gallery_page, max(0, total_pages - 1))
+        # Keyset navigation: the page number is for display, the cursor token selects the rows
+        nav = gallery_nav_state("user_gallery_nav", per_page, sort_by, filter_author, filter_strategy)
+        current_page = min(nav["page"], max(0, total_pages - 1))
+        last_cursor = encode_gallery_cursor(sort_by, "before")
+
+        # Load Images
+        with st.spinner("📥 Loading images..."):
+            page_images, prev_cursor, next_cursor = get_gallery_images_paginated(
+                cursor=nav["cursor"], per_page=per_page, sort_by=sort_by,
+                filter_author=filter_author, filter_strategy=filter_strategy
+            )
+
+        if not page_images:
+            st.warning("⚠️ Failed to load images.")
+            return
 
         # Top Nav
         st.subheader("📄 Page Navigation")
         n1, n2, n3, n4, n5 = st.columns(5)
         with n1: 
-            if st.button("⏮️ First Page", use_container_width=True): st.session_state.gallery_page = 0; st.rerun()
+            if st.button("⏮️ First Page", use_container_width=True): go_gallery_page(nav, None, 0, "back")
         with n2:
-            if current_page > 0:
-                if st.button("◀️ Previous", use_container_width=True): st.session_state.gallery_page = current_page - 1; st.rerun()
+            if prev_cursor:
+                if st.button("◀️ Previous", use_container_width=True): go_gallery_page(nav, prev_cursor, current_page - 1, "back")
             else: st.button("◀️ Previous", disabled=True, use_container_width=True)
         with n4:
-            if current_page < total_pages - 1:
-                if st.button("Next ▶️", use_container_width=True): st.session_state.gallery_page = current_page + 1; st.rerun()
+            if next_cursor:
+                if st.button("Next ▶️", use_container_width=True): go_gallery_page(nav, next_cursor, current_page + 1, "forward")
             else: st.button("Next ▶️", disabled=True, use_container_width=True)
         with n5:
-            if st.button("⏭️ Last Page", use_container_width=True): st.session_state.gallery_page = total_pages - 1; st.rerun()
+            if st.button("⏭️ Last Page", use_container_width=True): go_gallery_page(nav, last_cursor, total_pages - 1, "back")
 
         st.markdown("---")
 
-        # Load Images
-        with st.spinner("📥 Loading images..."):
-            page_images = get_gallery_images_paginated(
-                page=current_page, per_page=per_page, sort_by=sort_by,
-                filter_author=filter_author, filter_strategy=filter_strategy
-            )
-
-        if not page_images:
-            st.warning("⚠️ Failed to load images.")
-            return
-
         # ✅ SAVE FOR FOCUS MODE
         st.session_state.current_page_images = page_images
+        prefetch_gallery_page_bytes(page_images, "thumbnail")
+        page_download_urls = gallery_page_download_urls(page_images)
 
         # ---------- GRID LOOP ----------
         st.subheader(f"📸 Page {current_page + 1} Images")
         cols = st.columns(3)
         for idx, img_data in enumerate(page_images):
             
-            # 1. Lazy Load
-            if 'bytes_b64' not in img_data or not img_data['bytes_b64']:
-                try:
-                    resp = supabase_client.table('gallery_images').select('bytes_b64').eq('id', img_data['id']).single().execute()
-                    if resp.data: img_data['bytes_b64'] = resp.data['bytes_b64']
-                except: pass
+            # 1. Lazy Load (grid shows thumbnails; the focus view fetches the full image)
+            decoded = load_gallery_image_bytes(img_data, "thumbnail")
 
             # 2. Display
             col = cols[idx % 3]
             with col:
                 # Image
-                if img_data.get('bytes_b64'):
+                if decoded:
                     try:
-                        decoded = base64.b64decode(img_data['bytes_b64'])
                         st.image(decoded, use_column_width=True)
                     except: st.empty()
                 else: st.empty()
@@ -7536,15 +10888,17 @@ def render_user_image_gallery():
                 # KAI-BUILDER: Blue Download Button Logic
                 with c_dl:
                     try:
-                        # Prepare High-Speed HTML Download Button
-                        if img_data.get('bytes_b64'):
-                            b64_data = img_data['bytes_b64']
+                        # Prepare High-Speed HTML Download Button (signed per page, data URI only on click)
+                        download_url = gallery_card_download_url(
+                            img_data, page_download_urls, f"user_{img_data.get('id', idx)}"
+                        )
+                        if download_url:
                             file_ext = img_data.get('format', 'PNG').lower()
                             file_name = img_data.get('name', f'image_{idx}')
                         
                             # ⚠️ CRITICAL: Must start with f""" and end with """ (3 quotes)
                             dl_html = f"""
-                                <a href="data:image/{file_ext};base64,{b64_data}" download="{file_name}.{file_ext}" style="text-decoration: none;">
+                                <a href="{download_url}" download="{file_name}.{file_ext}" target="_blank" style="text-decoration: none;">
                                     <div style="
                                         background-color: #2563EB; 
                                         color: white; 
@@ -7571,20 +10925,21 @@ def render_user_image_gallery():
                 
                 st.markdown("---")
 
+        # Warm the neighbouring page(s) so Next/Prev render from cache
+        prefetch_gallery_neighbours(nav, prev_cursor, next_cursor)
+
         # ---------- BOTTOM NAV (COMPLETE) ----------
         st.subheader("📄 Bottom Navigation")
         b1, b2, b3, b4, b5 = st.columns(5)
 
         with b1:
             if st.button("⏮️ First", use_container_width=True, key="user_gallery_first_bottom"):
-                st.session_state.gallery_page = 0
-                st.rerun()
+                go_gallery_page(nav, None, 0, "back")
 
         with b2:
-            if current_page > 0:
+            if prev_cursor:
                 if st.button("◀️ Prev", use_container_width=True, key="user_gallery_prev_bottom"):
-                    st.session_state.gallery_page = current_page - 1
-                    st.rerun()
+                    go_gallery_page(nav, prev_cursor, current_page - 1, "back")
             else:
                 st.button("◀️ Prev", use_container_width=True, disabled=True, key="user_gallery_prev_bottom_disabled")
 
@@ -7592,17 +10947,15 @@ def render_user_image_gallery():
             st.markdown(f"<div style='text-align: center; padding-top: 5px;'><b>Page {current_page + 1}/{total_pages}</b></div>", unsafe_allow_html=True)
 
         with b4:
-            if current_page < total_pages - 1:
+            if next_cursor:
                 if st.button("Next ▶️", use_container_width=True, key="user_gallery_next_bottom"):
-                    st.session_state.gallery_page = current_page + 1
-                    st.rerun()
+                    go_gallery_page(nav, next_cursor, current_page + 1, "forward")
             else:
                 st.button("Next ▶️", use_container_width=True, disabled=True, key="user_gallery_next_bottom_disabled")
 
         with b5:
             if st.button("⏭️ Last", use_container_width=True, key="user_gallery_last_bottom"):
-                st.session_state.gallery_page = total_pages - 1
-                st.rerun()
+                go_gallery_page(nav, last_cursor, total_pages - 1, "back")
 
         st.markdown("---")
         start_num = current_page * per_page + 1
@@ -7613,11 +10966,7 @@ def render_user_image_card_paginated(img_data, page_num, index):
     """Render individual image card - CLEAN IMAGE WITH DATE AND SMALL INFO"""
     try:
         # Get image bytes
-        image_bytes = None
-        if 'bytes' in img_data:
-            image_bytes = img_data['bytes']
-        elif 'bytes_b64' in img_data:
-            image_bytes = base64.b64decode(img_data['bytes_b64'])
+        image_bytes = load_gallery_image_bytes(img_data, "thumbnail")
         
         if image_bytes:
             st.image(
@@ -7646,17 +10995,12 @@ def render_user_image_card_paginated(img_data, page_num, index):
     
     with col2:
         try:
-            image_bytes = None
-            if 'bytes' in img_data:
-                image_bytes = img_data['bytes']
-            elif 'bytes_b64' in img_data:
-                image_bytes = base64.b64decode(img_data['bytes_b64'])
+            download_url = gallery_image_download_url(img_data)
             
-            if image_bytes:
-                b64_img = base64.b64encode(image_bytes).decode()
+            if download_url:
                 file_format = get_image_format_safe(img_data).lower()
                 file_name = img_data.get('name', f'image_{index}')
-                href = f'<a href="data:image/{file_format};base64,{b64_img}" download="{file_name}.{file_format}"><button style="width:100%; padding:6px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer; font-size:12px; font-weight:bold;">⬇️ Download</button></a>'
+                href = f'<a href="{download_url}" download="{file_name}.{file_format}" target="_blank"><button style="width:100%; padding:6px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer; font-size:12px; font-weight:bold;">⬇️ Download</button></a>'
                 st.markdown(href, unsafe_allow_html=True)
         except Exception as e:
             st.button("⬇️ Download", disabled=True, use_container_width=True)
@@ -7671,12 +11015,8 @@ def render_user_image_card(img_data, index):
 
         with col_image:
             try:
-                # Check if we have bytes data in the expected format
-                image_bytes = None
-                if 'bytes' in img_data:
-                    image_bytes = img_data['bytes']
-                elif 'bytes_b64' in img_data:
-                    image_bytes = base64.b64decode(img_data['bytes_b64'])
+                # Medium preview is plenty at this card width
+                image_bytes = load_gallery_image_bytes(img_data, "preview")
                 
                 if image_bytes:
                     st.image(
@@ -7752,18 +11092,13 @@ def render_user_image_card(img_data, index):
 
             with col_download:
                 try:
-                    # Get image bytes for download
-                    image_bytes = None
-                    if 'bytes' in img_data:
-                        image_bytes = img_data['bytes']
-                    elif 'bytes_b64' in img_data:
-                        image_bytes = base64.b64decode(img_data['bytes_b64'])
+                    # Link to the full image; fetched by the browser only on click
+                    download_url = gallery_image_download_url(img_data)
                     
-                    if image_bytes:
-                        b64_img = base64.b64encode(image_bytes).decode()
+                    if download_url:
                         file_format = get_image_format_safe(img_data).lower()
                         file_name = img_data.get('name', f'image_{index}')
-                        href = f'<a href="data:image/{file_format};base64,{b64_img}" download="{file_name}.{file_format}" style="text-decoration: none;">'
+                        href = f'<a href="{download_url}" download="{file_name}.{file_format}" target="_blank" style="text-decoration: none;">'
                         st.markdown(f'{href}<button style="background-color: #4CAF50; color: white; border: none; padding: 8px; text-align: center; text-decoration: none; display: inline-block; font-size: 12px; cursor: pointer; border-radius: 4px; width: 100%;">⬇️ Download</button></a>', unsafe_allow_html=True)
                     else:
                         st.caption("Download unavailable")
@@ -7821,11 +11156,7 @@ def render_image_viewer():
     # Display the image at full width
     try:
         # Get image bytes
-        image_bytes = None
-        if 'bytes' in img_data:
-            image_bytes = img_data['bytes']
-        elif 'bytes_b64' in img_data:
-            image_bytes = base64.b64decode(img_data['bytes_b64'])
+        image_bytes = load_gallery_image_bytes(img_data)
         
         if image_bytes:
             st.image(image_bytes, use_container_width=True, caption=img_data.get('name', ''))
@@ -7872,11 +11203,7 @@ def render_image_viewer():
     # Download button
     st.markdown("---")
     try:
-        image_bytes = None
-        if 'bytes' in img_data:
-            image_bytes = img_data['bytes']
-        elif 'bytes_b64' in img_data:
-            image_bytes = base64.b64decode(img_data['bytes_b64'])
+        image_bytes = load_gallery_image_bytes(img_data)
             
         if image_bytes:
             b64_img = base64.b64encode(image_bytes).decode()
@@ -8041,8 +11368,12 @@ def display_strategy_indicator_images_user(strategy_name):
         st.info("No chart images available for this strategy yet.")
         return
 
-    # Display images ONE PER ROW at FULL WIDTH
-    for indicator_name, img_data in indicators_with_images.items():
+    # Display images ONE PER ROW at FULL WIDTH (bytes fetched on first view, shared cache)
+    for indicator_name in list(indicators_with_images):
+        img_data = get_strategy_indicator_image(strategy_name, indicator_name)
+        if img_data is None:
+            st.warning(f"⚠️ Chart for {indicator_name} is unavailable right now")
+            continue
         with st.container():
             st.markdown(f"#### **{indicator_name}**")
 
@@ -8771,19 +12102,29 @@ def render_admin_strategy_notes(strategy_data, daily_strategies, cycle_day, anal
                 key_note = f"note__{sanitize_key(selected_strategy)}__{sanitize_key(indicator)}"
                 key_status = f"status__{sanitize_key(selected_strategy)}__{sanitize_key(indicator)}"
 
-                st.session_state.strategy_analyses_data[selected_strategy][indicator] = {
+                updated = {
                     "note": st.session_state.get(key_note, ""),
                     "status": st.session_state.get(key_status, "Open"),
                     "momentum": strategy_type,  # This now stores the new lowercase type
                     "strategy_tag": strategy_tag,
-                    "analysis_date": analysis_date.strftime("%Y-%m-%d"),
-                    "last_modified": datetime.utcnow().isoformat() + "Z",
-                    "modified_by": "KAI"  # CHANGED: from "admin" to "KAI"
+                    "analysis_date": analysis_date.strftime("%Y-%m-%d")
                 }
+                # Untouched indicators keep their record (and timestamp) - nothing to upsert
+                existing = st.session_state.strategy_analyses_data[selected_strategy].get(indicator)
+                if existing and all(existing.get(field) == value for field, value in updated.items()):
+                    continue
+
+                st.session_state.strategy_analyses_data[selected_strategy][indicator] = dict(
+                    updated,
+                    last_modified=datetime.utcnow().isoformat() + "Z",
+                    modified_by="KAI"  # CHANGED: from "admin" to "KAI"
+                )
 
-            # Save to Supabase
-            save_data(st.session_state.strategy_analyses_data)
-            st.success("✅ All signals saved successfully! (Admin Mode)")
+            # Save to Supabase (changed rows only)
+            if save_data(st.session_state.strategy_analyses_data):
+                save_metrics = get_strategy_analyses_tracker().metrics
+                st.success(f"✅ All signals saved successfully! (Admin Mode) - "
+                           f"{save_metrics['last_written']} changed, {save_metrics['last_skipped']} unchanged")
 
     # FIXED: Strategy indicator images section - Now placed outside the main form
     st.markdown("---")
@@ -9351,7 +12692,7 @@ def render_admin_image_gallery_paginated():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Refresh Gallery", use_container_width=True, key="admin_refresh_gallery"):
-                st.session_state.gallery_page = 0; st.rerun()
+                st.session_state.pop("admin_gallery_nav", None); get_gallery_page_cache().invalidate(); st.rerun()
         with col2:
             if st.button("📊 Gallery Stats", use_container_width=True, key="admin_gallery_stats"):
                 st.session_state.show_gallery_stats = True
@@ -9369,89 +12710,181 @@ def render_admin_image_gallery_paginated():
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
             try:
                 if 'supabase_client' in globals() and supabase_client:
-                    supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    resp = supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    prune_gallery_blobs(resp.data or [])
+                    get_gallery_page_cache().invalidate()
                 st.success(f"✅ Deleted images older than {days_old} days")
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error: {e}")
 
 
-@retry_with_backoff(max_retries=3, base_delay=0.5, exceptions=(Exception,))
-def get_gallery_images_paginated(page=0, per_page=15, sort_by="newest", 
-                                  filter_author=None, filter_strategy=None):
-    """Paginated fetch with robust null checking"""
+# Gallery pages are keyset-paginated on (sort column, id), so a deep page costs
+# the same as page one and uploads between clicks never shift a page. Rows
+# without a timestamp sort after all dated ones in either sort order:
+#   update gallery_images set likes = 0 where likes is null;
+#   alter table gallery_images alter column likes set default 0, alter column likes set not null;
+#   create index if not exists gallery_images_timestamp_id on gallery_images (timestamp, id);
+#   create index if not exists gallery_images_likes_id on gallery_images (likes, id);
+GALLERY_SORT_KEYS = {"newest": ("timestamp", True), "oldest": ("timestamp", False), "most_liked": ("likes", True)}
+
+def encode_gallery_cursor(sort_by, direction, row=None):
+    """
+    Opaque page token: the rows strictly `direction` ('after' / 'before') the
+    row's (sort value, id) position. No row means from the end ('before') or
+    the start ('after') of the ordering.
+    """
+    field = GALLERY_SORT_KEYS.get(sort_by, GALLERY_SORT_KEYS["newest"])[0]
+    position = [row.get(field), row['id']] if row else None
+    payload = json.dumps([sort_by, direction, position], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_gallery_cursor(token):
+    """(sort_by, direction, position) from a page token; ValueError if malformed"""
     try:
-        if not supabase_client:
-            return []
+        sort_by, direction, position = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Bad gallery cursor: {e}")
+    if sort_by not in GALLERY_SORT_KEYS or direction not in ("after", "before"):
+        raise ValueError("Bad gallery cursor")
+    return sort_by, direction, position
 
-        offset = max(page, 0) * max(per_page, 1)
-        query = supabase_client.table("gallery_images").select("*")
+def fetch_gallery_page(cursor=None, per_page=15, sort_by="newest", filter_author=None, filter_strategy=None,
+                       min_likes=0):
+    """
+    One keyset page of gallery metadata rows straight from Supabase (raises on
+    error). Returns (rows, prev_cursor, next_cursor); a cursor is None when
+    there is nothing further in that direction.
+    """
+    sort_field, descending = GALLERY_SORT_KEYS.get(sort_by, GALLERY_SORT_KEYS["newest"])
+    query = supabase_client.table("gallery_images").select(GALLERY_IMAGE_COLUMNS)
 
-        # Apply filters
-        if filter_author and filter_author != "All Authors":
-            query = query.eq("uploaded_by", filter_author)
-        if filter_strategy and filter_strategy != "All Strategies":
-            try:
-                query = query.contains("strategies", [filter_strategy])
-            except:
-                pass  # Array filtering might not be supported
-
-        # Apply sorting
-        sort_field = "timestamp"
-        sort_order = "desc" if sort_by != "oldest" else "asc"
-        if sort_by == "most_liked":
-            sort_field = "likes"
-            sort_order = "desc"
+    # Apply filters
+    if filter_author and filter_author != "All Authors":
+        query = query.eq("uploaded_by", filter_author)
+    if filter_strategy and filter_strategy != "All Strategies":
+        try:
+            query = query.contains("strategies", [filter_strategy])
+        except:
+            pass  # Array filtering might not be supported
+    if min_likes:
+        query = query.gte("likes", min_likes)
+
+    # Seek past the cursor row; 'before' pages are read in reverse order and flipped
+    direction, position = "after", None
+    if cursor:
+        cursor_sort, direction, position = decode_gallery_cursor(cursor)
+        if cursor_sort != sort_by:
+            direction, position = "after", None  # Sort changed - start over
+    query_descending = descending if direction == "after" else not descending
+    nulls_last = direction == "after"  # 'before' pages walk the ordering backwards, NULLs included
+    if position:
+        value, last_id = position
+        op = "lt" if query_descending else "gt"
+        query = query.or_(keyset_seek_filter(sort_field, op, value, "id", last_id, nulls_last=nulls_last))
+    query = query.order(sort_field, desc=query_descending, nullsfirst=not nulls_last)\
+        .order("id", desc=query_descending)
+
+    # One extra row tells us whether there is another page in this direction
+    resp = query.limit(per_page + 1).execute()
+    rows = (getattr(resp, "data", None) or []) if resp else []
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "before":
+        rows.reverse()
+
+    imgs = []
+    for row in rows:
+        try:
+            # CRITICAL: Ensure format field exists
+            if not row.get('format'):
+                # Try to infer from name
+                name = row.get('name', '')
+                if row.get('file_format'):
+                    row['format'] = row['file_format']
+                elif name:
+                    ext = name.split('.')[-1].lower() if '.' in name else 'png'
+                    row['format'] = ext.upper() if ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp'] else 'PNG'
+                else:
+                    row['format'] = 'PNG'  # Safe default
             
-        query = query.order(sort_field, desc=(sort_order == "desc"))
-        query = query.range(offset, offset + per_page - 1)
-
-        resp = query.execute()
-        if not resp or not getattr(resp, "data", None):
-            return []
+            # Bytes are not in the row; cards fetch them with load_gallery_image_bytes()
+            
+            # Ensure strategies field exists
+            row["strategies"] = row.get("strategies") or [row.get("strategy") or "Unspecified"]
+            row["likes"] = row.get("likes", 0)
+            
+            imgs.append(row)
+            
+        except Exception as e:
+            logging.warning(f"Skipping corrupted image {row.get('name')}: {e}")
+            continue
+
+    if not rows:
+        return imgs, None, None
+    # Cursors come from the raw boundary rows so skipped rows cannot break the seek
+    more_before = has_more if direction == "before" else position is not None
+    more_after = has_more if direction == "after" else position is not None
+    prev_cursor = encode_gallery_cursor(sort_by, "before", rows[0]) if more_before else None
+    next_cursor = encode_gallery_cursor(sort_by, "after", rows[-1]) if more_after else None
+    return imgs, prev_cursor, next_cursor
 
-        imgs = []
-        for row in resp.data:
-            try:
-                # CRITICAL: Ensure format field exists
-                if not row.get('format'):
-                    # Try to infer from name
-                    name = row.get('name', '')
-                    if name:
-                        ext = name.split('.')[-1].lower() if '.' in name else 'png'
-                        row['format'] = ext.upper() if ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp'] else 'PNG'
-                    else:
-                        row['format'] = 'PNG'  # Safe default
-                
-                # Reconstruct bytes from multiple possible sources
-                if isinstance(row.get('encoded_data'), dict):
-                    row['bytes'] = decode_image_from_storage(row['encoded_data'])
-                elif row.get('bytes_b64'):
-                    try:
-                        row['bytes'] = base64.b64decode(row['bytes_b64'])
-                    except Exception as e:
-                        logging.warning(f"Failed to decode bytes_b64 for {row.get('name')}: {e}")
-                        row['bytes'] = None
-                elif not row.get('bytes'):
-                    row['bytes'] = None
-                
-                # Ensure strategies field exists
-                row["strategies"] = row.get("strategies") or [row.get("strategy") or "Unspecified"]
-                row["likes"] = row.get("likes", 0)
-                
-                imgs.append(row)
-                
-            except Exception as e:
-                logging.warning(f"Skipping corrupted image {row.get('name')}: {e}")
-                continue
-        
-        return imgs
+@retry_with_backoff(max_retries=3, base_delay=0.5, exceptions=(Exception,))
+def get_gallery_images_paginated(cursor=None, per_page=15, sort_by="newest",
+                                  filter_author=None, filter_strategy=None, min_likes=0):
+    """
+    Keyset page (rows, prev_cursor, next_cursor) with robust null checking -
+    served from the shared page cache when warm
+    """
+    try:
+        if not supabase_client:
+            return [], None, None
+        key = (cursor, per_page, sort_by, filter_author, filter_strategy, min_likes)
+        return get_gallery_page_cache().get_or_fetch(key, fetch_gallery_page)
         
     except Exception as e:
         logging.error(f"Gallery pagination error: {e}")
         st.error(f"⚠️ Failed to load images: {e}")
-        return []
-        
+        return [], None, None
+
+def prefetch_gallery_neighbours(nav, prev_cursor, next_cursor):
+    """
+    Warm the page cache (and thumbnails) for the next page in the background,
+    and for the previous page too when the user is paging backwards.
+    """
+    if not supabase_client:
+        return
+    store, cache, pool = get_gallery_blob_store(), get_gallery_image_cache(), get_gallery_fetch_pool()
+    warm_thumbnails = lambda page: prefetch_gallery_page_bytes(
+        [row for row in page[0] if row.get('content_key')], "thumbnail", store=store, cache=cache, pool=pool)
+    neighbours = [next_cursor]
+    if nav.get("moved") == "back":
+        neighbours.append(prev_cursor)
+    page_cache = get_gallery_page_cache()
+    for cursor in neighbours:
+        if cursor:
+            page_cache.prefetch((cursor, *nav["view"]), fetch_gallery_page, after=warm_thumbnails)
+
+def gallery_nav_state(state_key, per_page, sort_by, filter_author=None, filter_strategy=None, min_likes=0):
+    """
+    Cursor navigation state for one gallery view, kept in session state:
+    {"view", "cursor", "page", "moved"}. Changing the sort, filters or page
+    size starts over at the first page.
+    """
+    view = (per_page, sort_by, filter_author, filter_strategy, min_likes)
+    nav = st.session_state.get(state_key)
+    if not nav or nav.get("view") != view:
+        nav = {"view": view, "cursor": None, "page": 0, "moved": None}
+        st.session_state[state_key] = nav
+    st.session_state.gallery_page = nav["page"]
+    return nav
+
+def go_gallery_page(nav, cursor, page, moved):
+    """Point the navigation at another page token and rerun"""
+    nav.update(cursor=cursor, page=max(0, page), moved=moved)
+    st.session_state.gallery_page = nav["page"]
+    st.rerun()
+
 def render_admin_image_gallery_paginated():
     st.title("🖼️ Admin: Image Gallery Management")
     admin_tab1, admin_tab2, admin_tab3 = st.tabs(["📊 View & Manage", "⬆️ Upload", "⚙️ Settings"])
@@ -9462,7 +12895,7 @@ def render_admin_image_gallery_paginated():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Refresh Gallery", use_container_width=True, key="admin_refresh_gallery"):
-                st.session_state.gallery_page = 0; st.rerun()
+                st.session_state.pop("admin_gallery_nav", None); get_gallery_page_cache().invalidate(); st.rerun()
         with col2:
             if st.button("📊 Gallery Stats", use_container_width=True, key="admin_gallery_stats"):
                 st.session_state.show_gallery_stats = True
@@ -9480,7 +12913,9 @@ def render_admin_image_gallery_paginated():
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
             try:
                 if 'supabase_client' in globals() and supabase_client:
-                    supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    resp = supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    prune_gallery_blobs(resp.data or [])
+                    get_gallery_page_cache().invalidate()
                 st.success(f"✅ Deleted images older than {days_old} days")
                 st.rerun()
             except Exception as e:
@@ -9501,31 +12936,36 @@ def get_gallery_images_count_filtered(
     - Safe filter application
     """
     
-    # STEP 1: Try database first
+    # STEP 1: Try database first (same filters as fetch_gallery_page; cached with the pages)
     if supabase_client:
         try:
-            query = supabase_client.table('gallery_images').select('id', count='exact')
-            
-            if filter_author:
-                query = query.eq('uploaded_by', filter_author)
-            
-            if filter_strategy:
-                try:
-                    query = query.contains('strategies', [filter_strategy])
-                except Exception:
-                    # Array filtering might not be supported
-                    pass
-            
-            resp = query.execute()
-            
-            if hasattr(resp, 'error') and resp.error:
-                raise RuntimeError(f"Database error: {resp.error}")
-            
-            count = getattr(resp, 'count', None)
-            if count is None and hasattr(resp, 'data'):
-                count = len(resp.data)
+            def count_query(_, filter_author, filter_strategy, min_likes):
+                # head=True: only the Content-Range count comes back, never the rows
+                query = supabase_client.table('gallery_images').select('id', count='exact', head=True)
+                
+                if filter_author:
+                    query = query.eq('uploaded_by', filter_author)
+                
+                if filter_strategy:
+                    try:
+                        query = query.contains('strategies', [filter_strategy])
+                    except Exception:
+                        # Array filtering might not be supported
+                        pass
+                
+                if min_likes:
+                    query = query.gte('likes', min_likes)
+                
+                resp = query.execute()
+                
+                if hasattr(resp, 'error') and resp.error:
+                    raise RuntimeError(f"Database error: {resp.error}")
+                
+                return getattr(resp, 'count', None) or 0
             
-            count = count or 0
+            count = get_gallery_page_cache().get_or_fetch(
+                ("count", filter_author, filter_strategy, min_likes), count_query
+            )
             _cache_set("lk_gallery_count_filtered", count)
             
             logging.info(f"✅ Gallery count: {count}")
@@ -9644,11 +13084,11 @@ def render_image_uploader():
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 unique_name = f"{timestamp}_{uf.name}"
                 
-                # Encode to base64 for storage
+                # Bytes go to the blob store; the row only references them
                 try:
-                    bytes_b64 = base64.b64encode(file_bytes).decode('utf-8')
+                    blob_fields = store_gallery_image_bytes(file_bytes, file_format)
                 except Exception as e:
-                    st.error(f"❌ {uf.name}: Failed to encode - {str(e)}")
+                    st.error(f"❌ {uf.name}: Failed to store image - {str(e)}")
                     error_count += 1
                     continue
                 
@@ -9656,17 +13096,14 @@ def render_image_uploader():
                 db_record = {
                     "name": uf.name,
                     "filename": unique_name,
-                    "storage_path": f"gallery/{unique_name}",
-                    "public_url": f"https://example.com/gallery/{unique_name}",
+                    "storage_path": blob_fields["content_key"],
                     "description": image_description if image_description else "",
                     "uploaded_by": st.session_state.user['username'],
                     "timestamp": datetime.now().isoformat(),
-                    "file_size": len(file_bytes),
-                    "file_format": file_format,
                     "likes": 0,
                     "strategies": selected_strategies if selected_strategies else [],
-                    "bytes_b64": bytes_b64,
-                    "comments": []
+                    "comments": [],
+                    **blob_fields
                     # NOTE: We're NOT including 'format', 'created_at', 'updated_at' 
                     # since they either don't exist or cause errors
                 }
@@ -9693,8 +13130,10 @@ def render_image_uploader():
                 st.info(f"🏷️ Tagged with: {', '.join(selected_strategies)}")
             
             # Refresh gallery data
+            get_gallery_page_cache().invalidate()
             st.session_state.uploaded_images = load_gallery_images()
             st.session_state.gallery_page = 0
+            st.session_state.pop("admin_gallery_nav", None)  # Back to the first page to show the upload
             
             st.balloons()
             time.sleep(2)
@@ -9713,7 +13152,7 @@ def render_admin_image_gallery_paginated():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Refresh Gallery", use_container_width=True, key="admin_refresh_gallery"):
-                st.session_state.gallery_page = 0; st.rerun()
+                st.session_state.pop("admin_gallery_nav", None); get_gallery_page_cache().invalidate(); st.rerun()
         with col2:
             if st.button("📊 Gallery Stats", use_container_width=True, key="admin_gallery_stats"):
                 st.session_state.show_gallery_stats = True
@@ -9731,31 +13170,20 @@ def render_admin_image_gallery_paginated():
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
             try:
                 if 'supabase_client' in globals() and supabase_client:
-                    supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    resp = supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    prune_gallery_blobs(resp.data or [])
+                    get_gallery_page_cache().invalidate()
                 st.success(f"✅ Deleted images older than {days_old} days")
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error: {e}")
 
-def render_image_card_paginated(img_data, page_num, index):
+def render_image_card_paginated(img_data, page_num, index, page_download_urls=None):
     """Compact image card optimized for grid display - FIXED WITH NULL CHECKS"""
     try:
         with st.container():
-            # STEP 1: Safely retrieve image bytes
-            image_bytes = None
-            
-            # Try direct bytes first
-            if img_data.get('bytes'):
-                image_bytes = img_data['bytes']
-            # Try base64 decode
-            elif img_data.get('bytes_b64'):
-                try:
-                    image_bytes = base64.b64decode(img_data['bytes_b64'])
-                except Exception as e:
-                    logging.warning(f"Failed to decode bytes_b64: {e}")
-            # Try encoded_data dict
-            elif isinstance(img_data.get('encoded_data'), dict):
-                image_bytes = decode_image_from_storage(img_data['encoded_data'])
+            # STEP 1: Fetch the thumbnail on demand (blob store, or legacy bytes_b64)
+            image_bytes = load_gallery_image_bytes(img_data, "thumbnail")
             
             # If we still don't have image bytes, show placeholder
             if image_bytes is None:
@@ -9813,32 +13241,28 @@ def render_image_card_paginated(img_data, page_num, index):
                             ).eq('id', img_data.get('id')).execute()
                     except Exception as e:
                         logging.error(f"Failed to save like: {e}")
+                    get_gallery_page_cache().invalidate()
                     st.rerun()
             
             with action_col2:
                 if st.button("👁️ View", key=f"view_{unique_key}", use_container_width=True):
+                    load_gallery_image_bytes(img_data)  # Viewer shows the full image
                     st.session_state.current_strategy_indicator_image = img_data
                     st.session_state.strategy_indicator_viewer_mode = True
                     st.rerun()
             
             with action_col3:
-                # STEP 5: Safe download link generation
+                # STEP 5: Safe download link generation (signed per page, data URI only on click)
                 try:
-                    if image_bytes:
-                        # Get format safely
-                        img_format = img_data.get('format', 'png')
-                        if img_format is None:
-                            img_format = 'png'  # Safe default
-                        img_format = str(img_format).lower().replace('jpeg', 'jpg')
-                        
+                    download_url = gallery_card_download_url(
+                        img_data, page_download_urls or {}, f"admin_{img_data.get('id', unique_key)}", "⬇️ Download"
+                    )
+                    if download_url:
                         file_name = img_data.get('name', f'image_{index}')
                         file_name = str(file_name)[:50]  # Limit filename length
                         
-                        b64_img = base64.b64encode(image_bytes).decode()
-                        href = f'<a href="data:image/{img_format};base64,{b64_img}" download="{file_name}"><button style="width:100%; padding:6px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer; font-size:12px; font-weight:bold;">⬇️ Download</button></a>'
+                        href = f'<a href="{download_url}" download="{file_name}" target="_blank"><button style="width:100%; padding:6px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer; font-size:12px; font-weight:bold;">⬇️ Download</button></a>'
                         st.markdown(href, unsafe_allow_html=True)
-                    else:
-                        st.button("⬇️ Download", disabled=True, use_container_width=True)
                 except Exception as e:
                     logging.error(f"Download button error: {e}")
                     st.button("⬇️ Download", disabled=True, use_container_width=True)
@@ -9942,9 +13366,25 @@ def render_image_gallery_paginated():
     st.session_state.gallery_total_count = total_count
     total_pages = (total_count + per_page - 1) // per_page
     
+    # Keyset navigation: the page number is for display, the cursor token selects the rows
+    nav = gallery_nav_state(
+        "admin_gallery_nav", per_page, sort_by,
+        None if filter_author == "All Authors" else filter_author,
+        None if filter_strategy == "All Strategies" else filter_strategy,
+        min_likes
+    )
     # Ensure current page is valid
-    if st.session_state.gallery_page >= total_pages:
-        st.session_state.gallery_page = max(0, total_pages - 1)
+    current_page = min(nav["page"], max(0, total_pages - 1))
+    last_cursor = encode_gallery_cursor(sort_by, "before")
+    
+    # Load page images
+    try:
+        with st.spinner("📥 Loading images..."):
+            page_images, prev_cursor, next_cursor = get_gallery_images_paginated(nav["cursor"], *nav["view"])
+    except Exception as e:
+        st.error(f"❌ Error loading images: {e}")
+        logging.error(f"Page load error: {e}")
+        return
     
     # Statistics
     st.subheader("📊 Gallery Statistics")
@@ -9954,10 +13394,10 @@ def render_image_gallery_paginated():
     with stat_col2:
         st.metric("Total Pages", total_pages)
     with stat_col3:
-        st.metric("Current Page", st.session_state.gallery_page + 1)
+        st.metric("Current Page", current_page + 1)
     with stat_col4:
-        start_num = st.session_state.gallery_page * per_page + 1
-        end_num = min((st.session_state.gallery_page + 1) * per_page, total_count)
+        start_num = current_page * per_page + 1
+        end_num = min(current_page * per_page + len(page_images), total_count)
         st.metric("Showing", f"{start_num}-{end_num}")
     
     st.markdown("---")
@@ -9968,59 +13408,32 @@ def render_image_gallery_paginated():
     
     with nav_col1:
         if st.button("⏮️ First Page", use_container_width=True, key="gallery_first_top"):
-            st.session_state.gallery_page = 0
-            st.rerun()
+            go_gallery_page(nav, None, 0, "back")
     
     with nav_col2:
-        if st.session_state.gallery_page > 0:
+        if prev_cursor:
             if st.button("◀️ Previous", use_container_width=True, key="gallery_prev_top"):
-                st.session_state.gallery_page -= 1
-                st.rerun()
+                go_gallery_page(nav, prev_cursor, current_page - 1, "back")
         else:
             st.button("◀️ Previous", use_container_width=True, disabled=True, key="gallery_prev_top_disabled")
     
     with nav_col3:
-        jump_page = st.number_input(
-            "Go to Page:",
-            min_value=1,
-            max_value=max(1, total_pages),
-            value=st.session_state.gallery_page + 1,
-            key="gallery_jump_page"
-        ) - 1
-        if jump_page != st.session_state.gallery_page:
-            st.session_state.gallery_page = max(0, min(jump_page, total_pages - 1))
-            st.rerun()
+        # Cursor pages have no random access, so there is no "Go to Page" box
+        st.markdown(f"<div style='text-align: center; padding-top: 5px;'><b>Page {current_page + 1}/{total_pages}</b></div>", unsafe_allow_html=True)
     
     with nav_col4:
-        if st.session_state.gallery_page < total_pages - 1:
+        if next_cursor:
             if st.button("Next ▶️", use_container_width=True, key="gallery_next_top"):
-                st.session_state.gallery_page += 1
-                st.rerun()
+                go_gallery_page(nav, next_cursor, current_page + 1, "forward")
         else:
             st.button("Next ▶️", use_container_width=True, disabled=True, key="gallery_next_top_disabled")
     
     with nav_col5:
         if st.button("⭐ Last Page", use_container_width=True, key="gallery_last_top"):
-            st.session_state.gallery_page = total_pages - 1
-            st.rerun()
+            go_gallery_page(nav, last_cursor, total_pages - 1, "back")
     
     st.markdown("---")
     
-    # Load page images
-    try:
-        with st.spinner("📥 Loading images..."):
-            page_images = get_gallery_images_paginated(
-                page=st.session_state.gallery_page,
-                per_page=per_page,
-                sort_by=sort_by,
-                filter_author=None if filter_author == "All Authors" else filter_author,
-                filter_strategy=None if filter_strategy == "All Strategies" else filter_strategy
-            )
-    except Exception as e:
-        st.error(f"❌ Error loading images: {e}")
-        logging.error(f"Page load error: {e}")
-        return
-    
     if not page_images:
         st.warning("⚠️ Failed to load images for this page.")
         st.info("💡 This might be a temporary issue. Try refreshing or adjusting filters.")
@@ -10028,18 +13441,23 @@ def render_image_gallery_paginated():
     
     # Display images in grid
     st.session_state.current_page_images = page_images
-    st.subheader(f"🖼️ Page {st.session_state.gallery_page + 1} Images ({len(page_images)} shown)")
+    prefetch_gallery_page_bytes(page_images, "thumbnail")
+    page_download_urls = gallery_page_download_urls(page_images)
+    st.subheader(f"🖼️ Page {current_page + 1} Images ({len(page_images)} shown)")
     
     cols = st.columns(3)
     for idx, img_data in enumerate(page_images):
         col = cols[idx % 3]
         with col:
             try:
-                render_image_card_paginated(img_data, st.session_state.gallery_page, idx)
+                render_image_card_paginated(img_data, current_page, idx, page_download_urls)
             except Exception as e:
                 st.error(f"❌ Error rendering image {idx}: {str(e)[:50]}")
                 logging.error(f"Image render error: {e}")
     
+    # Warm the neighbouring page(s) so Next/Prev render from cache
+    prefetch_gallery_neighbours(nav, prev_cursor, next_cursor)
+    
     st.markdown("---")
     
     # Bottom navigation
@@ -10048,36 +13466,30 @@ def render_image_gallery_paginated():
     
     with bot_col1:
         if st.button("⏮️ First", use_container_width=True, key="gallery_first_bottom"):
-            st.session_state.gallery_page = 0
-            st.rerun()
+            go_gallery_page(nav, None, 0, "back")
     
     with bot_col2:
-        if st.session_state.gallery_page > 0:
+        if prev_cursor:
             if st.button("◀️ Prev", use_container_width=True, key="gallery_prev_bottom"):
-                st.session_state.gallery_page -= 1
-                st.rerun()
+                go_gallery_page(nav, prev_cursor, current_page - 1, "back")
         else:
             st.button("◀️ Prev", use_container_width=True, disabled=True, key="gallery_prev_bottom_disabled")
     
     with bot_col3:
-        st.write(f"**Page {st.session_state.gallery_page + 1}/{total_pages}**")
+        st.write(f"**Page {current_page + 1}/{total_pages}**")
     
     with bot_col4:
-        if st.session_state.gallery_page < total_pages - 1:
+        if next_cursor:
             if st.button("Next ▶️", use_container_width=True, key="gallery_next_bottom"):
-                st.session_state.gallery_page += 1
-                st.rerun()
+                go_gallery_page(nav, next_cursor, current_page + 1, "forward")
         else:
             st.button("Next ▶️", use_container_width=True, disabled=True, key="gallery_next_bottom_disabled")
     
     with bot_col5:
         if st.button("⭐ Last", use_container_width=True, key="gallery_last_bottom"):
-            st.session_state.gallery_page = total_pages - 1
-            st.rerun()
+            go_gallery_page(nav, last_cursor, total_pages - 1, "back")
     
     st.markdown("---")
-    start_num = st.session_state.gallery_page * per_page + 1
-    end_num = min((st.session_state.gallery_page + 1) * per_page, total_count)
     st.caption(f"✅ Displaying images {start_num}-{end_num} of {total_count} total")
     
 def render_admin_image_gallery_paginated():
@@ -10090,7 +13502,7 @@ def render_admin_image_gallery_paginated():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Refresh Gallery", use_container_width=True, key="admin_refresh_gallery"):
-                st.session_state.gallery_page = 0; st.rerun()
+                st.session_state.pop("admin_gallery_nav", None); get_gallery_page_cache().invalidate(); st.rerun()
         with col2:
             if st.button("📊 Gallery Stats", use_container_width=True, key="admin_gallery_stats"):
                 st.session_state.show_gallery_stats = True
@@ -10108,7 +13520,9 @@ def render_admin_image_gallery_paginated():
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
             try:
                 if 'supabase_client' in globals() and supabase_client:
-                    supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    resp = supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    prune_gallery_blobs(resp.data or [])
+                    get_gallery_page_cache().invalidate()
                 st.success(f"✅ Deleted images older than {days_old} days")
                 st.rerun()
             except Exception as e:
@@ -10124,7 +13538,7 @@ def render_admin_image_gallery_paginated():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("🔄 Refresh Gallery", use_container_width=True, key="admin_refresh_gallery"):
-                st.session_state.gallery_page = 0; st.rerun()
+                st.session_state.pop("admin_gallery_nav", None); get_gallery_page_cache().invalidate(); st.rerun()
         with col2:
             if st.button("📊 Gallery Stats", use_container_width=True, key="admin_gallery_stats"):
                 st.session_state.show_gallery_stats = True
@@ -10142,11 +13556,24 @@ def render_admin_image_gallery_paginated():
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
             try:
                 if 'supabase_client' in globals() and supabase_client:
-                    supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    resp = supabase_client.table('gallery_images').delete().lt('timestamp', cutoff_date).execute()
+                    prune_gallery_blobs(resp.data or [])
+                    get_gallery_page_cache().invalidate()
                 st.success(f"✅ Deleted images older than {days_old} days")
                 st.rerun()
             except Exception as e:
                 st.error(f"❌ Error: {e}")
+        st.markdown("---")
+        st.caption("Move legacy base64 rows to the blob store and generate grid thumbnails/previews.")
+        if st.button("🖼️ Backfill Thumbnails", use_container_width=True, key="admin_backfill_thumbnails"):
+            status = st.empty()
+            with st.spinner("Generating derivatives..."):
+                counts = backfill_gallery_derivatives(
+                    progress=lambda c: status.caption(f"Processed {c['processed']} · failed {c['failed']}")
+                )
+            get_gallery_page_cache().invalidate()
+            st.success(f"✅ Backfilled {counts['processed']} image(s)" +
+                       (f", {counts['failed']} failed (see logs)" if counts['failed'] else ""))
 
 def render_gallery_statistics_paginated():
     st.subheader("📊 Gallery Statistics")
@@ -10529,7 +13956,7 @@ def render_admin_management_dashboard():
     with col5:
         st.metric("Unverified Users", metrics.get("unverified_users", 0))
     with col6:
-        signals_count = len(st.session_state.get('signals_access_tracking', []))
+        signals_count = supabase_get_signals_access_stats().get("total_users", 0)
         st.metric("Signals Access", signals_count)
 
     st.markdown("---")
@@ -10544,7 +13971,10 @@ def render_admin_management_dashboard():
             st.session_state.signals_access_tracking = []
             if supabase_client:
                 try:
-                    supabase_client.table('signals_access_tracking').delete().neq('id', 0).execute()
+                    # Same key as queued tracking saves, so a pending save can't refill the table
+                    get_supabase_write_queue().enqueue(
+                        'signals_access_tracking:*', 'signals_access_tracking', 'replace', []
+                    )
                     st.success("✅ Access tracking reset successfully!")
                     st.info("All tracking data cleared from database")
                 except Exception as e:
@@ -10695,23 +14125,26 @@ def render_admin_overview():
 
     with col1:
         st.subheader("🕒 Recent Registrations")
-        recent_registrations = user_manager.analytics.get("user_registrations", [])[-5:]
+        recent_registrations = supabase_get_analytics_events("registration", limit=5)
         if recent_registrations:
-            for reg in reversed(recent_registrations):
-                plan_name = Config.PLANS.get(reg['plan'], {}).get('name', reg['plan'].title())
-                st.write(f"• {reg['username']} - {plan_name} - {reg['timestamp'][:16]}")
+            for reg in recent_registrations:
+                plan = (reg.get('details') or {}).get('plan', 'unknown')
+                plan_name = Config.PLANS.get(plan, {}).get('name', plan.title())
+                st.write(f"• {reg['username']} - {plan_name} - {reg['created_at'][:16]}")
         else:
             st.info("No recent registrations")
 
     with col2:
         st.subheader("🔄 Recent Plan Changes")
-        recent_plan_changes = user_manager.analytics.get("plan_changes", [])[-5:]
+        recent_plan_changes = supabase_get_analytics_events("plan_change", limit=5)
         if recent_plan_changes:
-            for change in reversed(recent_plan_changes):
-                old_plan = Config.PLANS.get(change['old_plan'], {}).get('name', change['old_plan'].title())
-                new_plan = Config.PLANS.get(change['new_plan'], {}).get('name', change['new_plan'].title())
+            for change in recent_plan_changes:
+                details = change.get('details') or {}
+                old_key, new_key = details.get('old_plan', 'unknown'), details.get('new_plan', 'unknown')
+                old_plan = Config.PLANS.get(old_key, {}).get('name', old_key.title())
+                new_plan = Config.PLANS.get(new_key, {}).get('name', new_key.title())
                 st.write(f"• {change['username']}: {old_plan} → {new_plan}")
-                st.caption(f"{change['timestamp'][:16]}")
+                st.caption(f"{change['created_at'][:16]}")
         else:
             st.info("No recent plan changes")
 
@@ -10722,7 +14155,7 @@ def render_admin_analytics():
     # Login analytics
     st.write("**Login Activity**")
     total_logins = user_manager.analytics.get("total_logins", 0)
-    successful_logins = len([x for x in user_manager.analytics.get("login_history", []) if x.get('success')])
+    successful_logins = user_manager.analytics.get("successful_logins", 0)
     failed_logins = total_logins - successful_logins
 
     col1, col2, col3 = st.columns(3)
@@ -10733,6 +14166,17 @@ def render_admin_analytics():
     with col3:
         st.metric("Failed Logins", failed_logins)
 
+    with st.expander("🔐 Recent Login Attempts"):
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="login_events_page")
+        login_events = supabase_get_analytics_events("login", limit=25, offset=(page - 1) * 25)
+        if login_events:
+            st.dataframe(pd.DataFrame([
+                {"Time": e['created_at'][:19], "Username": e.get('username'), "Success": bool(e.get('success'))}
+                for e in login_events
+            ]), use_container_width=True)
+        else:
+            st.info("No login events on this page")
+
     # Email verification analytics
     st.markdown("---")
     st.subheader("📧 Email Verification Analytics")
@@ -10752,14 +14196,9 @@ def render_admin_analytics():
     st.markdown("---")
     st.subheader("📈 User Growth")
 
-    registrations = user_manager.analytics.get("user_registrations", [])
-    if registrations:
-        # Group by date
-        reg_by_date = {}
-        for reg in registrations:
-            date_str = reg['timestamp'][:10]
-            reg_by_date[date_str] = reg_by_date.get(date_str, 0) + 1
-
+    # Grouped by date in the database
+    reg_by_date = supabase_count_analytics_events_by_day("registration")
+    if reg_by_date:
         # Display as table
         st.write("**Registrations by Date:**")
         reg_df = pd.DataFrame(list(reg_by_date.items()), columns=['Date', 'Registrations'])
@@ -10808,8 +14247,40 @@ def render_admin_user_management():
     # Enhanced User table with quick actions including email verification
     st.write("**All Users - Quick Management:**")
 
+    # Server-side filters + keyset pagination: only one page is fetched and rendered
+    plan_options = ["All Plans"] + list(Config.PLANS.keys()) + ["admin"]
+    fcol1, fcol2, fcol3, fcol4, fcol5 = st.columns(5)
+    with fcol1:
+        plan_filter = st.selectbox("Plan", plan_options, key="um_filter_plan")
+    with fcol2:
+        status_filter = st.selectbox("Status", ["All", "Active", "Inactive"], key="um_filter_status")
+    with fcol3:
+        verified_filter = st.selectbox("Email", ["All", "Verified", "Unverified"], key="um_filter_verified")
+    with fcol4:
+        idle_days = st.number_input("No login for (days)", min_value=0, max_value=3650, value=0,
+                                    help="0 = any", key="um_filter_idle_days")
+    with fcol5:
+        order_by = st.selectbox("Sort by", USER_PAGE_SORT_KEYS, key="um_filter_order")
+
+    filters = {
+        "plan": None if plan_filter == "All Plans" else plan_filter,
+        "is_active": {"All": None, "Active": True, "Inactive": False}[status_filter],
+        "email_verified": {"All": None, "Verified": True, "Unverified": False}[verified_filter],
+        "inactive_before": (datetime.now() - timedelta(days=idle_days)).date().isoformat() if idle_days else None,
+        "order_by": order_by
+    }
+    # Cursors of the pages before the current one; reset whenever the filters change
+    if st.session_state.get("um_filters") != filters:
+        st.session_state.um_filters = filters
+        st.session_state.um_cursor_stack = []
+    cursor_stack = st.session_state.setdefault("um_cursor_stack", [])
+    page_users, next_cursor = user_manager.query_users(
+        after=cursor_stack[-1] if cursor_stack else None, **filters
+    )
+
     # Display users with quick plan change and verification options
-    for username, user_data in user_manager.users.items():
+    for user_data in page_users:
+        username = user_data["username"]
         with st.container():
             col1, col2, col3, col4, col5, col6, col7 = st.columns([2, 2, 2, 2, 1, 1, 1])
 
@@ -10893,6 +14364,18 @@ def render_admin_user_management():
                         st.session_state.show_manage_user_plan = True
                         st.rerun()
 
+    ncol1, ncol2, ncol3 = st.columns([1, 2, 1])
+    with ncol1:
+        if st.button("⬅️ Previous", use_container_width=True, disabled=not cursor_stack, key="um_prev_page"):
+            cursor_stack.pop()
+            st.rerun()
+    with ncol2:
+        st.caption(f"Page {len(cursor_stack) + 1} · {len(page_users)} users shown")
+    with ncol3:
+        if st.button("Next ➡️", use_container_width=True, disabled=next_cursor is None, key="um_next_page"):
+            cursor_stack.append(next_cursor)
+            st.rerun()
+
     # Render the password change interface if activated
     if st.session_state.show_password_change:
         render_admin_password_change()
@@ -10903,13 +14386,15 @@ def render_admin_user_management():
 
 # SIMPLE ADMIN VIEW
 def render_simple_signals_tracking():
-    """Simple: Show who accessed Signals Room - FIXED VERSION"""
+    """Simple: Show who accessed Signals Room - one indexed page at a time"""
     st.subheader("👥 Signals Room Access Tracking")
     
-    # CRITICAL: Load fresh data from Supabase
-    tracking_data = load_signals_access_tracking()
+    # Aggregates come from the database; the table below is a keyset page (most recent first)
+    stats = supabase_get_signals_access_stats()
+    cursor_stack = st.session_state.setdefault("signals_tracking_cursor_stack", [])
+    tracking_data, next_cursor = supabase_get_signals_access_page(after=cursor_stack[-1] if cursor_stack else None)
     
-    if not tracking_data or len(tracking_data) == 0:
+    if not stats.get("total_users") and not tracking_data and not cursor_stack:
         st.info("📊 No one has accessed Signals Room yet. Access will be tracked here.")
         
         # Show how to test
@@ -10923,13 +14408,13 @@ def render_simple_signals_tracking():
         """)
         return
     
-    st.success(f"✅ **Total Users with Access: {len(tracking_data)}**")
+    st.success(f"✅ **Total Users with Access: {stats.get('total_users', 0)}**")
     st.markdown("---")
     
     # Display access data in a table
-    tracking_df = pd.DataFrame(tracking_data)
-    tracking_df['first_access'] = pd.to_datetime(tracking_df['first_access']).dt.strftime('%Y-%m-%d %H:%M')
-    tracking_df['last_access'] = pd.to_datetime(tracking_df['last_access']).dt.strftime('%Y-%m-%d %H:%M')
+    tracking_df = pd.DataFrame(tracking_data, columns=['username', 'first_access', 'last_access', 'access_count'])
+    tracking_df['first_access'] = pd.to_datetime(tracking_df['first_access'], utc=True).dt.strftime('%Y-%m-%d %H:%M')
+    tracking_df['last_access'] = pd.to_datetime(tracking_df['last_access'], utc=True).dt.strftime('%Y-%m-%d %H:%M')
     
     st.dataframe(
         tracking_df[['username', 'first_access', 'last_access', 'access_count']],
@@ -10937,18 +14422,30 @@ def render_simple_signals_tracking():
         hide_index=True
     )
     
+    pcol1, pcol2, pcol3 = st.columns([1, 2, 1])
+    with pcol1:
+        if st.button("⬅️ Previous", use_container_width=True, disabled=not cursor_stack, key="signals_tracking_prev"):
+            cursor_stack.pop()
+            st.rerun()
+    with pcol2:
+        st.caption(f"Page {len(cursor_stack) + 1} · {len(tracking_data)} users shown")
+    with pcol3:
+        if st.button("Next ➡️", use_container_width=True, disabled=next_cursor is None, key="signals_tracking_next"):
+            cursor_stack.append(next_cursor)
+            st.rerun()
+    
     st.markdown("---")
     st.subheader("📊 Access Statistics")
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        total_users = len(tracking_data)
+        total_users = stats.get("total_users", 0)
         st.metric("Total Users", total_users)
     with col2:
-        total_accesses = sum(t.get('access_count', 1) for t in tracking_data)
-        st.metric("Total Accesses", total_accesses)
+        total_accesses = stats.get("total_accesses")
+        st.metric("Total Accesses", total_accesses if total_accesses is not None else "—")
     with col3:
-        if total_users > 0:
+        if total_users > 0 and total_accesses is not None:
             avg_accesses = total_accesses / total_users
             st.metric("Avg per User", f"{avg_accesses:.1f}")
     
@@ -10965,8 +14462,8 @@ def render_simple_signals_tracking():
                 st.write(f"**👤 {track['username']}**")
             
             with col2:
-                first = datetime.fromisoformat(track['first_access']).strftime('%Y-%m-%d %H:%M')
-                last = datetime.fromisoformat(track['last_access']).strftime('%Y-%m-%d %H:%M')
+                first = pd.to_datetime(track['first_access']).strftime('%Y-%m-%d %H:%M')
+                last = pd.to_datetime(track['last_access']).strftime('%Y-%m-%d %H:%M')
                 st.write(f"First: {first}")
                 st.caption(f"Last: {last}")
             
@@ -10976,9 +14473,8 @@ def render_simple_signals_tracking():
             
             with col4:
                 if st.button("🗑️ Remove", key=f"remove_track_{track['username']}", use_container_width=True):
-                    # Remove from tracking
-                    new_tracking = [t for t in tracking_data if t['username'] != track['username']]
-                    save_signals_access_tracking(new_tracking)
+                    # Remove just this user's row
+                    supabase_delete_signals_access(track['username'])
                     st.success(f"✅ Removed {track['username']}")
                     st.rerun()
             
@@ -10994,7 +14490,9 @@ def render_simple_signals_tracking():
     
     with col2:
         if st.button("📥 Export CSV", use_container_width=True, key="export_signals_tracking"):
-            csv_data = tracking_df.to_csv(index=False)
+            # Full export is an explicit action - the page view never loads the whole table
+            export_df = pd.DataFrame(load_signals_access_tracking())
+            csv_data = export_df.to_csv(index=False)
             st.download_button(
                 label="📥 Download CSV",
                 data=csv_data,
@@ -11006,7 +14504,11 @@ def render_simple_signals_tracking():
     with col3:
         if st.button("🗑️ Clear All", use_container_width=True, key="clear_all_tracking"):
             if st.session_state.get('confirm_clear_tracking'):
-                save_signals_access_tracking([])
+                # Explicit admin wipe - the only path that still empties the table
+                get_supabase_write_queue().enqueue(
+                    'signals_access_tracking:*', 'signals_access_tracking', 'replace', []
+                )
+                st.session_state.signals_tracking_cursor_stack = []
                 st.success("✅ All tracking cleared")
                 st.rerun()
             else:
@@ -11072,34 +14574,47 @@ def render_user_credentials_display():
     st.markdown("---")
     st.subheader("🔐 User Credentials Export")
 
-    # Get user credentials for display
-    users_list = user_manager.get_user_credentials_display()
+    # Get one page of user credentials for display (keyset cursors kept in session state)
+    cursor_stack = st.session_state.setdefault("credentials_cursor_stack", [])
+    users_list, next_cursor = user_manager.get_user_credentials_display(after=cursor_stack[-1] if cursor_stack else None)
 
     if users_list:
         # Display as a table
-        st.write("**All User Accounts:**")
+        st.write(f"**User Accounts (page {len(cursor_stack) + 1}):**")
         df = pd.DataFrame(users_list)
         st.dataframe(df, use_container_width=True)
 
-        # Export functionality
+        pcol1, pcol2 = st.columns(2)
+        with pcol1:
+            if st.button("⬅️ Previous Page", use_container_width=True, disabled=not cursor_stack, key="credentials_prev_page"):
+                cursor_stack.pop()
+                st.rerun()
+        with pcol2:
+            if st.button("Next Page ➡️", use_container_width=True, disabled=next_cursor is None, key="credentials_next_page"):
+                cursor_stack.append(next_cursor)
+                st.rerun()
+
+        # Export functionality - the full CSV is only built on request
         col1, col2 = st.columns(2)
         with col1:
-            csv_bytes, error = user_manager.export_user_credentials()
-            if csv_bytes:
-                st.download_button(
-                    label="📄 Export to CSV",
-                    data=csv_bytes,
-                    file_name=f"user_credentials_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    key="export_user_credentials"
-                )
-            else:
-                st.error(f"Error exporting: {error}")
+            if st.button("📄 Prepare CSV Export", use_container_width=True, key="prepare_user_credentials_export"):
+                csv_bytes, error = user_manager.export_user_credentials()
+                if csv_bytes:
+                    st.download_button(
+                        label="📥 Download CSV",
+                        data=csv_bytes,
+                        file_name=f"user_credentials_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                        mime="text/csv",
+                        use_container_width=True,
+                        key="export_user_credentials"
+                    )
+                else:
+                    st.error(f"Error exporting: {error}")
 
         with col2:
             if st.button("❌ Close", use_container_width=True, key="close_user_credentials"):
                 st.session_state.show_user_credentials = False
+                st.session_state.credentials_cursor_stack = []
                 st.rerun()
     else:
         st.info("No user data available")
@@ -11130,13 +14645,13 @@ def render_admin_revenue():
         "Premium": {"users": 0, "revenue": 0}
     }
 
-    for user_data in user_manager.users.values():
-        plan = user_data.get("plan", "trial")
+    # Counts come from the server-side plan aggregate, not a scan of every user
+    for plan, count in user_manager.get_business_metrics()["plan_distribution"].items():
         if plan == "premium":
-            revenue_data["Premium"]["users"] += 1
-            revenue_data["Premium"]["revenue"] += Config.PLANS.get(plan, {}).get("price", 0)
+            revenue_data["Premium"]["users"] += count
+            revenue_data["Premium"]["revenue"] += count * Config.PLANS.get(plan, {}).get("price", 0)
         else:
-            revenue_data["Trial"]["users"] += 1
+            revenue_data["Trial"]["users"] += count
 
     # Display revenue table
     revenue_df = pd.DataFrame([
@@ -11226,191 +14741,6 @@ def main():
 if __name__ == "__main__":
     main()
 
-# =====================================================================
-# EXTREME RELIABILITY SUPABASE PATCH (idempotent, safe to append)
-# - Adds robust retry/backoff around Supabase calls
-# - Handles transient OSError: [Errno 11] Resource temporarily unavailable (EAGAIN)
-# - Suppresses noisy startup errors; returns last-known-good values on failure
-# - Does NOT require GitHub or repo connections
-# =====================================================================
-import errno
-import functools
-
-# Global in-memory "last good" caches (kept per-session)
-_cache = {}
-
-def _is_transient_error(err):
-    """Check if error is transient and worth retrying."""
-    # OSError with errno.EAGAIN (Resource temporarily unavailable)
-    if isinstance(err, OSError) and hasattr(err, 'errno') and err.errno == errno.EAGAIN:
-        return True
-    # Connection errors
-    if isinstance(err, (ConnectionError, TimeoutError)):
-        return True
-    # Generic: some Supabase/postgrest errors bubble up as Exception with message patterns
-    msg = str(err).lower()
-    transient_fragments = ["temporarily unavailable", "timeout", "eagain", "rate limit", "connection reset"]
-    return any(frag in msg for frag in transient_fragments)
-
-def _init_supabase_hardened():
-    if '___supabase_ok___' in st.session_state:
-        return supabase_client  # already initialized by the main code
-    tries = 0
-    while tries < 5:
-        try:
-            # If the original code already created supabase_client successfully, just use it.
-            if supabase_client:
-                st.session_state.___supabase_ok___ = True
-                return supabase_client
-        except Exception as e:
-            # If this fails in weird ways, keep retrying briefly.
-            pass
-        time.sleep(0.25 * (2 ** tries))
-        tries += 1
-    return supabase_client  # may be None; downstream code is guarded
-
-# ===== Re-define critical Supabase functions with retries =====
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_get_analytics():
-    """Get analytics with retry + cache last good value."""
-    client = _init_supabase_hardened()
-    if not client:
-        return _cache_get("lk_supabase_get_analytics", {})
-    resp = client.table('analytics').select('*').execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    data = (resp.data or [])
-    result = data[0] if data else {}
-    _cache_set("lk_supabase_get_analytics", result)
-    return result
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_get_users():
-    """Get users with retry + cache last good value."""
-    client = _init_supabase_hardened()
-    if not client:
-        return _cache_get("lk_supabase_get_users", {})
-    resp = client.table('users').select('*').execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    users = {u['username']: u for u in (resp.data or [])}
-    _cache_set("lk_supabase_get_users", users)
-    return users
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_save_users(users: dict):
-    """Save users with retry. Returns True on success."""
-    client = _init_supabase_hardened()
-    if not client:
-        return False
-    payload = []
-    for username, user_data in users.items():
-        row = dict(user_data)
-        row['username'] = username
-        payload.append(row)
-    resp = client.table('users').upsert(payload).execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    return True
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_delete_user(username: str):
-    """Delete a user with retry."""
-    client = _init_supabase_hardened()
-    if not client:
-        return False
-    resp = client.table('users').delete().eq('username', username).execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    return True
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_get_strategy_analyses():
-    """Get strategy analyses with retry + cache last good value."""
-    client = _init_supabase_hardened()
-    if not client:
-        return _cache_get("lk_supabase_get_strategy_analyses", {})
-    resp = client.table('strategy_analyses').select('*').execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    strategies = {}
-    for item in (resp.data or []):
-        s = item.get('strategy_name')
-        i = item.get('indicator_name')
-        strategies.setdefault(s, {})[i] = {
-            "note": item.get('note', ''),
-            "status": item.get('status', 'Open'),
-            "momentum": item.get('momentum', 'Not Defined'),
-            "strategy_tag": item.get('strategy_tag', 'Neutral'),
-            "analysis_date": item.get('analysis_date', ''),
-            "last_modified": item.get('last_modified', ''),
-            "modified_by": item.get('modified_by', 'system')
-        }
-    _cache_set("lk_supabase_get_strategy_analyses", strategies)
-    return strategies
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_save_strategy_analyses(strategy_data: dict):
-    """Save strategy analyses with retry."""
-    client = _init_supabase_hardened()
-    if not client:
-        return False
-    rows = []
-    for strategy_name, indicators in strategy_data.items():
-        for indicator_name, meta in indicators.items():
-            rows.append({
-                "strategy_name": strategy_name,
-                "indicator_name": indicator_name,
-                "note": meta.get("note", ""),
-                "status": meta.get("status", "Open"),
-                "momentum": meta.get("momentum", "Not Defined"),
-                "strategy_tag": meta.get("strategy_tag", "Neutral"),
-                "analysis_date": meta.get("analysis_date", ""),
-                "last_modified": meta.get("last_modified", ""),
-                "modified_by": meta.get("modified_by", "system"),
-            })
-    if rows:
-        resp = client.table('strategy_analyses').upsert(rows).execute()
-        if hasattr(resp, 'error') and resp.error:
-            raise RuntimeError(resp.error)
-    return True
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_get_gallery_images():
-    """Get gallery images with retry + cache last good value."""
-    client = _init_supabase_hardened()
-    if not client:
-        return _cache_get("lk_supabase_get_gallery_images", [])
-    resp = client.table('gallery_images').select('*').execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    images = []
-    for img in (resp.data or []):
-        if 'bytes_b64' in img:
-            try:
-                img['bytes'] = base64.b64decode(img['bytes_b64'])
-            except Exception:
-                pass
-        images.append(img)
-    _cache_set("lk_supabase_get_gallery_images", images)
-    return images
-
-@retry_with_backoff(max_retries=4, base_delay=0.5)
-def supabase_save_gallery_images(images: list):
-    """Save gallery images with retry."""
-    client = _init_supabase_hardened()
-    if not client:
-        return False
-    resp = client.table('gallery_images').upsert(images).execute()
-    if hasattr(resp, 'error') and resp.error:
-        raise RuntimeError(resp.error)
-    return True
-
-# =====================================================================
-# END OF EXTREME RELIABILITY SUPABASE PATCH
-# =====================================================================
-
 # =====================================================================
 # GALLERY IMAGE PERSISTENCE & SUPABASE RELIABILITY — FIXED (Claude-style)
 # - Robust encode/decode with checksum
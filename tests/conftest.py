@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+
+from benchmark_kai import load_kai_engine  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    """app.py definitions only - no Streamlit UI, Supabase client or main()"""
+    return load_kai_engine(ROOT / "app.py")
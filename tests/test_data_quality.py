@@ -0,0 +1,92 @@
+"""DataQualityFramework.assess_quality (vectorized) vs the original row-by-row scan"""
+import numpy as np
+import pandas as pd
+import pytest
+
+WORDS = ("bullish breakout confirmed strong support resistance bearish decline sell short "
+         "neutral sideways consolidation ranging up down buy long price level the a at nan NaN").split()
+
+
+def reference_assess_quality(df, tier="PRODUCTION", tiers=None):
+    """The pre-vectorization implementation (iterrows + one str.contains pass per class)"""
+    tier_config = tiers.get(tier, {})
+    total_indicators = len(df)
+    indicators_with_notes = len(df[df['Note'].notna() & (df['Note'].str.len() > 0)])
+    completeness = (indicators_with_notes / total_indicators * 100) if total_indicators > 0 else 0
+
+    total_words = 0
+    word_counts = []
+    for _, row in df.iterrows():
+        note = str(row.get('Note', ''))
+        if note and note.lower() != 'nan' and len(note.strip()) > 0:
+            word_count = len(note.split())
+            total_words += word_count
+            word_counts.append(word_count)
+
+    avg_words_per_note = total_words / indicators_with_notes if indicators_with_notes > 0 else 0
+    accuracy = min(100, avg_words_per_note * 8.9)
+    strong_notes = len(df[
+        df['Note'].str.contains('confirmed|strong|major|certain|clear|probability|high confidence', case=False, na=False)
+    ])
+    confidence_boost = (strong_notes / indicators_with_notes * 5) if indicators_with_notes > 0 else 0
+    accuracy = min(100, accuracy + confidence_boost)
+
+    bullish = len(df[df['Note'].str.contains('bullish|up|buy|long|breakout|reversal', case=False, na=False)])
+    bearish = len(df[df['Note'].str.contains('bearish|down|sell|short|decline|resistance', case=False, na=False)])
+    neutral = len(df[df['Note'].str.contains('neutral|consolidat|sideways|ranging|indecis', case=False, na=False)])
+    total_directional = bullish + bearish + neutral
+    consistency = (max(bullish, bearish, neutral) / total_directional) * 100 if total_directional > 0 else 0
+
+    quality_score = (completeness * 0.3 + accuracy * 0.5 + consistency * 0.2)
+    is_acceptable = (completeness >= tier_config.get("completeness_required", 50)
+                     and accuracy >= tier_config.get("accuracy_threshold", 40)
+                     and consistency >= tier_config.get("consistency_threshold", 50))
+    return {
+        "quality_score": quality_score, "completeness": completeness, "accuracy": accuracy,
+        "consistency": consistency, "is_acceptable": is_acceptable, "tier": tier, "tier_config": tier_config,
+        "bullish_signals": bullish, "bearish_signals": bearish, "neutral_signals": neutral,
+        "total_indicators": total_indicators, "indicators_with_data": indicators_with_notes,
+        "total_words": total_words, "average_words_per_note": avg_words_per_note,
+        "word_distribution": word_counts,
+    }
+
+
+def random_notes_frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    notes = []
+    for _ in range(rows):
+        kind = rng.random()
+        if kind < 0.1:
+            notes.append(None)
+        elif kind < 0.15:
+            notes.append("")
+        elif kind < 0.2:
+            notes.append(str(rng.choice(["   ", "nan", "NaN", "\t"])))
+        else:
+            words = rng.choice(WORDS, size=int(rng.integers(1, 30)))
+            note = " ".join(w.upper() if rng.random() < 0.1 else w for w in words)
+            notes.append(note if rng.random() < 0.8 else f"  {note}\n")
+    return pd.DataFrame({"Indicator": [f"ind{i}" for i in range(rows)], "Note": pd.Series(notes, dtype=object)})
+
+
+@pytest.mark.parametrize("rows,seed", [(0, 0), (1, 1), (25, 2), (500, 3), (5000, 4)])
+@pytest.mark.parametrize("tier", ["PRODUCTION", "RESEARCH", "DRAFT"])
+def test_assess_quality_matches_row_scan(app, rows, seed, tier):
+    framework = app.DataQualityFramework
+    df = random_notes_frame(rows, seed)
+    expected = reference_assess_quality(df, tier, framework.QUALITY_TIERS)
+    actual = framework.assess_quality(df, tier)
+
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert actual[key] == pytest.approx(value), key
+        else:
+            assert actual[key] == value, key
+
+
+@pytest.mark.parametrize("missing", [None, np.nan])
+def test_assess_quality_all_missing_notes(app, missing):
+    df = pd.DataFrame({"Indicator": ["a", "b", "c"], "Note": pd.Series([missing] * 3, dtype=object)})
+    expected = reference_assess_quality(df, "PRODUCTION", app.DataQualityFramework.QUALITY_TIERS)
+    assert app.DataQualityFramework.assess_quality(df) == expected
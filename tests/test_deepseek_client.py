@@ -0,0 +1,118 @@
+"""DeepSeekClient against a local stub HTTP server (no network, no API key)"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+
+class StubDeepSeek(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    script = []        # statuses to return before answering 200, consumed in order
+    delay = 0.0
+    connections = set()
+    requests_seen = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests_seen.append(body)
+        type(self).connections.add(self.client_address)
+        if self.delay:
+            time.sleep(self.delay)
+        status = type(self).script.pop(0) if type(self).script else 200
+        if status == 200 and body.get("stream"):
+            return self._stream()
+        payload = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        events = [": keep-alive"] + [
+            "data: " + json.dumps({"choices": [{"delta": {"content": token}}]})
+            for token in ("Hel", "lo", " trader")
+        ] + ["data: " + json.dumps({"choices": [{"delta": {}}]}), "data: [DONE]",
+             "data: " + json.dumps({"choices": [{"delta": {"content": "after done"}}]})]
+        for event in events:
+            self.wfile.write(f"{event}\n\n".encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients that gave up (timeout test) leave broken pipes behind
+
+
+@pytest.fixture
+def stub_server():
+    StubDeepSeek.script, StubDeepSeek.delay = [], 0.0
+    StubDeepSeek.connections, StubDeepSeek.requests_seen = set(), []
+    server = QuietServer(("127.0.0.1", 0), StubDeepSeek)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(app, stub_server):
+    return app.DeepSeekClient(stub_server, "test-key", backoff_base=0.01, backoff_max=0.02)
+
+
+def test_reuses_one_keep_alive_connection(client):
+    for _ in range(3):
+        response = client.post_chat({"messages": []}, timeout=5)
+        assert response.status_code == 200
+        assert response.json()["choices"][0]["message"]["content"] == "ok"
+    assert len(StubDeepSeek.connections) == 1
+    metrics = client.metrics()
+    assert metrics["requests"] == 3
+    assert metrics["status_counts"] == {"200": 3}
+    assert metrics["in_flight"] == 0
+
+
+def test_retries_429_and_5xx_then_succeeds(client):
+    StubDeepSeek.script = [429, 503]
+    response = client.post_chat({"messages": []}, timeout=5)
+    assert response.status_code == 200
+    metrics = client.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["status_counts"] == {"429": 1, "503": 1, "200": 1}
+    assert metrics["errors"] == 2
+
+
+def test_returns_last_response_when_retries_run_out(app, stub_server):
+    client = app.DeepSeekClient(stub_server, "test-key", max_retries=1, backoff_base=0.01, backoff_max=0.02)
+    StubDeepSeek.script = [500, 500, 500]
+    assert client.post_chat({"messages": []}, timeout=5).status_code == 500
+    assert len(StubDeepSeek.requests_seen) == 2
+
+
+def test_timeout_budget_covers_all_attempts(client):
+    StubDeepSeek.delay = 0.5
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        client.post_chat({"messages": []}, timeout=0.2)
+    assert time.monotonic() - started < 0.5
+
+
+def test_stream_chat_yields_sse_deltas(client):
+    chunks = list(client.stream_chat({"messages": []}, timeout=5))
+    assert chunks == ["Hel", "lo", " trader"]
+    assert StubDeepSeek.requests_seen[-1]["stream"] is True
+    assert client.metrics()["time_to_first_token_avg"] > 0
@@ -0,0 +1,101 @@
+"""Gallery image bytes and download links through the blob stores"""
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+
+def png_bytes(size=(1600, 900), color=(200, 40, 40)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def local_store(app, tmp_path, monkeypatch):
+    store, cache = app.LocalBlobStore(str(tmp_path)), app.ImageByteCache()
+    monkeypatch.setattr(app, "get_gallery_blob_store", lambda: store)
+    monkeypatch.setattr(app, "get_gallery_image_cache", lambda: cache)
+    return store
+
+
+def test_local_blob_store_roundtrip(app, tmp_path):
+    store = app.LocalBlobStore(str(tmp_path))
+    store.put("abcdef.png", b"\x89PNG data")
+    assert store.get("abcdef.png") == b"\x89PNG data"
+    assert (tmp_path / "ab" / "abcdef.png").exists()
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert store.get("missing.png") is None
+    store.delete(["abcdef.png", "missing.png"])
+    assert store.get("abcdef.png") is None
+    assert store.url("abcdef.png") is None
+
+
+def test_upload_stores_content_addressed_blob_and_derivatives(app, local_store):
+    data = png_bytes()
+    fields = app.store_gallery_image_bytes(data, "PNG")
+
+    assert fields["content_key"] == app.gallery_blob_key(data, "PNG")
+    assert (fields["file_size"], fields["width"], fields["height"]) == (len(data), 1600, 900)
+    assert local_store.get(fields["content_key"]) == data
+    for variant, (max_width, max_height) in app.GALLERY_IMAGE_VARIANTS.items():
+        derivative = local_store.get(fields[f"{variant}_key"])
+        with Image.open(io.BytesIO(derivative)) as image:
+            assert image.width <= max_width and image.height <= max_height
+    assert app.store_gallery_image_bytes(data, "PNG")["content_key"] == fields["content_key"]
+
+
+def test_load_reads_blob_store_on_cache_miss(app, local_store, monkeypatch):
+    data = png_bytes(size=(64, 64))
+    row = app.store_gallery_image_bytes(data, "PNG")
+    monkeypatch.setattr(app, "get_gallery_image_cache", lambda cache=app.ImageByteCache(): cache)
+
+    assert app.load_gallery_image_bytes(dict(row)) == data
+    thumbnail = app.load_gallery_image_bytes(dict(row), variant="thumbnail")
+    assert thumbnail == local_store.get(row["thumbnail_key"])
+
+
+def test_load_falls_back_to_legacy_base64_rows(app, local_store):
+    data = png_bytes(size=(8, 8))
+    row = {"name": "legacy", "bytes_b64": base64.b64encode(data).decode()}
+    assert app.load_gallery_image_bytes(row) == data
+    assert app.load_gallery_image_bytes({"name": "empty"}) is None
+
+
+class FakeBucket:
+    def __init__(self):
+        self.signed_batches = []
+
+    def create_signed_urls(self, paths, expires_in):
+        self.signed_batches.append(list(paths))
+        return [{"path": p, "signedURL": f"https://cdn.example/{p}?t={expires_in}", "error": None} for p in paths]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.bucket = FakeBucket()
+
+    def from_(self, name):
+        return self.bucket
+
+
+def test_page_download_urls_are_signed_in_one_request(app, monkeypatch):
+    client = type("Client", (), {"storage": FakeStorage()})()
+    store = app.SupabaseStorageBlobStore(client, bucket="gallery", url_seconds=600)
+    monkeypatch.setattr(app, "get_gallery_blob_store", lambda: store)
+    rows = [{"content_key": "a.png"}, {"content_key": "b.png"}, {"bytes_b64": "legacy"}, {"content_key": "a.png"}]
+
+    urls = app.gallery_page_download_urls(rows)
+    assert urls == {"a.png": "https://cdn.example/a.png?t=600", "b.png": "https://cdn.example/b.png?t=600"}
+    assert client.storage.bucket.signed_batches == [["a.png", "b.png"]]
+
+    app.gallery_page_download_urls(rows + [{"content_key": "c.png"}])
+    assert client.storage.bucket.signed_batches[1:] == [["c.png"]]  # Cached URLs are reused
+    assert store.url("b.png") == urls["b.png"]
+
+
+def test_local_store_page_has_no_urls_and_reads_no_bytes(app, local_store, monkeypatch):
+    row = app.store_gallery_image_bytes(png_bytes(size=(8, 8)), "PNG")
+    monkeypatch.setattr(app, "load_gallery_image_bytes", lambda *a, **k: pytest.fail("read image bytes"))
+    assert app.gallery_page_download_urls([row]) == {}
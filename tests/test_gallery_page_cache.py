@@ -0,0 +1,96 @@
+"""GalleryPageCache: LRU/TTL, copies out, generation-guarded puts and waiting on in-flight prefetches"""
+import threading
+import time
+
+import pytest
+
+
+def page(*names):
+    return ([{"image_name": name} for name in names], None, "next")
+
+
+@pytest.fixture
+def make_cache(app):
+    caches = []
+
+    def make(**kwargs):
+        cache = app.GalleryPageCache(**kwargs)
+        caches.append(cache)
+        return cache
+    yield make
+    for cache in caches:
+        cache._executor.shutdown(wait=True)
+
+
+def test_least_recently_used_page_is_evicted(make_cache):
+    cache = make_cache(max_pages=2)
+    cache.put("a", page("a"))
+    cache.put("b", page("b"))
+    assert cache.get("a")           # a is now the most recent
+    cache.put("c", page("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+
+def test_expired_page_is_a_miss(make_cache):
+    cache = make_cache(ttl_seconds=60)
+    cache.put("a", page("a"))
+    stored_at, value = cache._entries["a"]
+    cache._entries["a"] = (stored_at - 61, value)
+    assert cache.get("a") is None
+    assert cache.stats()["pages"] == 0
+
+
+def test_rows_are_handed_out_as_copies(make_cache):
+    cache = make_cache()
+    cache.put("a", page("a"))
+    rows, _, _ = cache.get("a")
+    rows[0]["bytes"] = b"session-only"
+    assert "bytes" not in cache.get("a")[0][0]
+
+
+def test_put_from_before_an_invalidate_is_discarded(make_cache):
+    cache = make_cache()
+    generation = cache._generation
+    cache.invalidate()
+    assert cache.put("a", page("stale"), generation) is False
+    assert cache.get("a") is None
+    assert cache.put("a", page("fresh"), cache._generation)
+
+
+def test_fetch_that_straddles_an_invalidate_is_not_cached(make_cache):
+    cache = make_cache()
+
+    def fetch(*key):
+        cache.invalidate()  # e.g. an upload lands while this page is being read
+        return page("stale")
+
+    assert cache.get_or_fetch(("a",), fetch) == page("stale")
+    assert cache.get(("a",)) is None
+
+
+def test_get_or_fetch_waits_for_the_inflight_prefetch(make_cache):
+    cache = make_cache()
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def slow_fetch(*key):
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return page("prefetched")
+
+    cache.prefetch(("p",), slow_fetch)
+    started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    value = cache.get_or_fetch(("p",), lambda *key: pytest.fail("fetched twice"))
+    assert value == page("prefetched")
+    assert calls == [("p",)]
+    assert cache.stats()["prefetched"] == 1
+
+
+def test_prefetch_skips_cached_pages(make_cache):
+    cache = make_cache()
+    cache.put(("p",), page("cached"))
+    cache.prefetch(("p",), lambda *key: pytest.fail("refetched a cached page"))
+    time.sleep(0.01)
+    assert cache.stats()["inflight"] == 0
@@ -0,0 +1,93 @@
+"""KaiAnalysisCache: content-hash keys, LRU/TTL eviction and the JSON persist round trip"""
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"Indicator": ["RSI", "MACD"], "Note": ["bullish divergence", "breakout"],
+                         "Timestamp": ["2026-01-05", "2026-01-12"]})
+
+
+def key(app, df, **overrides):
+    inputs = dict(quality_tier="PRODUCTION", manual_asset="ETH", manual_price=3000.0, use_deepseek=True)
+    inputs.update(overrides)
+    return app.KaiAnalysisCache.make_key(df, **inputs)
+
+
+def test_key_follows_content_not_identity(app, df):
+    assert key(app, df) == key(app, df.copy())
+    assert key(app, df) == key(app, df.rename(columns={"Note": " Note "}))
+    changed = df.copy()
+    changed.loc[0, "Note"] = "bearish divergence"
+    assert key(app, changed) != key(app, df)
+    assert key(app, df, manual_asset="btc") != key(app, df)
+    assert key(app, df, manual_asset="eth") == key(app, df)
+
+
+def test_key_includes_price_memory(app, df):
+    week_1 = {"closing_price": 2900.0, "week_date": "2026-01-05"}
+    week_2 = {"closing_price": 3100.0, "week_date": "2026-01-12"}
+    assert key(app, df, price_memory=week_1) == key(app, df, price_memory=dict(week_1))
+    assert key(app, df, price_memory=week_1) != key(app, df, price_memory=week_2)
+    assert key(app, df, price_memory=week_1) != key(app, df)
+
+
+def test_least_recently_used_entry_is_evicted(app):
+    cache = app.KaiAnalysisCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entry_is_a_miss(app):
+    cache = app.KaiAnalysisCache(ttl_seconds=60)
+    cache.put("a", {"n": 1})
+    stored_at, analysis = cache._entries["a"]
+    cache._entries["a"] = (stored_at - 61, analysis)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_are_copied_in_and_out(app):
+    cache = app.KaiAnalysisCache()
+    analysis = {"key_findings": ["a"]}
+    cache.put("a", analysis)
+    analysis["key_findings"].append("b")
+    cache.get("a")["key_findings"].append("c")
+    assert cache.get("a") == {"key_findings": ["a"]}
+
+
+def test_persisted_entries_survive_a_restart(app, tmp_path):
+    path = str(tmp_path / "kai_cache.json")
+    cache = app.KaiAnalysisCache(persist_path=path)
+    cache.put("json", {"executive_summary": "ok", "levels": [1.5, 2]})
+    cache.put("not-json", {"frame": object()})
+
+    restarted = app.KaiAnalysisCache(persist_path=path)
+    assert restarted.get("json") == {"executive_summary": "ok", "levels": [1.5, 2]}
+    assert restarted.get("not-json") is None
+
+    restarted.invalidate("json")
+    assert app.KaiAnalysisCache(persist_path=path).stats()["entries"] == 0
+
+
+def test_expired_and_corrupt_files_load_empty(app, tmp_path):
+    path = tmp_path / "kai_cache.json"
+    path.write_text('[["old", 0, {"n": 1}]]', encoding="utf-8")
+    assert app.KaiAnalysisCache(persist_path=str(path)).stats()["entries"] == 0
+    path.write_text("{not json", encoding="utf-8")
+    assert app.KaiAnalysisCache(persist_path=str(path)).stats()["entries"] == 0
+
+
+def test_analysis_reads_price_memory_once_and_keys_on_it(app, df, monkeypatch):
+    agent = app.EnhancedKaiTradingAgent.__new__(app.EnhancedKaiTradingAgent)
+    agent._price_memory = {}
+    reads = []
+    monkeypatch.setattr(agent, "get_previous_weekly_close",
+                        lambda asset: reads.append(asset) or {"closing_price": 2900.0, "week_date": "2026-01-05"})
+    assert agent._recall_price_memory("ETH") == agent._recall_price_memory("ETH")
+    assert reads == ["ETH"]
@@ -0,0 +1,71 @@
+"""KaiKeywordMatcher parity with per-keyword str.contains, and match-table reuse across in-place edits"""
+import pandas as pd
+import pytest
+
+
+NOTES = [
+    "Bullish divergence on the daily, possible reversal next week",
+    "BREAKOUT above resistance with strong volume",
+    "hidden divergence - bearish; overbought",
+    "support holding, accumulation this month",
+    "",
+    None,
+    "nothing to see",
+    "oversold bounce expected in the next few hours",
+]
+
+
+@pytest.fixture
+def matcher(app):
+    return app.KaiKeywordMatcher(app.KAI_KEYWORD_CATEGORIES)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Strategy": ["S1"] * len(NOTES),
+        "Indicator": [f"I{i}" for i in range(len(NOTES))],
+        "Note": pd.Series(NOTES, dtype=object),
+    })
+
+
+def test_table_matches_per_keyword_str_contains(matcher, df):
+    table = matcher.build_match_table(df)
+    lowered = df["Note"].fillna("").astype(str).str.lower()
+    for keyword in matcher.vocabulary:
+        expected = set(df.index[lowered.str.contains(keyword, regex=False) & (lowered != "")])
+        assert {row["index"] for row in table if keyword in row["keywords"]} == expected, keyword
+
+
+def test_scan_matches_substring_semantics(matcher):
+    for note in filter(None, NOTES):
+        text = note.lower()
+        assert matcher.scan(text) == {k for k in matcher.vocabulary if k in text}
+
+
+def test_categories_follow_keywords(app, matcher):
+    for name, words in app.KAI_KEYWORD_CATEGORIES.items():
+        keyword = sorted(words)[0]
+        hit = matcher.categories_hit(matcher.scan(keyword))
+        assert name in hit and matcher.has(matcher.scan(keyword), name)
+
+
+def test_empty_and_missing_notes_are_skipped(matcher, df):
+    table = matcher.build_match_table(df)
+    assert {row["index"] for row in table} == {0, 1, 2, 3, 6, 7}
+    assert matcher.build_match_table(df.drop(columns=["Note"])) == []
+
+
+def test_match_table_is_rebuilt_after_in_place_edit(app, df):
+    agent = app.EnhancedKaiTradingAgent(use_deepseek=False)
+    first = agent._get_match_table(df)
+    assert agent._get_match_table(df) is first
+    assert agent._get_match_table(df.copy()) is first  # Same content, no rescan
+
+    df.loc[6, "Note"] = "strong breakout"
+    rebuilt = agent._get_match_table(df)
+    assert rebuilt is not first
+    assert "breakout" in next(row for row in rebuilt if row["index"] == 6)["keywords"]
+
+    df.loc[7, "Indicator"] = "renamed"
+    assert next(row for row in agent._get_match_table(df) if row["index"] == 7)["indicator"] == "renamed"
@@ -0,0 +1,45 @@
+"""KaiMemoryContextCache: latest-id check and generation-guarded stores"""
+
+
+def test_context_is_reused_until_invalidated(app):
+    memory = app.KaiMemoryContextCache(check_seconds=60)
+    assert memory.get_context() == (None, 0)
+    assert memory.set_context({"analysis_id": 7}, 0)
+    context, generation = memory.get_context()
+    assert context == {"analysis_id": 7}
+    memory.invalidate()
+    assert memory.get_context() == (None, generation + 1)
+
+
+def test_load_that_straddles_an_invalidate_is_not_stored(app):
+    memory = app.KaiMemoryContextCache()
+    _, generation = memory.get_context()
+    memory.invalidate()  # A new analysis was saved while the old one was being read
+    assert memory.set_context({"analysis_id": 7}, generation) is False
+    assert memory.get_context()[0] is None
+
+
+def test_newer_analysis_from_another_process_is_noticed(app):
+    memory = app.KaiMemoryContextCache(check_seconds=0)
+    memory.set_context({"analysis_id": 7}, 0)
+    reads = []
+
+    def latest(row):
+        return lambda: reads.append(row) or row
+
+    assert memory.get_context(latest({"id": 7}))[0] == {"analysis_id": 7}
+    assert memory.get_context(latest({"id": 8}))[0] is None
+    assert memory.get_context(latest(None))[0] is None  # Read failed: reload rather than trust it
+    assert len(reads) == 3
+
+
+def test_latest_id_is_checked_at_most_every_check_seconds(app):
+    memory = app.KaiMemoryContextCache(check_seconds=60)
+    memory.set_context({"analysis_id": None}, 0)
+    calls = []
+    assert memory.get_context(lambda: calls.append(1) or {})[0] == {"analysis_id": None}
+    assert calls == []
+    memory._checked_at -= 61
+    assert memory.get_context(lambda: calls.append(1) or {})[0] == {"analysis_id": None}
+    assert memory.get_context(lambda: calls.append(1) or {})[0] == {"analysis_id": None}
+    assert calls == [1]
@@ -0,0 +1,150 @@
+"""Keyset pagination (users and gallery) over a fake PostgREST table, NULL sort values included"""
+import random
+import re
+
+import pytest
+
+
+def split_top_level(expr):
+    parts, depth, current = [], 0, ""
+    for char in expr:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    return parts + [current]
+
+
+def compile_filter(expr):
+    """The subset of PostgREST logic-tree syntax keyset_seek_filter emits"""
+    if expr.startswith("and("):
+        terms = [compile_filter(part) for part in split_top_level(expr[4:-1])]
+        return lambda row: all(term(row) for term in terms)
+    match = re.fullmatch(r'(\w+)\.(not\.)?is\.null', expr)
+    if match:
+        field, negate = match.group(1), bool(match.group(2))
+        return lambda row: (row.get(field) is None) != negate
+    field, op, value = re.fullmatch(r'(\w+)\.(gt|lt|eq)\."(.*)"', expr).groups()
+
+    def test(row):
+        actual = row.get(field)
+        if actual is None:
+            return False
+        wanted = type(actual)(value)
+        return {"gt": actual > wanted, "lt": actual < wanted, "eq": actual == wanted}[op]
+    return test
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows, self.filters, self.orders, self.count = rows, [], [], None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, field, value):
+        self.filters.append(lambda row: row.get(field) == value)
+        return self
+
+    def gt(self, field, value):
+        self.filters.append(lambda row: row.get(field) is not None and row[field] > value)
+        return self
+
+    def neq(self, field, value):
+        self.filters.append(lambda row: row.get(field) != value)
+        return self
+
+    def gte(self, field, value):
+        self.filters.append(lambda row: row.get(field) is not None and row[field] >= value)
+        return self
+
+    def or_(self, expr):
+        terms = [compile_filter(part) for part in split_top_level(expr)]
+        self.filters.append(lambda row: any(term(row) for term in terms))
+        return self
+
+    def order(self, field, desc=False, nullsfirst=None):
+        # Postgres default: NULLs are "larger" (last ascending, first descending)
+        self.orders.append((field, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        rows = [dict(row) for row in self.rows if all(f(row) for f in self.filters)]
+        for field, desc, nullsfirst in reversed(self.orders):
+            present = sorted((r for r in rows if r.get(field) is not None), key=lambda r: r[field], reverse=desc)
+            missing = [r for r in rows if r.get(field) is None]
+            rows = missing + present if nullsfirst else present + missing
+        return type("Response", (), {"data": rows[:self.count], "error": None})()
+
+
+class FakeClient:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeTable(self.tables[name])
+
+
+@pytest.fixture
+def gallery_rows():
+    rng = random.Random(7)
+    rows = []
+    for i in range(1, 48):
+        stamp = None if i % 6 == 0 else f"2026-01-{rng.randint(1, 28):02d}T00:00:00"
+        rows.append({"id": i, "timestamp": stamp, "likes": rng.randint(0, 4), "name": f"img{i}.png"})
+    return rows
+
+
+def expected_gallery_order(rows, sort_by):
+    field, descending = {"newest": ("timestamp", True), "oldest": ("timestamp", False),
+                         "most_liked": ("likes", True)}[sort_by]
+    dated = sorted((r for r in rows if r[field] is not None), key=lambda r: (r[field], r["id"]), reverse=descending)
+    return [r["id"] for r in dated] + sorted((r["id"] for r in rows if r[field] is None), reverse=descending)
+
+
+@pytest.mark.parametrize("sort_by", ["newest", "oldest", "most_liked"])
+def test_gallery_pages_walk_forward_and_back_through_null_timestamps(app, monkeypatch, gallery_rows, sort_by):
+    monkeypatch.setattr(app, "supabase_client", FakeClient({"gallery_images": gallery_rows}))
+    expected = expected_gallery_order(gallery_rows, sort_by)
+
+    forward, cursor = [], None
+    while True:
+        rows, prev_cursor, next_cursor = app.fetch_gallery_page(cursor, 10, sort_by)
+        forward += [r["id"] for r in rows]
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    assert forward == expected
+
+    backward, cursor = [], app.encode_gallery_cursor(sort_by, "before")
+    while cursor:
+        rows, cursor, _ = app.fetch_gallery_page(cursor, 10, sort_by)
+        backward = [r["id"] for r in rows] + backward
+    assert backward == expected
+
+
+def test_users_created_cursor_handles_missing_created(app, monkeypatch):
+    users = [{"username": f"user{i:02d}", "created": None if i % 4 == 0 else f"2026-03-{i % 9 + 1:02d}"}
+             for i in range(30)]
+    monkeypatch.setattr(app, "supabase_client", FakeClient({"users": users}))
+
+    class NoPending:
+        def pending(self, table):
+            return []
+    monkeypatch.setattr(app, "get_supabase_write_queue", lambda: NoPending())
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = app.supabase_query_users(order_by="created", after=cursor, limit=7)
+        seen += [r["username"] for r in rows]
+        if cursor is None:
+            break
+    dated = sorted((u for u in users if u["created"]), key=lambda u: (u["created"], u["username"]))
+    assert seen == [u["username"] for u in dated] + sorted(u["username"] for u in users if not u["created"])
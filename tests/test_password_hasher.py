@@ -0,0 +1,92 @@
+"""PasswordHasher admission control: per-user quota, saturation shedding, background rehash"""
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def make_hasher(app):
+    hashers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("rounds", 4)
+        hasher = app.PasswordHasher(**kwargs)
+        hashers.append(hasher)
+        return hasher
+    yield make
+    for hasher in hashers:
+        hasher._executor.shutdown(wait=True)
+
+
+def blocked_jobs(hasher, count, username=None):
+    """Submit count jobs that hold their pool slot until the returned event is set"""
+    release = threading.Event()
+    futures = [hasher.submit(release.wait, 5, username=username) for _ in range(count)]
+    return release, futures
+
+
+def test_hash_and_verify_round_trip(make_hasher):
+    hasher = make_hasher()
+    hashed = hasher.hash("s3cret!", username="alice")
+    assert hasher.verify("s3cret!", hashed, username="alice")
+    assert not hasher.verify("wrong", hashed, username="alice")
+    assert not hasher.verify("s3cret!", "not-a-bcrypt-hash")
+    stats = hasher.stats()
+    assert (stats["hashed"], stats["verified"], stats["users_in_flight"]) == (1, 3, 0)
+
+
+def test_needs_rehash_for_legacy_and_low_cost_hashes(app, make_hasher):
+    weak = make_hasher(rounds=4).hash("pw")
+    assert make_hasher(rounds=5).needs_rehash(weak)
+    assert not make_hasher(rounds=4).needs_rehash(weak)
+    assert make_hasher().needs_rehash("5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8")
+    assert make_hasher().needs_rehash(None)
+
+
+def test_one_username_cannot_hold_more_than_its_quota(app, make_hasher):
+    hasher = make_hasher(per_user_inflight=2)
+    release, futures = blocked_jobs(hasher, 2, username="mallory")
+    with pytest.raises(app.PasswordHasherBusy):
+        hasher.hash("guess", username="mallory")
+    assert hasher.hash("pw", username="alice")  # Other users are unaffected
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert hasher.stats()["rejected_user"] == 1
+    assert hasher.hash("guess", username="mallory")  # Quota freed once the jobs finished
+
+
+def test_saturated_pool_sheds_instead_of_queueing(app, make_hasher):
+    hasher = make_hasher(max_workers=1, wait_seconds=0.05)
+    slots = app.PASSWORD_HASH_QUEUE_PER_WORKER
+    release, futures = blocked_jobs(hasher, slots)
+    with pytest.raises(app.PasswordHasherBusy):
+        hasher.hash("pw", username="alice")
+    stats = hasher.stats()
+    assert stats["rejected_busy"] == 1
+    assert stats["users_in_flight"] == 0  # The shed request released its per-user count
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert hasher.hash("pw", username="alice")
+
+
+def test_background_rehash_hands_over_the_new_hash(make_hasher):
+    hasher = make_hasher(rounds=5)
+    stored = []
+    future = hasher.rehash_in_background("pw", stored.append, username="alice")
+    new_hash = future.result(timeout=5)
+    assert stored == [new_hash]
+    assert hasher.verify("pw", new_hash)
+    assert not hasher.needs_rehash(new_hash)
+    assert hasher.stats()["upgrades"] == 1
+
+
+def test_background_rehash_is_skipped_when_busy(make_hasher):
+    hasher = make_hasher(per_user_inflight=1)
+    release, futures = blocked_jobs(hasher, 1, username="alice")
+    stored = []
+    assert hasher.rehash_in_background("pw", stored.append, username="alice") is None
+    release.set()
+    futures[0].result(timeout=5)
+    assert stored == [] and hasher.stats()["upgrades"] == 0
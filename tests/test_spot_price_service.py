@@ -0,0 +1,104 @@
+"""SpotPriceService against FakeSpotFeed: coalescing, stale-while-revalidate and the background refresher"""
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def make_service(app):
+    services = []
+
+    def make(prices, delay=0.0, **kwargs):
+        kwargs.setdefault("refresh_interval", 0)  # No refresher unless a test starts one
+        service = app.SpotPriceService(app.FakeSpotFeed(prices, delay=delay), **kwargs)
+        services.append(service)
+        return service
+    yield make
+    for service in services:
+        service.stop()
+
+
+def age(service, symbol, seconds):
+    """Pretend symbol's cached price was fetched `seconds` ago"""
+    fetched_at, price = service._prices[symbol]
+    service._prices[symbol] = (fetched_at - seconds, price)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_fresh_price_is_served_from_memory(make_service):
+    service = make_service({"btc": 100})
+    assert service.get_price("btc") == 100.0
+    assert service.get_price("BTC") == 100.0
+    assert service.feed.calls == [["BTC"]]
+    assert service.stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_feed_call(make_service):
+    service = make_service({"ETH": 2000}, delay=0.1)
+    results, barrier = [], threading.Barrier(8)
+
+    def ask():
+        barrier.wait()
+        results.append(service.get_price("ETH"))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == [2000.0] * 8
+    assert service.feed.calls == [["ETH"]]
+    assert service.stats()["coalesced"] == 7
+
+
+def test_stale_price_is_served_while_one_refresh_runs(make_service):
+    service = make_service({"BTC": 100}, delay=0.3, ttl_seconds=30, stale_max_seconds=600)
+    service.get_price("BTC")
+    age(service, "BTC", 60)
+    service.feed.set_price("BTC", 101)
+
+    started = time.perf_counter()
+    assert service.get_price("BTC") == 100.0
+    assert service.get_price("BTC") == 100.0
+    assert time.perf_counter() - started < 0.2  # Neither caller waited for the feed
+    assert wait_until(lambda: service.get_price("BTC") == 101.0)
+    assert len(service.feed.calls) == 2  # One revalidation despite several stale reads
+    assert service.stats()["stale_hits"] >= 2
+
+
+def test_price_older_than_stale_max_is_refetched_synchronously(make_service):
+    service = make_service({"BTC": 100}, ttl_seconds=30, stale_max_seconds=600)
+    service.get_price("BTC")
+    age(service, "BTC", 601)
+    service.feed.set_price("BTC", 105)
+    assert service.get_price("BTC") == 105.0
+    assert service.stats()["stale_hits"] == 0
+
+
+def test_feed_failure_is_negatively_cached(make_service):
+    service = make_service({}, ttl_seconds=30)
+    assert service.get_price("DOGE") is None
+    assert service.get_price("DOGE") is None
+    assert service.feed.calls == [["DOGE"]]
+    assert service.stats()["feed_errors"] == 1
+
+
+def test_refresher_updates_watched_symbols_until_idle(make_service):
+    service = make_service({"BTC": 100, "ETH": 2000}, refresh_interval=0.02, watch_idle_seconds=0.15)
+    service.get_prices(["BTC", "ETH"])
+    service.feed.set_price("BTC", 110)
+    service.start()
+    assert wait_until(lambda: service._prices["BTC"][1] == 110.0)
+    assert any(sorted(batch) == ["BTC", "ETH"] for batch in service.feed.calls[1:])  # One batch per tick
+
+    assert wait_until(lambda: service.stats()["watched"] == 0)  # Nobody asked again
+    calls = len(service.feed.calls)
+    time.sleep(0.1)
+    assert len(service.feed.calls) == calls
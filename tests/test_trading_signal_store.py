@@ -0,0 +1,135 @@
+"""TradingSignalStore: optimistic versioning, rollback on failed writes, save_changed diffing"""
+import copy
+
+import pytest
+
+
+class FakeSignalsDB:
+    """The trading_signals table plus the write helpers the store calls, with a switch per failure mode"""
+
+    def __init__(self, rows=()):
+        self.rows = {row["signal_id"]: dict(row) for row in rows}
+        self.saved, self.queued_updates, self.deleted = [], [], []
+        self.pending_order_keys = set()
+        self.fail_saves = False
+        self.update_fails = False
+
+    def get_all(self):
+        return copy.deepcopy(list(self.rows.values()))
+
+    def save(self, signals):
+        if self.fail_saves:
+            return False
+        self.saved.extend(s["signal_id"] for s in signals)
+        self.rows.update({s["signal_id"]: dict(s) for s in signals})
+        return True
+
+    def update_queued(self, signal, expected_version):
+        self.queued_updates.append((signal["signal_id"], expected_version))
+        return not self.update_fails
+
+    def update_now(self, signal, expected_version):
+        if self.update_fails:
+            return None
+        row = self.rows.get(signal["signal_id"])
+        if row is None or row.get("version", 1) != expected_version:
+            return False
+        self.rows[signal["signal_id"]] = dict(signal)
+        return True
+
+    def delete(self, signal_id):
+        self.deleted.append(signal_id)
+        self.rows.pop(signal_id, None)
+        return True
+
+    def has_pending(self, order_key):
+        return order_key in self.pending_order_keys
+
+
+@pytest.fixture
+def db(app, monkeypatch):
+    db = FakeSignalsDB([
+        {"signal_id": "s1", "asset": "BTC", "status": "pending", "version": 1, "created_at": "2026-01-01"},
+        {"signal_id": "s2", "asset": "ETH", "status": "published", "version": 3, "created_at": "2026-01-02"},
+    ])
+    monkeypatch.setattr(app, "supabase_get_trading_signals", db.get_all)
+    monkeypatch.setattr(app, "supabase_save_trading_signals", db.save)
+    monkeypatch.setattr(app, "supabase_update_trading_signal", db.update_queued)
+    monkeypatch.setattr(app, "supabase_update_trading_signal_now", db.update_now)
+    monkeypatch.setattr(app, "supabase_delete_trading_signal", db.delete)
+    monkeypatch.setattr(app, "get_supabase_write_queue", lambda: db)
+    return db
+
+
+@pytest.fixture
+def store(app, db):
+    return app.TradingSignalStore(refresh_seconds=3600).refresh()
+
+
+def test_indexes_filter_by_status_and_asset(store):
+    assert [s["signal_id"] for s in store.list()] == ["s1", "s2"]
+    assert [s["signal_id"] for s in store.list(status="published")] == ["s2"]
+    assert store.list(status="pending", asset="ETH") == []
+    assert store.count("pending") == 1
+
+
+def test_update_bumps_version_and_moves_status_index(store, db):
+    ok, signal = store.update("s1", {"status": "published"}, expected_version=1)
+    assert ok and signal["version"] == 2
+    assert db.rows["s1"]["status"] == "published"
+    assert store.count("pending") == 0 and store.count("published") == 2
+
+
+def test_stale_expected_version_is_a_conflict(store, db):
+    ok, message = store.update("s2", {"status": "closed"}, expected_version=2)
+    assert not ok and "another admin" in message
+    assert db.rows["s2"]["status"] == "published"
+
+
+def test_conflict_in_database_reloads_what_other_admin_wrote(store, db):
+    db.rows["s1"] = dict(db.rows["s1"], status="rejected", version=2)  # Another process
+    ok, message = store.update("s1", {"status": "published"}, expected_version=1)
+    assert not ok and "another admin" in message
+    assert store.get("s1")["status"] == "rejected"
+
+
+def test_failed_update_restores_previous_signal(store, db):
+    db.update_fails = True
+    ok, _ = store.update("s1", {"status": "published"}, expected_version=1)
+    assert not ok
+    signal = store.get("s1")
+    assert (signal["status"], signal["version"]) == ("pending", 1)
+    assert store.count("published") == 1
+
+
+def test_restore_keeps_a_newer_version(app, store):
+    previous = store.get("s1")
+    store._index(dict(previous, version=3, status="closed"))  # Replaced meanwhile
+    store._restore("s1", dict(previous, version=2), previous)
+    assert store.get("s1")["version"] == 3
+
+
+def test_update_queues_behind_a_pending_create(app, store, db):
+    ok, created = store.create({"signal_id": "s3", "asset": "SOL", "status": "pending"})
+    assert ok and created["version"] == 1
+    db.pending_order_keys.add(app._trading_signal_order_key("s3"))
+    ok, updated = store.update("s3", {"status": "published"}, expected_version=1)
+    assert ok and updated["version"] == 2
+    assert db.queued_updates == [("s3", 1)]
+
+
+def test_failed_create_is_rolled_back(store, db):
+    db.fail_saves = True
+    ok, _ = store.create({"signal_id": "s3", "asset": "SOL", "status": "pending"})
+    assert not ok and store.get("s3") is None
+
+
+def test_save_changed_writes_only_differences(store, db):
+    signals = store.list()
+    signals[0]["status"] = "published"              # s1 changed
+    signals.append({"signal_id": "s4", "asset": "XRP", "status": "pending"})
+    signals = [s for s in signals if s["signal_id"] != "s2"]  # s2 removed
+    assert store.save_changed(signals)
+    assert sorted(db.saved) == ["s1", "s4"]
+    assert db.deleted == ["s2"]
+    assert store.get("s1")["version"] == 2 and store.get("s4")["version"] == 1
@@ -0,0 +1,98 @@
+"""UserDirectory: full load, watermark-driven incremental sync, email index and reconcile"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class FakeUsersTable:
+    """Stands in for the supabase_get_users* helpers, recording every 'since' it is asked for"""
+
+    def __init__(self, rows, stamps):
+        self.rows, self.stamps, self.since_calls = rows, stamps, []
+        self.fail_full_load = False
+
+    def get_users(self, with_server_stamps=False):
+        if self.fail_full_load:
+            return None
+        return {u: dict(r) for u, r in self.rows.items()}, [self.stamps[u] for u in self.rows]
+
+    def changed_since(self, since):
+        self.since_calls.append(datetime.fromisoformat(since))
+        changed = [u for u in self.rows if self.stamps[u] >= since]
+        return [dict(self.rows[u], username=u) for u in changed], [self.stamps[u] for u in changed]
+
+    def usernames(self):
+        return set(self.rows)
+
+
+T0 = datetime(2026, 1, 1, 12, 0, 0).astimezone()
+
+
+def stamp(seconds):
+    return (T0 + timedelta(seconds=seconds)).isoformat()
+
+
+@pytest.fixture
+def table(app, monkeypatch):
+    table = FakeUsersTable(
+        {"alice": {"email": "Alice@Example.com"}, "bob": {"email": "bob@example.com"}},
+        {"alice": stamp(0), "bob": stamp(10)})
+    monkeypatch.setattr(app, "supabase_get_users", table.get_users)
+    monkeypatch.setattr(app, "supabase_get_users_changed_since", table.changed_since)
+    monkeypatch.setattr(app, "supabase_get_usernames", table.usernames)
+    return table
+
+
+def test_load_sets_watermark_from_server_stamps(app, table):
+    directory = app.UserDirectory().load()
+    assert set(directory) == {"alice", "bob"}
+    assert directory.watermark == T0 + timedelta(seconds=10)
+    assert directory.loaded and not directory.load_failed
+
+
+def test_sync_reads_behind_the_watermark_and_advances_it(app, table):
+    directory = app.UserDirectory(sync_seconds=0, overlap_seconds=30).load()
+    table.rows["carol"] = {"email": "carol@example.com"}
+    table.stamps["carol"] = stamp(20)
+    directory.sync(force=True)
+    assert table.since_calls == [T0 + timedelta(seconds=10 - 30)]
+    assert "carol" in directory
+    assert directory.watermark == T0 + timedelta(seconds=20)
+    assert directory.stats()["incremental_syncs"] == 1
+
+
+def test_sync_is_rate_limited(app, table):
+    directory = app.UserDirectory(sync_seconds=3600).load()
+    directory.sync()
+    assert table.since_calls == []
+
+
+def test_failed_full_load_keeps_cached_rows(app, table):
+    directory = app.UserDirectory().load()
+    table.fail_full_load = True
+    directory.load()
+    assert directory.load_failed
+    assert set(directory) == {"alice", "bob"}
+
+
+def test_email_index_follows_inserts_changes_and_removals(app, table):
+    directory = app.UserDirectory().load()
+    assert directory.username_for_email("  alice@EXAMPLE.com ") == "alice"
+    directory["alice"]["email"] = "alice@new.example"
+    directory.reindex_email("alice")
+    assert not directory.email_exists("alice@example.com")
+    assert directory.username_for_email("alice@new.example") == "alice"
+    directory["bob"] = {"email": "robert@example.com"}
+    assert not directory.email_exists("bob@example.com")
+    directory.pop("bob")
+    assert not directory.email_exists("robert@example.com")
+    assert directory.stats()["emails_indexed"] == 1
+
+
+def test_reconcile_drops_users_deleted_elsewhere(app, table):
+    directory = app.UserDirectory(sync_seconds=0, reconcile_seconds=3600).load()
+    del table.rows["bob"]
+    directory.sync(force=True)  # Forced syncs reconcile straight away
+    assert set(directory) == {"alice"}
+    assert not directory.email_exists("bob@example.com")
+    assert directory.stats()["reconciles"] == 1
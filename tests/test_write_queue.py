@@ -0,0 +1,198 @@
+"""SupabaseWriteQueue against a recording fake client that enforces Postgres' upsert rules"""
+import json
+import os
+import stat
+import time
+
+import pytest
+
+
+class Rejected(Exception):
+    pass
+
+
+class FakeQuery:
+    def __init__(self, client, table, op, rows=None, on_conflict=None):
+        self.client, self.table, self.op, self.rows, self.on_conflict, self.match = \
+            client, table, op, rows, on_conflict, {}
+
+    def eq(self, column, value):
+        self.match[column] = value
+        return self
+
+    def neq(self, column, value):
+        return self
+
+    def execute(self):
+        request = {"table": self.table, "op": self.op, "rows": self.rows, "match": self.match}
+        self.client.requests.append(request)
+        if self.client.fail(request):
+            raise Rejected(f"{self.op} on {self.table} failed")
+        if self.op == "upsert":
+            conflict = self.on_conflict.split(",") if self.on_conflict else ["id"]
+            keys = [tuple(row.get(c) for c in conflict) for row in self.rows if all(c in row for c in conflict)]
+            if len(set(keys)) != len(keys):
+                raise Rejected("ON CONFLICT DO UPDATE command cannot affect row a second time")
+            if len({frozenset(row) for row in self.rows}) > 1:
+                raise Rejected("rows with different columns would default missing ones to NULL")
+        return type("Response", (), {"data": self.rows or [{}], "error": None})()
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client, self.name = client, name
+
+    def upsert(self, rows, on_conflict=None):
+        return FakeQuery(self.client, self.name, "upsert", rows, on_conflict)
+
+    def update(self, row):
+        return FakeQuery(self.client, self.name, "update", [row])
+
+    def delete(self):
+        return FakeQuery(self.client, self.name, "delete")
+
+    def insert(self, rows):
+        return FakeQuery(self.client, self.name, "insert", rows)
+
+
+class FakeClient:
+    def __init__(self, fail=lambda request: False):
+        self.requests, self.fail = [], fail
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+    def rpc(self, name, params):
+        return FakeQuery(self, name, "rpc", [params])
+
+
+@pytest.fixture
+def make_queue(app):
+    queues = []
+
+    def make(**kwargs):
+        # No client while writes are queued, so the worker can't flush half a scenario
+        kwargs.setdefault("flush_interval", 3600)
+        kwargs.setdefault("backoff_base", 0.001)
+        kwargs.setdefault("backoff_max", 0.002)
+        queue = app.SupabaseWriteQueue(None, **kwargs)
+        queues.append(queue)
+        return queue
+    yield make
+    for queue in queues:
+        queue.client = None
+
+
+def drain(queue, client, rounds=50):
+    queue.client = client
+    for _ in range(rounds):
+        queue._flush_once()
+        if not queue.stats()["pending"]:
+            return
+        time.sleep(0.005)
+
+
+def test_newer_write_for_a_key_replaces_the_queued_one(make_queue):
+    queue = make_queue()
+    queue.enqueue("users:alice", "users", "upsert", [{"username": "alice", "plan": "trial"}])
+    queue.enqueue("users:alice", "users", "upsert", [{"username": "alice", "plan": "pro"}])
+    client = FakeClient()
+    drain(queue, client)
+    assert [r["rows"] for r in client.requests] == [[{"username": "alice", "plan": "pro"}]]
+    assert queue.stats()["coalesced"] == 1
+
+
+def test_same_row_under_two_keys_is_never_sent_in_one_upsert(make_queue):
+    queue = make_queue()
+    queue.enqueue("analytics:1:counters", "analytics", "upsert", [{"id": 1, "successful_logins": 5}])
+    queue.enqueue("analytics:1", "analytics", "upsert", [{"id": 1, "revenue_today": 0}])
+    client = FakeClient()
+    drain(queue, client)
+    assert [r["rows"] for r in client.requests] == [
+        [{"id": 1, "successful_logins": 5}], [{"id": 1, "revenue_today": 0}]]
+    assert queue.stats()["dropped"] == 0
+
+
+def test_upserts_merge_only_with_identical_columns(make_queue):
+    queue = make_queue()
+    queue.enqueue("users:a", "users", "upsert", [{"username": "a", "plan": "trial"}])
+    queue.enqueue("users:b", "users", "upsert", [{"username": "b", "plan": "pro"}])
+    queue.enqueue("users:c", "users", "upsert", [{"username": "c", "plan": "pro", "email": "c@x.io"}])
+    queue.enqueue("users:d", "users", "upsert", [{"username": "d", "plan": "pro"}])
+    client = FakeClient()
+    drain(queue, client)
+    assert [[row["username"] for row in r["rows"]] for r in client.requests] == [["a", "b", "d"], ["c"]]
+    assert queue.stats()["failures"] == 0
+
+
+def test_merging_keeps_per_row_order(make_queue):
+    queue = make_queue()
+    queue.enqueue("k1", "t", "upsert", [{"id": 1, "a": 1}], on_conflict="id")
+    queue.enqueue("k2", "t", "upsert", [{"id": 2, "b": 1}], on_conflict="id")
+    queue.enqueue("k3", "t", "upsert", [{"id": 2, "a": 2}], on_conflict="id")
+    client = FakeClient()
+    drain(queue, client)
+    assert [r["rows"] for r in client.requests] == [
+        [{"id": 1, "a": 1}], [{"id": 2, "b": 1}], [{"id": 2, "a": 2}]]
+
+
+def test_order_key_holds_later_writes_behind_a_failing_one(make_queue):
+    queue = make_queue()
+    failures = {"left": 2}
+
+    def fail(request):
+        if request["op"] == "upsert" and failures["left"]:
+            failures["left"] -= 1
+            return True
+        return False
+
+    queue.enqueue("sig:v1", "trading_signals", "upsert", [{"signal_id": "s1", "version": 1}],
+                  on_conflict="signal_id", order_key="sig")
+    queue.enqueue("sig:v2", "trading_signals", "update", [{"signal_id": "s1", "version": 2}],
+                  match={"signal_id": "s1", "version": 1}, order_key="sig")
+    queue.enqueue("other", "trading_signals", "delete", match={"signal_id": "s9"})
+    client = FakeClient(fail)
+    drain(queue, client)
+    ops = [(r["op"], (r["rows"] or [{}])[0].get("version")) for r in client.requests]
+    assert ops.index(("update", 2)) > max(i for i, op in enumerate(ops) if op == ("upsert", 1))
+    assert ops.count(("update", 2)) == 1  # Never sent while the create was failing
+    assert queue.stats()["pending"] == 0
+
+
+def test_writes_are_dropped_after_max_retries_and_surfaced(make_queue):
+    dropped = []
+    queue = make_queue(max_retries=2, on_drop=dropped.append)
+    queue.enqueue("users:a", "users", "upsert", [{"username": "a"}])
+    client = FakeClient(fail=lambda request: True)
+    drain(queue, client)
+    assert len(client.requests) == 3
+    assert queue.stats()["dropped"] == 1
+    assert [w["key"] for w in dropped] == [w["key"] for w in queue.dropped_writes()] == ["users:a"]
+    assert dropped[0]["rows"] == [{"username": "a"}]
+
+
+def test_overlay_pending_applies_queued_writes(make_queue):
+    queue = make_queue()
+    rows = [{"username": "a", "plan": "trial"}, {"username": "b", "plan": "trial"}, {"username": "c", "plan": "trial"}]
+    queue.enqueue("users:a", "users", "upsert", [{"username": "a", "plan": "pro"}])
+    queue.enqueue("users:b", "users", "delete", match={"username": "b"})
+    queue.enqueue("users:c", "users", "update", [{"plan": "admin"}], match={"username": "c"})
+    queue.enqueue("users:d", "users", "upsert", [{"username": "d", "plan": "trial"}])
+    merged = {row["username"]: row["plan"] for row in queue.overlay_pending("users", rows, "username")}
+    assert merged == {"a": "pro", "c": "admin", "d": "trial"}
+    assert rows[0]["plan"] == "trial"
+
+
+def test_journal_is_private_skips_users_and_replays(app, make_queue, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    queue = make_queue(journal_path=path)
+    queue.enqueue("users:a", "users", "upsert", [{"username": "a", "password_hash": "secret"}])
+    queue.enqueue("settings:x", "app_settings", "upsert", [{"setting_name": "x", "setting_value": "1"}])
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    journaled = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [w["key"] for w in journaled] == ["settings:x"]
+    assert "secret" not in open(path, encoding="utf-8").read()
+
+    replayed = make_queue(journal_path=path)
+    assert [w["key"] for w in replayed.pending("app_settings")] == ["settings:x"]
+    assert replayed.pending("users") == []
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Batch backfill for the gallery image pipeline.
+
+Moves legacy gallery_images rows that still carry base64 bytes (bytes_b64)
+into the blob store, and generates the thumbnail/preview derivatives for
+every row that has none. Safe to re-run: only rows without a thumbnail_key
+are touched. Runs app.py's definitions without the Streamlit UI.
+
+    SUPABASE_URL=... SUPABASE_KEY=... python tools/backfill_gallery_derivatives.py
+    python tools/backfill_gallery_derivatives.py --backend local --root .gallery_blobs --limit 100
+"""
+import argparse, json, os, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from benchmark_kai import load_kai_engine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["supabase", "local"], default="supabase", help="Blob store backend")
+    parser.add_argument("--bucket", default=None, help="Storage bucket (default: GALLERY_BLOB_BUCKET)")
+    parser.add_argument("--root", default=None, help="Local blob root (default: GALLERY_BLOB_LOCAL_ROOT)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per query (default: GALLERY_BACKFILL_BATCH_SIZE)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows")
+    args = parser.parse_args()
+
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if not url or not key:
+        parser.error("SUPABASE_URL and SUPABASE_KEY must be set")
+
+    from supabase import create_client
+
+    engine = load_kai_engine()
+    engine.supabase_client = create_client(url, key)
+    if args.backend == "local":
+        store = engine.LocalBlobStore(args.root or engine.GALLERY_BLOB_LOCAL_ROOT)
+    else:
+        store = engine.SupabaseStorageBlobStore(engine.supabase_client, args.bucket or engine.GALLERY_BLOB_BUCKET)
+    cache = engine.ImageByteCache()
+    engine.get_gallery_blob_store = lambda: store
+    engine.get_gallery_image_cache = lambda: cache
+
+    counts = engine.backfill_gallery_derivatives(
+        batch_size=args.batch_size or engine.GALLERY_BACKFILL_BATCH_SIZE,
+        limit=args.limit,
+        progress=lambda c: print(f"\rprocessed {c['processed']} failed {c['failed']}", end="", file=sys.stderr),
+    )
+    print(file=sys.stderr)
+    print(json.dumps(counts))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
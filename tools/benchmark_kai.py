@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the KAI analysis engine.
+
+Generates realistic strategy CSVs (real STRATEGIES indicator names, note
+length / keyword density distributions) from 100 up to 1M rows, times every
+step of EnhancedKaiTradingAgent.analyze_strategy_data and writes JSON that
+can be compared across commits. DeepSeek and Supabase are stubbed, so it
+runs offline.
+
+    python tools/benchmark_kai.py --sizes default --output bench.json
+    python tools/benchmark_kai.py --sizes 100,1000000 --repeat 1
+    python tools/benchmark_kai.py --compare bench_before.json bench.json
+    python tools/benchmark_kai.py --app /tmp/old/app.py --output bench_before.json
+
+Works against older app.py revisions too: steps an engine does not have
+(keyword match table, analysis cache / pipeline) are detected and skipped.
+"""
+import argparse, ast, inspect, json, logging, os, platform, statistics, subprocess, sys, time, types
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+APP_FILE = Path(__file__).resolve().parent.parent / "app.py"
+
+SIZE_PRESETS = {
+    "quick": [100, 1_000, 10_000],
+    "default": [100, 1_000, 10_000, 100_000],
+    "full": [100, 1_000, 10_000, 100_000, 1_000_000],
+}
+
+# Note shape observed in exported strategy CSVs: a share of empty notes,
+# the rest roughly log-normal in word count with a long tail.
+EMPTY_NOTE_RATE = 0.12
+NOTE_WORDS_MEDIAN = 14
+NOTE_WORDS_SIGMA = 0.8
+NOTE_WORDS_MAX = 120
+KEYWORD_DENSITY = 0.25     # Share of words drawn from the KAI keyword vocabulary
+PRICE_MENTION_RATE = 0.15  # Notes quoting a level ("$3,150", "45k")
+UPPERCASE_NOTE_RATE = 0.05
+
+FILLER_WORDS = (
+    "the a price is on at with and into from after before chart candle close open daily weekly "
+    "trend line level zone area range still looks seems remains current previous next watching "
+    "retest wick body structure channel band ribbon cross crossing flat curling rising falling "
+    "above below near around inside outside higher lower pattern setup"
+).split()
+
+STATUSES = ["Done", "Open", "In Progress", "Skipped"]
+STATUS_WEIGHTS = [0.55, 0.25, 0.15, 0.05]
+MOMENTUM_TYPES = ["Momentum reading", "Extreme reading", "Neutral reading"]
+TAGS = ["Neutral", "Buy", "Sell"]
+
+# Vocabulary for engines without KAI_KEYWORD_CATEGORIES (the words their regexes look for)
+FALLBACK_KEYWORDS = (
+    "bullish up buy long breakout reversal bearish down sell short decline resistance support "
+    "neutral consolidation sideways ranging indecision confirmed strong major certain clear "
+    "probability overbought oversold divergence momentum"
+).split()
+
+STUB_DEEPSEEK_RESPONSE = json.dumps({
+    "executive_summary": "Benchmark stub: mixed signals with a bullish bias above support.",
+    "key_findings": ["Stubbed finding 1", "Stubbed finding 2"],
+    "deepseek_enhanced": True,
+})
+
+
+# ---------- engine loading ----------
+def load_kai_engine(app_file=APP_FILE):
+    """
+    Execute only the definitions of app.py (imports, classes, functions and
+    UPPER_CASE constants) so the Streamlit UI, Supabase client and main() never run.
+    """
+    import streamlit  # noqa: F401 - registers its loggers so they can be quietened
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    source = Path(app_file).read_text(encoding="utf-8")
+    module = types.ModuleType("kai_app")
+    module.__file__ = str(app_file)
+    sys.modules["kai_app"] = module
+    namespace = module.__dict__
+    namespace["supabase_client"] = None
+
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign):
+            names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            if not names or not all(n.isupper() for n in names):
+                continue
+        elif not isinstance(node, (ast.Import, ast.ImportFrom, ast.ClassDef, ast.FunctionDef, ast.Try)):
+            continue
+        code = compile(ast.Module(body=[node], type_ignores=[]), str(app_file), "exec")
+        try:
+            exec(code, namespace)
+        except Exception:
+            pass  # e.g. constants read from st.secrets - not needed offline
+
+    namespace.setdefault("DEEPSEEK_API_KEY", "benchmark-stub")
+    return module
+
+
+def stub_network(engine, deepseek_latency=0.0):
+    """Replace the DeepSeek and Supabase touch points of the agent with offline stubs"""
+    agent_cls = engine.EnhancedKaiTradingAgent
+
+    def call_deepseek_api(self, prompt, temperature=0.3, max_tokens=2000):
+        if deepseek_latency:
+            time.sleep(deepseek_latency)
+        return STUB_DEEPSEEK_RESPONSE
+
+    agent_cls._call_deepseek_api = call_deepseek_api
+    agent_cls.get_previous_weekly_close = lambda self, asset, current_date_str=None: None
+
+
+# ---------- synthetic data ----------
+def keyword_vocabulary(engine):
+    """Every keyword/phrase the KAI matcher knows about (FALLBACK_KEYWORDS for older engines)"""
+    categories = getattr(engine, "KAI_KEYWORD_CATEGORIES", None)
+    if not categories:
+        return sorted(FALLBACK_KEYWORDS)
+    vocabulary = set()
+    for keywords in categories.values():
+        vocabulary.update(keywords)
+    return sorted(vocabulary)
+
+
+def engine_features(engine):
+    """Which optional steps this app.py revision has"""
+    agent_cls = engine.EnhancedKaiTradingAgent
+    params = inspect.signature(agent_cls.analyze_strategy_data).parameters
+    return {
+        "keyword_vocabulary": hasattr(engine, "KAI_KEYWORD_CATEGORIES"),
+        "match_table": hasattr(agent_cls, "_get_match_table"),
+        "analysis_cache": "use_cache" in params,
+        "pipeline": "pipeline" in params,
+    }
+
+
+def generate_strategy_csv(engine, rows, seed=0, keyword_density=KEYWORD_DENSITY):
+    """Strategy CSV in the generate_filtered_csv_bytes column layout"""
+    rng = np.random.default_rng(seed)
+    strategies = engine.STRATEGIES
+    pairs = [(strategy, indicator) for strategy, indicators in strategies.items() for indicator in indicators]
+    vocabulary = np.array(keyword_vocabulary(engine), dtype=object)
+    filler = np.array(FILLER_WORDS, dtype=object)
+
+    picks = rng.integers(0, len(pairs), rows)
+    lengths = np.clip(rng.lognormal(np.log(NOTE_WORDS_MEDIAN), NOTE_WORDS_SIGMA, rows).astype(int), 1, NOTE_WORDS_MAX)
+    lengths[rng.random(rows) < EMPTY_NOTE_RATE] = 0
+
+    total_words = int(lengths.sum())
+    is_keyword = rng.random(total_words) < keyword_density
+    words = np.where(
+        is_keyword,
+        vocabulary[rng.integers(0, len(vocabulary), total_words)],
+        filler[rng.integers(0, len(filler), total_words)],
+    )
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    price_mentions = rng.random(rows) < PRICE_MENTION_RATE
+    prices = rng.integers(20, 70_000, rows)
+    uppercase = rng.random(rows) < UPPERCASE_NOTE_RATE
+
+    notes = []
+    for i in range(rows):
+        note = " ".join(words[offsets[i]:offsets[i + 1]])
+        if note and price_mentions[i]:
+            note += f" key level ${prices[i]:,}" if prices[i] % 2 else f" target {prices[i] // 1000}k"
+        notes.append(note.upper() if uppercase[i] else note)
+
+    start = date(2025, 8, 9)
+    day_offsets = rng.integers(0, 90, rows)
+    analysis_dates = [(start + timedelta(days=int(d))).strftime("%Y-%m-%d") for d in day_offsets]
+    return pd.DataFrame({
+        "Strategy": [pairs[p][0] for p in picks],
+        "Indicator": [pairs[p][1] for p in picks],
+        "Note": notes,
+        "Status": rng.choice(STATUSES, rows, p=STATUS_WEIGHTS),
+        "Momentum": rng.choice(MOMENTUM_TYPES, rows),
+        "Tag": rng.choice(TAGS, rows),
+        "Analysis_Date": analysis_dates,
+        "Last_Modified": [f"{d}T12:00:00" for d in analysis_dates],
+    })
+
+
+# ---------- timing ----------
+def time_call(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def benchmark_size(engine, df, repeat=3, features=None):
+    """Time each step in isolation, then the whole analysis in every mode the engine supports"""
+    agent_cls = engine.EnhancedKaiTradingAgent
+    features = features or engine_features(engine)
+    runs = {}
+
+    def record(name, seconds):
+        runs.setdefault(name, []).append(seconds)
+
+    for _ in range(repeat):
+        agent = agent_cls(use_deepseek=True)
+        record("quality", time_call(engine.DataQualityFramework.assess_quality, df)[0])
+        if features["match_table"]:
+            record("keyword_scan", time_call(agent._get_match_table, df)[0])
+        seconds, overview = time_call(agent._phase_1_scanning, df)
+        record("phase_1_scanning", seconds)
+        seconds, signals = time_call(agent._phase_2_signal_extraction, df)
+        record("phase_2_signal_extraction", seconds)
+        seconds, time_analysis = time_call(agent._phase_3_time_mapping, df)
+        record("phase_3_time_mapping", seconds)
+        seconds, risk = time_call(agent._phase_4_risk_assessment, df, signals)
+        record("phase_4_risk_assessment", seconds)
+        record("auto_explain_csv_data", time_call(agent._auto_explain_csv_data, df)[0])
+        seconds, deepseek = time_call(
+            agent._get_deepseek_enhanced_analysis, df, overview, signals, time_analysis
+        )
+        record("deepseek_stubbed", seconds)
+        record("report", time_call(agent._generate_kai_report, overview, signals, time_analysis, risk, deepseek)[0])
+
+        for pipeline in ((False, True) if features["pipeline"] else (False,)):
+            kwargs = {"use_cache": False} if features["analysis_cache"] else {}
+            if features["pipeline"]:
+                kwargs["pipeline"] = pipeline
+            fresh_agent = agent_cls(use_deepseek=True)
+            seconds, _ = time_call(fresh_agent.analyze_strategy_data, df, **kwargs)
+            record("end_to_end_pipeline" if pipeline else "end_to_end_sequential", seconds)
+
+    return {
+        name: {"min": min(values), "median": statistics.median(values), "runs": values}
+        for name, values in runs.items()
+    }
+
+
+def git_revision(app_file=APP_FILE):
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(app_file).resolve().parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_sizes(value):
+    if value in SIZE_PRESETS:
+        return SIZE_PRESETS[value]
+    return [int(v.replace("_", "")) for v in value.split(",") if v.strip()]
+
+
+# ---------- comparison ----------
+def compare(before_file, after_file):
+    """Print median speedups between two benchmark JSON files"""
+    before = {r["rows"]: r["timings"] for r in json.loads(Path(before_file).read_text())["results"]}
+    after = {r["rows"]: r["timings"] for r in json.loads(Path(after_file).read_text())["results"]}
+    for rows in sorted(set(before) & set(after)):
+        print(f"\n{rows:,} rows")
+        for step in after[rows]:
+            if step not in before[rows]:
+                continue
+            old, new = before[rows][step]["median"], after[rows][step]["median"]
+            ratio = old / new if new else float("inf")
+            print(f"  {step:28s} {old:10.4f}s -> {new:10.4f}s  x{ratio:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", type=Path, default=APP_FILE, help="app.py to benchmark (default: this checkout's)")
+    parser.add_argument("--sizes", default="default",
+                        help=f"Comma-separated row counts or a preset {sorted(SIZE_PRESETS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (min/median reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keyword-density", type=float, default=KEYWORD_DENSITY)
+    parser.add_argument("--deepseek-latency", type=float, default=0.0,
+                        help="Seconds the stubbed DeepSeek call sleeps (simulates the network)")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    engine = load_kai_engine(args.app)
+    stub_network(engine, deepseek_latency=args.deepseek_latency)
+    logging.disable(logging.WARNING)
+    features = engine_features(engine)
+    missing = [name for name, present in features.items() if not present]
+    if missing:
+        print(f"{args.app}: no {', '.join(missing)} - those steps are skipped", file=sys.stderr)
+
+    results = []
+    for rows in parse_sizes(args.sizes):
+        generate_seconds, df = time_call(
+            generate_strategy_csv, engine, rows, seed=args.seed, keyword_density=args.keyword_density
+        )
+        print(f"{rows:>9,} rows: generated in {generate_seconds:.2f}s, benchmarking...", file=sys.stderr)
+        timings = benchmark_size(engine, df, repeat=args.repeat, features=features)
+        results.append({"rows": rows, "generate_seconds": generate_seconds, "timings": timings})
+        summary = f"{'':>15}end-to-end {timings['end_to_end_sequential']['median']:.3f}s sequential"
+        if "end_to_end_pipeline" in timings:
+            summary += f", {timings['end_to_end_pipeline']['median']:.3f}s pipeline"
+        print(summary, file=sys.stderr)
+
+    report = {
+        "meta": {
+            "app": str(args.app),
+            "git_revision": git_revision(args.app),
+            "features": features,
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark for the bcrypt PasswordHasher pool.
+
+Simulates N concurrent sessions logging in (one bcrypt verify each) and
+reports logins/second and latency percentiles per concurrency level, for
+the pooled PasswordHasher and for unsynchronised inline bcrypt on each
+session's own script thread (the old behaviour: Streamlit runs sessions on
+separate threads and bcrypt releases the GIL). Runs offline against app.py's
+definitions.
+
+    python tools/benchmark_login.py
+    python tools/benchmark_login.py --concurrency 1,4,16,64 --rounds 10 --workers 8
+    python tools/benchmark_login.py --same-user   # show the per-user limiter shedding load
+"""
+import argparse, json, statistics, sys, threading, time
+from pathlib import Path
+
+import bcrypt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from benchmark_kai import load_kai_engine  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_level(login, concurrency, logins_per_client, same_user):
+    """concurrency client threads, each doing logins_per_client sequential logins"""
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+    start_gate = threading.Event()
+
+    def client(index):
+        username = "bench" if same_user else f"user{index}"
+        start_gate.wait()
+        for _ in range(logins_per_client):
+            started = time.perf_counter()
+            ok = login(username)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    rejected[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    start_gate.set()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "logins": len(latencies),
+        "rejected": rejected[0],
+        "wall_seconds": round(wall, 3),
+        "logins_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma separated client counts")
+    parser.add_argument("--logins", type=int, default=4, help="Logins per client per level")
+    parser.add_argument("--rounds", type=int, default=None, help="bcrypt cost (default: app's PASSWORD_BCRYPT_ROUNDS)")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: PASSWORD_HASH_MAX_WORKERS)")
+    parser.add_argument("--same-user", action="store_true", help="All clients log in as the same username")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args()
+
+    engine = load_kai_engine()
+    rounds = args.rounds or engine.PASSWORD_BCRYPT_ROUNDS
+    workers = args.workers or engine.PASSWORD_HASH_MAX_WORKERS
+    hasher = engine.PasswordHasher(rounds=rounds, max_workers=workers)
+    stored_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+    # Old behaviour: each session verifies inline on its own script thread, unbounded
+    def inline_login(username):
+        return bcrypt.checkpw(PASSWORD.encode("utf-8"), stored_hash.encode("utf-8"))
+
+    def pooled_login(username):
+        try:
+            return hasher.verify(PASSWORD, stored_hash, username=username)
+        except engine.PasswordHasherBusy:
+            return False
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    results = {"rounds": rounds, "workers": workers, "same_user": args.same_user, "inline": [], "pooled": []}
+    print(f"bcrypt rounds={rounds} workers={workers} same_user={args.same_user}", file=sys.stderr)
+    print(f"{'mode':<8}{'clients':>8}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'rejected':>10}", file=sys.stderr)
+    for concurrency in levels:
+        for mode, login in (("inline", inline_login), ("pooled", pooled_login)):
+            row = run_level(login, concurrency, args.logins, args.same_user)
+            results[mode].append(row)
+            print(f"{mode:<8}{concurrency:>8}{row['logins_per_second'] or 0:>10}"
+                  f"{row['p50_ms'] or 0:>9}{row['p95_ms'] or 0:>9}{row['rejected']:>10}", file=sys.stderr)
+    results["pool_stats"] = hasher.stats()
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()